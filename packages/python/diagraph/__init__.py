@@ -1,4 +1,15 @@
+from .cache.disk_cache_store import DiskCacheStore as DiskCacheStore
+from .cache.memory_cache_store import MemoryCacheStore as MemoryCacheStore
+from .cache.result_cache import ResultCache as ResultCache
 from .classes.diagraph import Diagraph as Diagraph
+from .classes.diagraph_state.memory_state_store import MemoryStateStore as MemoryStateStore
+from .classes.diagraph_state.retention_policy import RetentionPolicy as RetentionPolicy
+from .classes.diagraph_state.sqlite_state_store import SQLiteStateStore as SQLiteStateStore
+from .classes.diagraph_state.sqlite_state_store import UnpicklableError as UnpicklableError
+from .classes.diagraph_state.state_store import StateStore as StateStore
+from .classes.errors import DependencyError as DependencyError
+from .classes.errors import NodeCancelledError as NodeCancelledError
+from .classes.errors import NodeTimeoutError as NodeTimeoutError
 from .classes.types import (
     ErrorHandler as ErrorHandler,
 )
@@ -27,6 +38,10 @@ from .classes.types import (
     Result as Result,
 )
 from .decorators.prompt import prompt as prompt
+from .llm.cached_llm import CachedLLM as CachedLLM
 from .llm.llm import LLM as LLM
 from .llm.openai_llm import OpenAI as OpenAI
+from .llm.rate_limiter import RateLimiter as RateLimiter
+from .llm.retry_policy import RetryPolicy as RetryPolicy
+from .llm.single_flight_llm import SingleFlightLLM as SingleFlightLLM
 from .utils.depends import Depends as Depends
@@ -0,0 +1,38 @@
+from abc import ABCMeta, abstractmethod
+from typing import Any
+
+
+class CacheMiss:
+    def __eq__(self, other):
+        return isinstance(other, self.__class__)
+
+    def __str__(self) -> str:
+        return "miss"
+
+
+MISS = CacheMiss()
+
+
+class CacheStore(metaclass=ABCMeta):
+    """
+    A key-value store for cached values, keyed by content hashes.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """
+        Get a cached value.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Any: The cached value, or MISS if there is no live entry for the key.
+        """
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
@@ -0,0 +1,69 @@
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from time import time
+from typing import Any
+
+from .cache_store import MISS, CacheStore
+
+
+class DiskCacheStore(CacheStore):
+    """
+    A cache kept on disk, one pickle file per entry, so it is shared between
+    processes and survives restarts.
+
+    Entries are written to a temporary file and moved into place, so a reader
+    never sees a partial entry. Entries older than `ttl` seconds are treated as
+    missing, as are entries that can no longer be unpickled, such as those
+    referring to code that has since moved, which are deleted.
+    """
+
+    path: Path
+    ttl: float | None
+
+    def __init__(self, path: str | Path, ttl: float | None = None) -> None:
+        """
+        Initialize a DiskCacheStore.
+
+        Args:
+            path (str | Path): The directory to keep entries in, created if it does not exist.
+            ttl (float | None): How long, in seconds, an entry lives, or None to keep entries forever.
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Any:
+        entry_path = self.__get_entry_path__(key)
+        try:
+            if self.ttl is not None and time() - entry_path.stat().st_mtime >= self.ttl:
+                return MISS
+            with entry_path.open("rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return MISS
+        except Exception:
+            # unpickling can fail with almost any error, from EOFError to ModuleNotFoundError
+            entry_path.unlink(missing_ok=True)
+            return MISS
+
+    def set(self, key: str, value: Any) -> None:
+        entry_path = self.__get_entry_path__(key)
+        entry_path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def __get_entry_path__(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.pkl"
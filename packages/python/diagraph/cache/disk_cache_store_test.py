@@ -0,0 +1,60 @@
+import os
+import pickle
+
+import pytest
+
+from .cache_store import MISS
+from .disk_cache_store import DiskCacheStore
+
+
+def describe_disk_cache_store():
+    def test_it_misses_for_unknown_keys(tmp_path):
+        assert DiskCacheStore(tmp_path).get("abcdef") is MISS
+
+    def test_it_persists_values(tmp_path):
+        DiskCacheStore(tmp_path).set("abcdef", {"foo": [1, 2]})
+        assert DiskCacheStore(tmp_path).get("abcdef") == {"foo": [1, 2]}
+        assert (tmp_path / "ab" / "abcdef.pkl").exists()
+
+    def test_it_expires_entries(tmp_path):
+        store = DiskCacheStore(tmp_path, ttl=60)
+        store.set("abcdef", "foo")
+        assert store.get("abcdef") == "foo"
+
+        entry_path = tmp_path / "ab" / "abcdef.pkl"
+        stale = entry_path.stat().st_mtime - 120
+        os.utime(entry_path, (stale, stale))
+        assert store.get("abcdef") is MISS
+
+    def test_it_does_not_leave_partial_entries(tmp_path):
+        store = DiskCacheStore(tmp_path)
+        try:
+            store.set("abcdef", lambda: None)
+        except Exception:
+            pass
+        assert store.get("abcdef") is MISS
+        assert list((tmp_path / "ab").iterdir()) == []
+
+    @pytest.mark.parametrize(
+        "contents",
+        [
+            b"",
+            pickle.dumps("foo")[:5],
+            # refers to a module that does not exist
+            b"\x80\x04\x95\x1b\x00\x00\x00\x00\x00\x00\x00\x8c\x0cmissing_mod\x94\x8c\x03Foo\x94\x93\x94.",
+        ],
+    )
+    def test_it_deletes_entries_it_cannot_unpickle(tmp_path, contents):
+        store = DiskCacheStore(tmp_path)
+        store.set("abcdef", "foo")
+        entry_path = tmp_path / "ab" / "abcdef.pkl"
+        entry_path.write_bytes(contents)
+
+        assert store.get("abcdef") is MISS
+        assert not entry_path.exists()
+
+    def test_it_clears(tmp_path):
+        store = DiskCacheStore(tmp_path / "cache")
+        store.set("abcdef", "foo")
+        store.clear()
+        assert store.get("abcdef") is MISS
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import operator
+import pickle
+import types
+from collections.abc import Callable
+from typing import Any
+
+GetCodeIdentity = Callable[[Callable], tuple[str, tuple[str, ...]]]
+
+
+class UncacheableError(Exception):
+    """
+    Raised when a value has no stable representation, so anything depending
+    on it cannot be cached.
+    """
+
+
+def get_fingerprint(value: Any, get_code_identity: GetCodeIdentity | None = None) -> str:
+    """
+    Serialize a value deterministically, so that equal values give the same
+    string in every process.
+
+    A function is represented by everything that determines what it returns:
+    its source, its defaults, the values it closes over and the globals it
+    reads. Functions found inside those are represented by their source alone.
+
+    Parameters:
+    - value (Any): The value to serialize.
+    - get_code_identity (Callable | None): Gets the source and referenced global
+      names of a function, so callers can cache them. Defaults to get_code_identity_uncached.
+
+    Returns:
+    str: Canonical JSON for the value.
+
+    Raises:
+    - UncacheableError: If the value, or anything it contains, has no stable representation.
+    """
+    get_code_identity = get_code_identity or get_code_identity_uncached
+    if inspect.isfunction(value):
+        return dump(canonicalize_function(value, get_code_identity))
+    return dump(canonicalize(value, get_code_identity))
+
+
+def canonicalize(value: Any, get_code_identity: GetCodeIdentity) -> Any:
+    """
+    Convert a value into a JSON-serializable structure that only depends on its contents.
+
+    Sets and dicts are sorted, and every container is tagged with its type, so
+    that a list and a tuple with the same items are told apart. Other objects
+    are represented by a hash of their pickled bytes, as a repr can leave out
+    what tells two objects apart.
+    """
+    value_type = type(value)
+    if value is None or value_type in (bool, int, str):
+        return value
+    if value_type is float:
+        return ["float", repr(value)]
+    if value_type is bytes:
+        return ["bytes", value.hex()]
+    if value_type in (list, tuple):
+        return [value_type.__name__, [canonicalize(item, get_code_identity) for item in value]]
+    if value_type in (set, frozenset):
+        return [value_type.__name__, sorted(dump(canonicalize(item, get_code_identity)) for item in value)]
+    if value_type is dict:
+        items = [
+            [dump(canonicalize(key, get_code_identity)), canonicalize(item, get_code_identity)]
+            for key, item in value.items()
+        ]
+        return ["dict", sorted(items, key=operator.itemgetter(0))]
+    if isinstance(value, types.ModuleType):
+        return ["module", value.__name__]
+    if isinstance(value, type):
+        return ["class", get_qualified_name(value)]
+    if isinstance(value, functools.partial):
+        return [
+            "partial",
+            canonicalize(value.func, get_code_identity),
+            canonicalize(value.args, get_code_identity),
+            canonicalize(value.keywords, get_code_identity),
+        ]
+    if inspect.ismethod(value):
+        return [
+            "method",
+            canonicalize(value.__func__, get_code_identity),
+            canonicalize(value.__self__, get_code_identity),
+        ]
+    if inspect.isfunction(value):
+        return ["function", get_qualified_name(value), get_code_identity(value)[0]]
+    if inspect.isbuiltin(value):
+        return ["builtin", get_qualified_name(value)]
+    try:
+        pickled = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        raise UncacheableError(f"{get_qualified_name(value_type)} has no stable representation") from e
+    return ["pickle", get_qualified_name(value_type), hashlib.sha256(pickled).hexdigest()]
+
+
+def canonicalize_function(fn: types.FunctionType, get_code_identity: GetCodeIdentity) -> Any:
+    source, global_names = get_code_identity(fn)
+    closure = [get_cell_contents(cell) for cell in fn.__closure__ or ()]
+    fn_globals = fn.__globals__
+    referenced_globals = {name: fn_globals[name] for name in global_names if name in fn_globals}
+    return [
+        "function",
+        source,
+        canonicalize(fn.__defaults__, get_code_identity),
+        canonicalize(fn.__kwdefaults__, get_code_identity),
+        canonicalize(closure, get_code_identity),
+        canonicalize(referenced_globals, get_code_identity),
+    ]
+
+
+def get_code_identity_uncached(fn: Callable) -> tuple[str, tuple[str, ...]]:
+    """
+    Get the parts of a function that cannot change after it is defined: its
+    source, and the names of the globals its code refers to.
+
+    Parameters:
+    - fn (Callable): The function.
+
+    Returns:
+    tuple: The source, and the sorted global names.
+    """
+    code = getattr(fn, "__code__", None)
+    global_names = () if code is None else tuple(sorted(get_global_names(code)))
+    return get_source(fn), global_names
+
+
+def get_global_names(code: types.CodeType) -> set[str]:
+    # nested functions and comprehensions have code of their own, which reads the same globals
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= get_global_names(const)
+    return names
+
+
+def get_source(fn: Callable) -> str:
+    """
+    Get the source code of a function.
+
+    Functions without retrievable source fall back to their qualified name and
+    compiled bytecode, which still changes whenever the function body does.
+
+    Parameters:
+    - fn (Callable): The function.
+
+    Returns:
+    str: A string identifying the function's implementation.
+    """
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        code = getattr(fn, "__code__", None)
+        bytecode = code.co_code.hex() if code is not None else ""
+        return f"{get_qualified_name(fn)}:{bytecode}"
+
+
+def get_cell_contents(cell: types.CellType) -> Any:
+    try:
+        return cell.cell_contents
+    except ValueError:
+        # the variable has not been assigned yet
+        return None
+
+
+def get_qualified_name(value: Any) -> str:
+    module = getattr(value, "__module__", None)
+    name = getattr(value, "__qualname__", repr(value))
+    return name if module is None else f"{module}.{name}"
+
+
+def dump(canonical: Any) -> str:
+    return json.dumps(canonical, separators=(",", ":"))
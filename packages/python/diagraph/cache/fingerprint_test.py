@@ -0,0 +1,110 @@
+import functools
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from .fingerprint import UncacheableError, get_fingerprint
+
+CONSTANT = "constant"
+
+
+def reads_a_global():
+    return CONSTANT
+
+
+def make(n):
+    def add(a):
+        return a + n
+
+    return add
+
+
+class Callable:
+    def __call__(self, a):
+        return a
+
+
+class Rows:
+    """Has a repr that leaves out its contents."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __repr__(self):
+        return f"Rows(n={len(self.rows)})"
+
+
+def describe_get_fingerprint():
+    def test_it_fingerprints_values():
+        assert get_fingerprint([1, "a", None, True, 1.5]) == get_fingerprint([1, "a", None, True, 1.5])
+        assert get_fingerprint([1]) != get_fingerprint((1,))
+        assert get_fingerprint(1) != get_fingerprint(1.0)
+        assert get_fingerprint(1) != get_fingerprint(True)
+
+    def test_it_sorts_dicts_and_sets():
+        assert get_fingerprint({"a": 1, "b": 2}) == get_fingerprint({"b": 2, "a": 1})
+        assert get_fingerprint({"b", "a", "c"}) == get_fingerprint({"c", "a", "b"})
+        assert get_fingerprint({1, 2}) != get_fingerprint(frozenset({1, 2}))
+
+    def test_it_is_stable_across_processes():
+        script = "from diagraph.cache.fingerprint import get_fingerprint; print(get_fingerprint(frozenset('abcdefgh')))"
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-c", script],
+                capture_output=True,
+                text=True,
+                check=True,
+                env={**os.environ, "PYTHONHASHSEED": seed},
+            ).stdout
+            for seed in ("1", "2", "3")
+        }
+        assert len(outputs) == 1
+
+    def test_it_includes_closures():
+        assert get_fingerprint(make(1)) == get_fingerprint(make(1))
+        assert get_fingerprint(make(1)) != get_fingerprint(make(2))
+
+    def test_it_includes_defaults():
+        def foo(a, b=1, *, c=1):
+            return a + b + c
+
+        fingerprint = get_fingerprint(foo)
+        foo.__defaults__ = (2,)
+        assert get_fingerprint(foo) != fingerprint
+        foo.__defaults__ = (1,)
+        assert get_fingerprint(foo) == fingerprint
+        foo.__kwdefaults__ = {"c": 2}
+        assert get_fingerprint(foo) != fingerprint
+
+    def test_it_includes_referenced_globals():
+        global CONSTANT
+        fingerprint = get_fingerprint(reads_a_global)
+        CONSTANT = "changed"
+        try:
+            assert get_fingerprint(reads_a_global) != fingerprint
+        finally:
+            CONSTANT = "constant"
+        assert get_fingerprint(reads_a_global) == fingerprint
+
+    def test_it_fingerprints_partials():
+        assert get_fingerprint(functools.partial(make(1), 1)) != get_fingerprint(functools.partial(make(1), 2))
+
+    def test_it_fingerprints_objects_by_their_contents():
+        assert get_fingerprint(Rows([1, 2, 3])) == get_fingerprint(Rows([1, 2, 3]))
+        assert get_fingerprint(Rows([1, 2, 3])) != get_fingerprint(Rows([4, 5, 6]))
+        assert get_fingerprint(Callable()) == get_fingerprint(Callable())
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            threading.Lock(),
+            (i for i in range(3)),
+            [threading.Lock()],
+        ],
+    )
+    def test_it_refuses_values_without_a_stable_representation(value):
+        with pytest.raises(UncacheableError):
+            get_fingerprint(value)
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from time import monotonic
+from typing import Any
+
+from .cache_store import MISS, CacheStore
+
+
+class MemoryCacheStore(CacheStore):
+    """
+    An in-memory least-recently-used cache.
+
+    Once `max_size` entries are stored, writing a new one evicts the entry that
+    was used longest ago. Entries older than `ttl` seconds are treated as
+    missing and dropped when next read.
+    """
+
+    max_size: int | None
+    ttl: float | None
+    entries: OrderedDict[str, tuple[Any, float | None]]
+
+    def __init__(
+        self,
+        max_size: int | None = 1024,
+        ttl: float | None = None,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        """
+        Initialize a MemoryCacheStore.
+
+        Args:
+            max_size (int | None): The maximum number of entries, or None for no limit.
+            ttl (float | None): How long, in seconds, an entry lives, or None to keep entries until evicted.
+            clock (Callable): The clock used to expire entries.
+        """
+        if max_size is not None and max_size < 1:
+            raise Exception(f"max_size must be at least 1, got {max_size}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.__lock__ = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self.__lock__:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISS
+            value, expires_at = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self.entries[key]
+                return MISS
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+        with self.__lock__:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            if self.max_size is not None:
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.__lock__:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
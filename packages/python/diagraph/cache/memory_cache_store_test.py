@@ -0,0 +1,54 @@
+import pytest
+
+from .cache_store import MISS
+from .memory_cache_store import MemoryCacheStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def describe_memory_cache_store():
+    def test_it_misses_for_unknown_keys():
+        assert MemoryCacheStore().get("foo") is MISS
+
+    def test_it_gets_values():
+        store = MemoryCacheStore()
+        store.set("foo", None)
+        assert store.get("foo") is None
+
+    def test_it_evicts_the_least_recently_used_entry():
+        store = MemoryCacheStore(max_size=2)
+        store.set("a", 1)
+        store.set("b", 2)
+        store.get("a")
+        store.set("c", 3)
+
+        assert store.get("a") == 1
+        assert store.get("b") is MISS
+        assert store.get("c") == 3
+        assert len(store) == 2
+
+    def test_it_expires_entries():
+        clock = Clock()
+        store = MemoryCacheStore(ttl=10, clock=clock)
+        store.set("foo", "foo")
+        clock.now = 9.9
+        assert store.get("foo") == "foo"
+        clock.now = 10
+        assert store.get("foo") is MISS
+        assert len(store) == 0
+
+    def test_it_clears():
+        store = MemoryCacheStore()
+        store.set("foo", "foo")
+        store.clear()
+        assert store.get("foo") is MISS
+
+    def test_it_validates_the_max_size():
+        with pytest.raises(Exception, match="max_size must be at least 1"):
+            MemoryCacheStore(max_size=0)
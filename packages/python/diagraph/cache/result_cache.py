@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import pickle
+import threading
+from collections.abc import Callable
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from .cache_store import MISS, CacheStore
+from .fingerprint import UncacheableError, get_code_identity_uncached, get_fingerprint
+from .memory_cache_store import MemoryCacheStore
+
+
+class ResultCache:
+    """
+    Memoizes node results across runs, and across processes when given a disk tier.
+
+    A result is keyed by a SHA-256 hash of everything that determines it: the
+    function's source, defaults, closure and the globals it reads, the
+    resolved args and kwargs it is called with and, for @prompt functions,
+    the stored prompt and the LLM's configuration. Everything is serialized
+    deterministically, so the same invocation has the same key in every
+    process. Invocations involving values without a stable representation,
+    such as objects with the default repr, are not cached.
+
+    Tiers are checked in order, fastest first. A hit in a later tier is copied
+    into the earlier ones, and new results are written to every tier.
+    """
+
+    tiers: tuple[CacheStore, ...]
+
+    def __init__(self, *tiers: CacheStore) -> None:
+        """
+        Initialize a ResultCache.
+
+        Args:
+            *tiers (CacheStore): The stores to cache in, fastest first. Defaults to a MemoryCacheStore.
+        """
+        self.tiers = tiers if len(tiers) else (MemoryCacheStore(),)
+        self.__code_identities__: WeakKeyDictionary[Callable, tuple[str, tuple[str, ...]]] = WeakKeyDictionary()
+        self.__lock__ = threading.Lock()
+
+    def get_key(
+        self,
+        fn: Callable,
+        args: list[Any],
+        kwargs: dict[str, Any],
+        prompt: Any = None,
+        llm: Any = None,
+    ) -> str | None:
+        """
+        Hash the inputs of a node invocation.
+
+        Returns:
+            str | None: The cache key, or None if the inputs cannot be hashed, in which case the
+            invocation is not cached.
+        """
+        try:
+            payload = "\n".join(
+                [
+                    get_fingerprint(getattr(fn, "__fn__", fn), self.__get_code_identity__),
+                    get_fingerprint((args, kwargs, prompt, get_llm_config(llm))),
+                ],
+            )
+        except (UncacheableError, RecursionError):
+            # RecursionError is raised for containers that hold themselves
+            return None
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Any:
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not MISS:
+                for faster_tier in self.tiers[:index]:
+                    faster_tier.set(key, value)
+                return value
+        return MISS
+
+    def set(self, key: str, value: Any) -> None:
+        for tier in self.tiers:
+            try:
+                tier.set(key, value)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                # values that cannot be persisted are only cached in memory
+                continue
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def __get_code_identity__(self, fn: Callable) -> tuple[str, tuple[str, ...]]:
+        # the source and global names of a function cannot change, unlike the values it reads
+        try:
+            with self.__lock__:
+                identity = self.__code_identities__.get(fn)
+                if identity is None:
+                    identity = get_code_identity_uncached(fn)
+                    self.__code_identities__[fn] = identity
+        except TypeError:
+            # not every callable can be weakly referenced
+            return get_code_identity_uncached(fn)
+        return identity
+
+
+def get_llm_config(llm: Any) -> tuple[str, list[tuple[str, Any]]] | None:
+    if llm is None:
+        return None
+    llm_class = type(llm)
+    kwargs = getattr(llm, "kwargs", None) or {}
+    return f"{llm_class.__module__}.{llm_class.__qualname__}", sorted(kwargs.items())
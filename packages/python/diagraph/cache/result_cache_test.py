@@ -0,0 +1,83 @@
+import functools
+
+from .cache_store import MISS
+from .disk_cache_store import DiskCacheStore
+from .fingerprint import get_source
+from .memory_cache_store import MemoryCacheStore
+from .result_cache import ResultCache
+
+
+def foo(a, b=1):
+    return a + b
+
+
+def bar(a, b=1):
+    return a - b
+
+
+def describe_result_cache():
+    def test_it_defaults_to_memory():
+        cache = ResultCache()
+        assert len(cache.tiers) == 1
+        assert isinstance(cache.tiers[0], MemoryCacheStore)
+
+    def test_it_keys_on_the_function_source():
+        cache = ResultCache()
+        assert cache.get_key(foo, [1], {}) == cache.get_key(foo, [1], {})
+        assert cache.get_key(foo, [1], {}) != cache.get_key(bar, [1], {})
+
+    def test_it_keys_on_the_arguments():
+        cache = ResultCache()
+        key = cache.get_key(foo, [1], {"b": 2})
+        assert key != cache.get_key(foo, [2], {"b": 2})
+        assert key != cache.get_key(foo, [1], {"b": 3})
+
+    def test_it_keys_on_the_prompt_and_llm():
+        class FakeLLM:
+            def __init__(self, **kwargs):
+                self.kwargs = kwargs
+
+        cache = ResultCache()
+        key = cache.get_key(foo, [1], {}, "prompt", FakeLLM(model="a"))
+        assert key == cache.get_key(foo, [1], {}, "prompt", FakeLLM(model="a"))
+        assert key != cache.get_key(foo, [1], {}, "other prompt", FakeLLM(model="a"))
+        assert key != cache.get_key(foo, [1], {}, "prompt", FakeLLM(model="b"))
+
+    def test_it_does_not_key_unhashable_arguments():
+        cache = ResultCache()
+        assert cache.get_key(foo, [(i for i in range(3))], {}) is None
+
+    def test_it_keys_on_closures():
+        def make(n):
+            def add(a):
+                return a + n
+
+            return add
+
+        cache = ResultCache()
+        assert cache.get_key(make(1), [1], {}) != cache.get_key(make(2), [1], {})
+
+    def test_it_keys_callables_without_source():
+        cache = ResultCache()
+        assert cache.get_key(functools.partial(foo, 1), [], {}) != cache.get_key(functools.partial(foo, 2), [], {})
+
+    def test_it_backfills_faster_tiers(tmp_path):
+        memory = MemoryCacheStore()
+        disk = DiskCacheStore(tmp_path)
+        disk.set("abcdef", "foo")
+
+        cache = ResultCache(memory, disk)
+        assert memory.get("abcdef") is MISS
+        assert cache.get("abcdef") == "foo"
+        assert memory.get("abcdef") == "foo"
+
+    def test_it_keeps_values_it_cannot_persist_in_memory(tmp_path):
+        memory = MemoryCacheStore()
+        cache = ResultCache(memory, DiskCacheStore(tmp_path))
+        value = lambda: None  # noqa: E731
+        cache.set("abcdef", value)
+        assert cache.get("abcdef") is value
+
+    def test_it_falls_back_to_bytecode_without_source():
+        fn = eval("lambda a: a + 1")  # noqa: S307
+        assert get_source(fn).startswith(f"{__name__}.<lambda>:")
@@ -0,0 +1,197 @@
+import asyncio
+import inspect
+import time
+from typing import Any
+
+from ..cache.cache_store import MISS
+from ..decorators.is_decorated import is_decorated
+from .diagraph_node import DiagraphNode
+from .diagraph_node_group import DiagraphNodeGroup
+from .errors import DependencyError, NodeCancelledError
+from .graph_executor import GraphExecutor
+from .types import ErrorHandler, KeyIdentifier, NodeStatus, Result
+
+
+class AsyncGraphExecutor(GraphExecutor):
+    """
+    Executes a Diagraph on a single event loop.
+
+    Coroutine functions and @prompt functions are awaited directly, so in-flight
+    LLM requests do not each occupy a thread. Plain synchronous functions are
+    handed off to a worker thread so they do not block the loop.
+    """
+
+    # diagraph: Diagraph
+    diagraph: Any
+    global_error_fn: ErrorHandler | None = None
+    status: dict[KeyIdentifier, NodeStatus]
+    waiting_on: dict[KeyIdentifier, int]
+    starting_nodes: DiagraphNodeGroup
+    input_args: tuple[Any, ...]
+    input_kwargs: dict[Any, Any]
+
+    def __init__(
+        self,
+        # diagraph: Diagraph,
+        diagraph: Any,
+        starting_nodes: DiagraphNodeGroup,
+        input_args,
+        input_kwargs,
+        global_error_fn: ErrorHandler | None,
+        timeout: float | None = None,
+    ):
+        self.diagraph = diagraph
+        self.global_error_fn = global_error_fn
+        self.__start_clock__(timeout)
+        self.starting_nodes = starting_nodes
+        self.input_args = input_args
+        self.input_kwargs = input_kwargs
+
+    async def run(self) -> None:
+        """
+        Execute every node reachable from the starting nodes, creating a task for
+        each node as soon as all of its in-run ancestors have completed.
+        """
+        pending: dict[asyncio.Task, DiagraphNode] = {}
+        for node in self.__start_run__(self.starting_nodes):
+            self.schedule(node, self.input_args, self.input_kwargs, pending)
+
+        while len(pending):
+            done, _ = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                node = pending.pop(task)
+                task.result()
+                for child in self.__finish_node__(node):
+                    self.schedule(child, self.input_args, self.input_kwargs, pending)
+            if self.stopped:
+                await self.__cancel_pending__(pending)
+        self.__finish_run__()
+
+    def schedule(
+        self,
+        node: DiagraphNode,
+        input_args,
+        input_kwargs,
+        pending: dict[asyncio.Task, DiagraphNode],
+    ) -> None:
+        if self.status.get(node.key) == "pending" and not self.stopped:
+            self.status[node.key] = "running"
+            self.__create_token__(node)
+            task = asyncio.create_task(
+                self.__execute_node__(
+                    node,
+                    input_args,
+                    input_kwargs,
+                ),
+            )
+            pending[task] = node
+
+    async def __execute_node__(
+        self,
+        node: DiagraphNode,
+        input_args: tuple[Any, ...],
+        input_kwargs: dict[Any, Any],
+    ) -> None:
+        """
+        Execute a node, cancelling it if it is still running at its deadline.
+
+        Cancelling the task interrupts whatever the node is awaiting, such as an
+        LLM stream. Synchronous work handed off to a thread runs to completion,
+        and its outcome is discarded.
+        """
+        token = self.tokens[node.key]
+        token.start()
+        deadline = token.deadline
+        try:
+            execution = self.__execute_node_and_catch_errors__(node, input_args, input_kwargs, None)
+            if deadline is None:
+                await execution
+            else:
+                await asyncio.wait_for(execution, max(0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.__time_out__(node, time.monotonic())
+        finally:
+            token.finish()
+
+    async def __cancel_pending__(self, pending: dict[asyncio.Task, DiagraphNode]) -> None:
+        """
+        Cancel every pending node, and wait for the cancellations to land.
+        """
+        for task, node in pending.items():
+            self.status[node.key] = "failed"
+            if self.__cancel__(node, NodeCancelledError(node.key), record=False):
+                task.cancel()
+        self.__skip_descendants__(pending.values())
+        await asyncio.gather(*pending, return_exceptions=True)
+        pending.clear()
+
+    async def __execute_node_and_catch_errors__(
+        self,
+        node: DiagraphNode,
+        input_args: tuple[Any, ...],
+        input_kwargs: dict[Any, Any],
+        rerun_kwargs: None | dict[Any, Any],
+    ) -> None:
+        if rerun_kwargs is None:
+            rerun_kwargs = {}
+        try:
+            result = await self.__run_node__(node, input_args, input_kwargs)
+            self.__save_result__(node, result)
+        except DependencyError:
+            # the dependency's own error, if it has one, is already recorded on it
+            return
+        except Exception as e:
+            if self.tokens[node.key].cancelled:
+                return
+
+            loop = asyncio.get_running_loop()
+
+            # Error handlers are synchronous, so they are called from a worker
+            # thread; rerunning hands the node back to the event loop and waits.
+            def rerun(**kwargs: dict[Any, Any]):
+                asyncio.run_coroutine_threadsafe(
+                    self.__execute_node_and_catch_errors__(
+                        node,
+                        input_args,
+                        input_kwargs,
+                        rerun_kwargs=kwargs,
+                    ),
+                    loop,
+                ).result()
+                return node.result
+
+            await asyncio.to_thread(self.__handle_error__, node, e, rerun, rerun_kwargs)
+
+    async def __run_node__(
+        self,
+        node: DiagraphNode,
+        provided_args: tuple[Any, ...],
+        provided_kwargs: dict[Any, Any],
+    ) -> Result:
+        """
+        Execute a single node in the Diagraph.
+
+        Returns:
+            Any: The result of executing the node.
+        """
+        fn, args, kwargs = self.__prepare_node__(node, provided_args, provided_kwargs)
+        context = self.__get_context__(node, fn) if is_decorated(fn) else None
+        cache_key, result = self.__read_cache__(node, fn, args, kwargs, context)
+        if result is not MISS:
+            return result
+
+        if context is not None:
+            if hasattr(fn, "__arun__"):
+                result = await fn.__arun__(context, *args, **kwargs)
+            else:
+                result = await asyncio.to_thread(fn, context, *args, **kwargs)
+        elif inspect.iscoroutinefunction(fn):
+            result = await fn(*args, **kwargs)
+        else:
+            result = await asyncio.to_thread(fn, *args, **kwargs)
+
+        self.__write_cache__(node, cache_key, result)
+        return result
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+
+from .errors import NodeTimeoutError
+
+
+class CancellationToken:
+    """
+    Tracks the deadline of a single node execution, and whether it has been
+    cancelled.
+
+    Threads cannot be stopped from the outside, so cancellation is
+    cooperative: a node that is cancelled while running notices the next time
+    it checks its token, and anything it produces afterwards is discarded.
+    The lock settles the race between a node finishing and the executor
+    cancelling it, so exactly one of the two records the node's outcome.
+    Work that waits, such as backing off before a retry, can `wait` on the
+    token to wake up as soon as it is cancelled.
+    """
+
+    lock: threading.Lock
+    timeout: float | None
+    run_timeout: float | None
+    run_deadline: float | None
+    started_at: float | None
+    finished: bool
+
+    def __init__(
+        self,
+        timeout: float | None = None,
+        run_timeout: float | None = None,
+        run_deadline: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize a CancellationToken.
+
+        Args:
+            timeout (float | None): How long the node may run for, in seconds, once started.
+            run_timeout (float | None): The timeout of the run the node is part of.
+            run_deadline (float | None): When the run the node is part of times out.
+            clock (Callable): The clock deadlines are measured with.
+        """
+        self.lock = threading.Lock()
+        self.timeout = timeout
+        self.run_timeout = run_timeout
+        self.run_deadline = run_deadline
+        self.clock = clock
+        self.started_at = None
+        self.__cancelled__ = threading.Event()
+        self.__error__: NodeTimeoutError | None = None
+        self.finished = False
+
+    @property
+    def error(self) -> NodeTimeoutError | None:
+        return self.__error__
+
+    @error.setter
+    def error(self, error: NodeTimeoutError | None) -> None:
+        self.__error__ = error
+        if error is not None:
+            self.__cancelled__.set()
+
+    @property
+    def node_deadline(self) -> float | None:
+        if self.timeout is None or self.started_at is None:
+            return None
+        return self.started_at + self.timeout
+
+    @property
+    def deadline(self) -> float | None:
+        deadlines = [deadline for deadline in (self.node_deadline, self.run_deadline) if deadline is not None]
+        return min(deadlines, default=None)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.error is not None
+
+    def start(self) -> None:
+        self.started_at = self.clock()
+
+    def finish(self) -> None:
+        with self.lock:
+            self.finished = True
+
+    def is_expired(self, now: float) -> bool:
+        deadline = self.deadline
+        return deadline is not None and deadline <= now
+
+    def get_timeout_error(self, key, now: float) -> NodeTimeoutError:
+        node_deadline = self.node_deadline
+        if self.timeout is not None and node_deadline is not None and node_deadline <= now:
+            return NodeTimeoutError(key, self.timeout)
+        return NodeTimeoutError(key, self.run_timeout or 0, scope="run")
+
+    def raise_if_cancelled(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the token is cancelled, or the timeout passes.
+
+        Args:
+            timeout (float): The longest to wait for, in seconds.
+
+        Returns:
+            bool: True if the token has been cancelled.
+        """
+        return self.__cancelled__.wait(timeout)
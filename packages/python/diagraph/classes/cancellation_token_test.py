@@ -0,0 +1,80 @@
+import pickle
+import threading
+
+import pytest
+
+from .cancellation_token import CancellationToken
+from .errors import NodeTimeoutError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def describe_cancellation_token():
+    def test_it_has_no_deadline_by_default():
+        token = CancellationToken()
+        token.start()
+        assert token.deadline is None
+        assert token.is_expired(1e9) is False
+
+    def test_it_counts_the_node_timeout_from_the_start():
+        clock = Clock()
+        token = CancellationToken(timeout=5, clock=clock)
+        assert token.deadline is None
+        clock.now = 10
+        token.start()
+        assert token.deadline == 15
+        assert token.is_expired(14) is False
+        assert token.is_expired(15) is True
+
+    def test_it_takes_the_earlier_of_the_node_and_run_deadlines():
+        clock = Clock()
+        token = CancellationToken(timeout=5, run_timeout=3, run_deadline=3, clock=clock)
+        assert token.deadline == 3
+        token.start()
+        assert token.deadline == 3
+        clock.now = 0
+        token = CancellationToken(timeout=1, run_timeout=3, run_deadline=3, clock=clock)
+        token.start()
+        assert token.deadline == 1
+
+    def test_it_builds_a_node_timeout_error():
+        clock = Clock()
+        token = CancellationToken(timeout=1, run_timeout=3, run_deadline=3, clock=clock)
+        token.start()
+        error = token.get_timeout_error("fn", now=1)
+        assert error.scope == "node"
+        assert error.timeout == 1
+
+    def test_it_builds_a_run_timeout_error():
+        token = CancellationToken(timeout=5, run_timeout=3, run_deadline=3, clock=Clock())
+        token.start()
+        error = token.get_timeout_error("fn", now=3)
+        assert error.scope == "run"
+        assert error.timeout == 3
+
+    def test_it_raises_once_cancelled():
+        token = CancellationToken()
+        token.raise_if_cancelled()
+        assert token.cancelled is False
+        token.error = NodeTimeoutError("fn", 1)
+        assert token.cancelled is True
+        with pytest.raises(NodeTimeoutError, match="timed out after 1 seconds"):
+            token.raise_if_cancelled()
+
+    def test_it_wakes_waiters_once_cancelled():
+        token = CancellationToken()
+        assert token.wait(0) is False
+        threading.Timer(0.05, lambda: setattr(token, "error", NodeTimeoutError("fn", 1))).start()
+        assert token.wait(5) is True
+
+    def test_its_errors_can_be_pickled():
+        error = pickle.loads(pickle.dumps(NodeTimeoutError("fn", 3, scope="run")))
+        assert isinstance(error, NodeTimeoutError)
+        assert (error.key, error.timeout, error.scope) == ("fn", 3, "run")
+        assert str(error) == 'The run timed out after 3 seconds, before "fn" finished'
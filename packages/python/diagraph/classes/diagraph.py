@@ -1,24 +1,33 @@
 from __future__ import annotations
 
+import concurrent.futures
+import copy
 import json
 import pickle
-from collections.abc import Callable
+from collections.abc import Callable, Generator, Iterable
 from pathlib import Path
-from typing import overload
+from typing import Any, overload
 
+from ..cache.result_cache import ResultCache
 from ..decorators.prompt import set_default_llm
 from ..llm.llm import LLM
+from ..llm.rate_limiter import RateLimiter
 from ..utils.build_graph import NodeDict, build_graph_mapping
+from ..utils.build_parameters import ParameterPlan, compile_parameters
 from ..utils.get_execution_graph import get_execution_graph
 from ..utils.get_filetype import get_filetype
 from ..utils.validate_node_ancestors import validate_node_ancestors
 from ..visualization.render_repr_html import render_repr_html
+from .async_graph_executor import AsyncGraphExecutor
 from .diagraph_node import DiagraphNode
 from .diagraph_node_group import DiagraphNodeGroup
 from .diagraph_state.diagraph_state import DiagraphState
 from .diagraph_state.diagraph_state_record import (
+    DiagraphStateValue,
     DiagraphStateValueEmpty,
 )
+from .diagraph_state.retention_policy import RetentionPolicy
+from .diagraph_state.state_store import StateStore
 from .diagraph_state.types import StateValue
 from .graph import Graph
 from .graph_executor import GraphExecutor
@@ -50,13 +59,21 @@ class Diagraph:
 
     __graph__: Graph[Fn]
     __state__: DiagraphState
+    __execution_plans__: dict[tuple[KeyIdentifier, ...], tuple[tuple[Fn, ...], ...]]
+    __parameter_plans__: dict[Fn, ParameterPlan]
+    __dirty__: set[KeyIdentifier]
+    __nodes__: dict[KeyIdentifier, DiagraphNode]
 
+    timeouts: dict[KeyIdentifier, float]
     terminal_nodes: tuple[DiagraphNode, ...]
     log_handler: LogHandler | None
     error_handler: ErrorHandler | None
     fns: dict[KeyIdentifier, Fn]
     llm: LLM | None
+    cache: ResultCache | None
+    rate_limiter: RateLimiter | None
     max_workers: int = MAX_WORKERS
+    fail_fast: bool
     use_string_keys: bool
     created_from_json: bool
 
@@ -70,6 +87,11 @@ class Diagraph:
         use_string_keys=False,
         created_from_json=False,
         max_workers=MAX_WORKERS,
+        retention: RetentionPolicy | None = None,
+        store: StateStore | None = None,
+        cache: ResultCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        fail_fast: bool = False,
     ) -> None:
         """
         Initialize a Diagraph.
@@ -80,9 +102,20 @@ class Diagraph:
             error (ErrorHandler | None): An error handling function.
             use_string_keys (bool): Whether to use string keys
                                     for functions in the graph.
+            retention (RetentionPolicy | None): How much run history to keep.
+                                    Defaults to all of it.
+            store (StateStore | None): Where to keep run history.
+                                    Defaults to memory.
+            cache (ResultCache | None): A cache to reuse the results of identical
+                                    node invocations from. Off by default.
+            rate_limiter (RateLimiter | None): Throttles the LLM requests of every
+                                    @prompt function in the graph.
+            fail_fast (bool): Whether to stop a run as soon as a node records an
+                                    error. Nodes that have not started are cancelled,
+                                    and nodes that are running are abandoned.
         """
-        self.__state__ = DiagraphState()
         self.max_workers = max_workers
+        self.fail_fast = fail_fast
         self.use_string_keys = use_string_keys
         self.created_from_json = created_from_json
         if use_string_keys and node_dict is None:
@@ -91,6 +124,8 @@ class Diagraph:
             )
         self.fns = {}
         self.llm = llm
+        self.cache = cache
+        self.rate_limiter = rate_limiter
 
         graph_def, self.fns = build_graph_mapping(
             self,
@@ -100,10 +135,28 @@ class Diagraph:
             node_dict=node_dict,
         )
         self.__graph__ = Graph(graph_def)
-
-        self.terminal_nodes = tuple(DiagraphNode(self, fn) for fn in terminal_fns)
+        self.__nodes__ = {}
+        self.__execution_plans__ = {}
+        # signatures are inspected once, rather than every time a node runs
+        self.__parameter_plans__ = {fn: compile_parameters(self, fn) for fn in self.fns.values()}
+        self.timeouts = {}
         self.log_handler = log or global_log_fn
         self.error_handler = error
+        self.__init_state__(DiagraphState(retention=retention, store=store), terminal_fns)
+
+    def __init_state__(self, state: DiagraphState, terminal_keys: Iterable[KeyIdentifier]) -> None:
+        """
+        Set up everything a Diagraph does not share with its forks.
+
+        Args:
+            state (DiagraphState): The state to record runs in.
+            terminal_keys (Iterable): The keys of the terminal nodes.
+        """
+        self.__state__ = state
+        # nodes point back at their Diagraph, so each Diagraph has nodes of its own
+        self.__nodes__ = {}
+        self.__dirty__ = self.__get_dirty__()
+        self.terminal_nodes = tuple(self.__get_node__(key) for key in terminal_keys)
 
     def get_fn_for_key(self, key: KeyIdentifier) -> Fn:
         if self.use_string_keys:
@@ -128,20 +181,40 @@ class Diagraph:
             )
         return fn
 
+    def __get_node__(self, key: KeyIdentifier) -> DiagraphNode:
+        """
+        Get the node for a key, creating it the first time it is asked for.
+
+        Every key, and every function or name that resolves to it, shares a single node.
+
+        Args:
+            key (KeyIdentifier): The function or string key of the node.
+
+        Returns:
+            DiagraphNode: The node for the key.
+        """
+        node = self.__nodes__.get(key)
+        if node is None:
+            node = DiagraphNode(self, key)
+            # setdefault keeps the node another thread may have created in the meantime
+            node = self.__nodes__.setdefault(node.key, node)
+            self.__nodes__[key] = node
+        return node
+
     def _repr_html_(self) -> str:
         return render_repr_html(self)
 
     def get_children_of_node(self, node: DiagraphNode | Fn) -> list[DiagraphNode]:
         key = node.key if isinstance(node, DiagraphNode) else node
         return [
-            DiagraphNode(self, node)
+            self.__get_node__(node)
             for node in self.__graph__.in_edges(self.get_fn_for_key(key))
         ]
 
     def get_ancestors_of_node(self, node: DiagraphNode | Fn) -> list[DiagraphNode]:
         key = node.key if isinstance(node, DiagraphNode) else node
         return [
-            DiagraphNode(self, node)
+            self.__get_node__(node)
             for node in self.__graph__.out_edges(self.get_fn_for_key(key))
         ]
 
@@ -172,26 +245,15 @@ class Diagraph:
             DiagraphNodeGroup associated with the key.
         """
         if isinstance(key, int):
-            execution_graph = list(
-                get_execution_graph(
-                    self.__graph__,
-                    self.__graph__.root_nodes,
-                    self.get_fn_for_key,
-                ),
-            )
-
-            if key < 0:
-                key = len(execution_graph) + key
-
-            node_keys = execution_graph[key]
-            return DiagraphNodeGroup(self, *node_keys)
+            execution_plan = self.__get_execution_plan__(self.__graph__.root_nodes)
+            return DiagraphNodeGroup(self, *execution_plan[key])
 
         if isinstance(key, tuple):
             return DiagraphNodeGroup(self, *key)
 
         if self.use_string_keys:
             if isinstance(key, str):
-                return DiagraphNode(self, key)
+                return self.__get_node__(key)
 
             if self.created_from_json:
                 raise Exception(
@@ -205,16 +267,99 @@ class Diagraph:
                 )
             raise Exception(f"Invalid key: {key}, expected a str")
         if isinstance(key, Callable):
-            return DiagraphNode(self, key)
+            return self.__get_node__(key)
 
         raise Exception(f"Invalid key: {key}, expected a callable")
 
-    def run(self, *input_args, **kwargs) -> Diagraph:
+    def map(
+        self,
+        inputs: Iterable[Any],
+        concurrency: int = MAX_WORKERS,
+        **kwargs,
+    ) -> Generator[tuple[int, Diagraph], None, None]:
+        """
+        Run the Diagraph over many independent sets of inputs.
+
+        The graph is built once and shared; every input set runs against its own
+        copy of the Diagraph with isolated state. Runs are yielded as they finish,
+        which is not necessarily the order of the inputs.
+
+        Args:
+            inputs: An iterable of inputs. A tuple is treated as the positional
+                    arguments of a run, anything else as a single argument.
+            concurrency (int): The maximum number of runs in flight at once.
+            **kwargs: Keyword arguments passed to every run.
+
+        Yields:
+            tuple[int, Diagraph]: The index of the input, and the Diagraph that ran it.
+        """
+        if concurrency < 1:
+            raise Exception(f"Concurrency must be at least 1, got {concurrency}")
+
+        rows = enumerate(inputs)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[concurrent.futures.Future, int] = {}
+
+            def submit_next() -> None:
+                item = next(rows, None)
+                if item is not None:
+                    index, row = item
+                    future = executor.submit(self.__fork__().__run_row__, row, kwargs)
+                    pending[future] = index
+
+            for _ in range(concurrency):
+                submit_next()
+
+            while len(pending):
+                done, _ = concurrent.futures.wait(
+                    pending,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    index = pending.pop(future)
+                    submit_next()
+                    yield index, future.result()
+
+    def __fork__(self) -> Diagraph:
+        """
+        Create a copy of the Diagraph that shares its graph and functions,
+        but has its own empty state.
+        """
+        fork = copy.copy(self)
+        # settings that can be changed per node are copied, so a fork's changes stay its own
+        fork.fns = {**self.fns}
+        fork.timeouts = {**self.timeouts}
+        fork.__init_state__(
+            DiagraphState(
+                retention=self.__state__.retention,
+                store=self.__state__.store.fork(),
+            ),
+            [node.key for node in self.terminal_nodes],
+        )
+        return fork
+
+    def __run_row__(self, row: Any, kwargs: dict[str, Any]) -> Diagraph:
+        input_args = row if isinstance(row, tuple) else (row,)
+        try:
+            self.run(*input_args, **kwargs)
+        except Exception:
+            # errors raised by nodes are recorded on the run, and surfaced via .error
+            if self.__latest_run__.get("complete") is not True:
+                raise
+        finally:
+            # the fork's store is its own, and nothing else writes to it once the run is over
+            self.__state__.store.close()
+        return self
+
+    def run(self, *input_args, timeout: float | None = None, **kwargs) -> Diagraph:
         """
         Run the Diagraph from the beginning.
 
         Args:
             *input_args: Input arguments to be passed to the graph.
+            timeout (float | None): How long the run may take, in seconds. Nodes still
+                                    running when it expires are cancelled and record a
+                                    NodeTimeoutError, and nodes that depend on them do not run.
 
         Returns:
             Diagraph: The Diagraph instance.
@@ -222,13 +367,100 @@ class Diagraph:
 
         root_nodes: list[Fn] = self.__graph__.root_nodes
         group = DiagraphNodeGroup(self, *root_nodes)
-        self.__run_from__(group, *input_args, **kwargs)
+        self.__run_from__(group, *input_args, timeout=timeout, **kwargs)
+        return self
+
+    def rerun(self, *input_args, timeout: float | None = None, **kwargs) -> Diagraph:
+        """
+        Run only the nodes whose results are out of date.
+
+        A node is out of date if it has never run successfully, if its prompt
+        or function has changed, or if anything upstream of it has. Every other
+        node keeps its current result. Called without arguments, the inputs of
+        the latest run are reused.
+
+        Args:
+            *input_args: Input arguments to be passed to the graph.
+            timeout (float | None): How long the run may take, in seconds.
+
+        Returns:
+            Diagraph: The Diagraph instance.
+        """
+        if len(input_args) == 0 and len(kwargs) == 0:
+            latest_run = self.__state__.get("run")
+            if latest_run is not None:
+                input_args = latest_run["input"]
+                kwargs = latest_run["kwargs"]
+
+        frontier = self.__get_dirty_frontier__()
+        if len(frontier):
+            self.__run_from__(DiagraphNodeGroup(self, *frontier), *input_args, timeout=timeout, **kwargs)
+        return self
+
+    def __get_dirty__(self) -> set[KeyIdentifier]:
+        """
+        Get the keys of the nodes without an up-to-date result in the state.
+
+        A node is out of date if it has no result, if it has an error, or if
+        anything upstream of it is out of date. A new state has no results, so
+        every node is, but a store holding earlier runs can have nodes that are not.
+
+        Returns:
+            set[KeyIdentifier]: The keys of the out-of-date nodes.
+        """
+        state = self.__state__
+        graph = self.__graph__
+        dirty = []
+        clean = []
+        for fn in graph.nodes:
+            key = self.get_key_for_fn(fn)
+            if state.has(("result", key)) and state.get(("error", key)) is None:
+                clean.append(fn)
+            else:
+                dirty.append(fn)
+        # reachability is transitive, so checking against the nodes without a result is enough
+        stale = [fn for fn in clean if any(graph.depends_on(fn, upstream) for upstream in dirty)]
+        return {self.get_key_for_fn(fn) for fn in [*dirty, *stale]}
+
+    def __get_dirty_frontier__(self) -> list[Fn]:
+        """
+        Get the out-of-date nodes that have no out-of-date ancestors.
+
+        Running from these recomputes exactly the out-of-date part of the graph.
+        """
+        graph = self.__graph__
+        dirty = [fn for fn in graph.nodes if self.get_key_for_fn(fn) in self.__dirty__]
+        return [
+            fn
+            for fn in dirty
+            if not any(graph.depends_on(fn, upstream) for upstream in dirty)
+        ]
+
+    async def arun(self, *input_args, timeout: float | None = None, **kwargs) -> Diagraph:
+        """
+        Run the Diagraph from the beginning on the current event loop.
+
+        Coroutine functions and @prompt functions are awaited rather than run in
+        worker threads, so many LLM requests can be in flight at once.
+
+        Args:
+            *input_args: Input arguments to be passed to the graph.
+            timeout (float | None): How long the run may take, in seconds.
+
+        Returns:
+            Diagraph: The Diagraph instance.
+        """
+
+        root_nodes: list[Fn] = self.__graph__.root_nodes
+        group = DiagraphNodeGroup(self, *root_nodes)
+        await self.__arun_from__(group, *input_args, timeout=timeout, **kwargs)
         return self
 
     def __run_from__(
         self,
         group: DiagraphNodeGroup | DiagraphNode,
         *input_args,
+        timeout: float | None = None,
         **input_kwargs,
     ) -> Diagraph:
         """
@@ -237,14 +469,62 @@ class Diagraph:
         Args:
             node_key (Fn | int): The node key or depth to start execution from.
             *input_args: Input arguments to be passed to the graph.
+            timeout (float | None): How long the run may take, in seconds.
 
         Returns:
             Diagraph: The Diagraph instance.
         """
+        run, starting_nodes = self.__start_run__(group, input_args, input_kwargs)
+        GraphExecutor(
+            self,
+            starting_nodes,
+            input_args=input_args,
+            input_kwargs=input_kwargs,
+            max_workers=self.max_workers,
+            global_error_fn=global_error_fn,
+            timeout=timeout,
+        )
+        return self.__complete_run__(run)
+
+    async def __arun_from__(
+        self,
+        group: DiagraphNodeGroup | DiagraphNode,
+        *input_args,
+        timeout: float | None = None,
+        **input_kwargs,
+    ) -> Diagraph:
+        """
+        Run the Diagraph from a specific node on the current event loop.
+
+        Args:
+            node_key (Fn | int): The node key or depth to start execution from.
+            *input_args: Input arguments to be passed to the graph.
+            timeout (float | None): How long the run may take, in seconds.
+
+        Returns:
+            Diagraph: The Diagraph instance.
+        """
+        run, starting_nodes = self.__start_run__(group, input_args, input_kwargs)
+        await AsyncGraphExecutor(
+            self,
+            starting_nodes,
+            input_args=input_args,
+            input_kwargs=input_kwargs,
+            global_error_fn=global_error_fn,
+            timeout=timeout,
+        ).run()
+        return self.__complete_run__(run)
+
+    def __start_run__(
+        self,
+        group: DiagraphNodeGroup | DiagraphNode,
+        input_args: tuple,
+        input_kwargs: dict,
+    ) -> tuple[dict, DiagraphNodeGroup]:
         starting_node_group = get_diagraph_node_group(self, group)
         self.__state__.add_timestamp()
         run = {
-            "node_group": starting_node_group,
+            "nodes": tuple(node.key for node in starting_node_group.nodes),
             "input": input_args,
             "kwargs": input_kwargs,
         }
@@ -252,24 +532,49 @@ class Diagraph:
 
         validate_node_ancestors(starting_node_group)
 
-        GraphExecutor(
+        return run, DiagraphNodeGroup(
             self,
-            DiagraphNodeGroup(
-                self,
-                *next(
-                    get_execution_graph(
-                        self.__graph__,
-                        starting_node_group,
-                        self.get_fn_for_key,
-                    ),
-                ),
-            ),
-            input_args=input_args,
-            input_kwargs=input_kwargs,
-            max_workers=self.max_workers,
-            global_error_fn=global_error_fn,
+            *self.__get_execution_plan__(starting_node_group)[0],
+        )
+
+    def __get_execution_plan__(
+        self,
+        node_keys: DiagraphNodeGroup | list[KeyIdentifier],
+    ) -> tuple[tuple[Fn, ...], ...]:
+        """
+        Get the layers of execution for a set of starting nodes.
+
+        The graph cannot change after construction, so plans are computed once
+        per set of starting nodes and reused on subsequent calls.
+
+        Args:
+            node_keys (DiagraphNodeGroup | list): The nodes to start execution from.
+
+        Returns:
+            tuple[tuple[Fn, ...], ...]: The layers of functions, in order of execution.
+        """
+        plan_key = tuple(
+            node.key if isinstance(node, DiagraphNode) else self.get_key_for_fn(node)
+            for node in node_keys
         )
-        run["complete"] = True
+        execution_plan = self.__execution_plans__.get(plan_key)
+        if execution_plan is None:
+            execution_plan = tuple(
+                tuple(layer)
+                for layer in get_execution_graph(
+                    self.__graph__,
+                    list(plan_key),
+                    self.get_fn_for_key,
+                )
+            )
+            self.__execution_plans__[plan_key] = execution_plan
+        return execution_plan
+
+    def __complete_run__(self, run: dict) -> Diagraph:
+        # stores may copy values on write, so the run is written again rather than mutated
+        self.__state__["run"] = {**run, "complete": True}
+        # a finished run must survive a restart, so stores that buffer writes persist them now
+        self.__state__.store.flush()
         errors_encountered = self.error
         if errors_encountered is not None:
             if isinstance(errors_encountered, Exception):
@@ -286,10 +591,10 @@ class Diagraph:
 
     @property
     def __latest_run__(self):
-        try:
-            return self.__state__["run"]
-        except Exception:
-            raise Exception("Diagraph has not been run yet") from None
+        run = self.__state__.get("run")
+        if run is None:
+            raise Exception("Diagraph has not been run yet")
+        return run
 
     @property
     def result(self) -> Result | tuple[Result, ...] | None:
@@ -316,26 +621,19 @@ class Diagraph:
             Exception or tuple[Exception]: The errors of the terminal nodes,
             either as a single value or a tuple of values.
         """
-        try:
-            assert self.__state__["run"]
-
-            errors = []
-            for node in self.nodes:
-                try:
-                    errors.append(node.error)
-                except Exception:  # noqa: PERF203
-                    errors.append(None)
-            if len(errors) == 0:
-                return None
-            if len(errors) == 1:
-                return errors[0]
-            return tuple(errors)
-        except Exception:
-            raise Exception("Diagraph has not been run yet") from None
+        if not self.__state__.has("run"):
+            raise Exception("Diagraph has not been run yet")
+
+        errors = [node.error for node in self.nodes]
+        if len(errors) == 0:
+            return None
+        if len(errors) == 1:
+            return errors[0]
+        return tuple(errors)
 
     @property
     def nodes(self):
-        return [DiagraphNode(self, node) for node in self.__graph__.nodes]
+        return [self.__get_node__(node) for node in self.__graph__.nodes]
 
     def __setitem__(self, node_key: KeyIdentifier, fn: Fn) -> None:
         """
@@ -345,19 +643,25 @@ class Diagraph:
             node_key (Key): The key associated with the function.
             fn (Fn): The function to add to the Diagraph.
         """
-        self.__inc_timestamp__(DiagraphNode(self, node_key))
+        self.__inc_timestamp__(self.__get_node__(node_key))
         self.fns[node_key] = fn
+        # plans resolve keys to functions, so a replaced function invalidates them
+        self.__execution_plans__ = {}
+        # parameter plans are keyed by function, and shared with forks, so they are copied rather than mutated
+        self.__parameter_plans__ = {**self.__parameter_plans__, fn: compile_parameters(self, fn)}
 
     def __inc_timestamp__(self, node: DiagraphNode):
         self.__state__.add_timestamp()
 
-        def recurse_through_children(node: DiagraphNode, nodes: set[DiagraphNode]):
-            nodes.add(node)
-            for child in node.children:
-                recurse_through_children(child, nodes)
-            return nodes
-
-        children = recurse_through_children(node, set())
+        # iterative, and visiting every node once, as diamonds would otherwise be walked once per path
+        children = {node.key: node}
+        stack = [node]
+        while len(stack):
+            for child in stack.pop().children:
+                if child.key not in children:
+                    children[child.key] = child
+                    stack.append(child)
+        self.__dirty__.update(children)
 
         def clear(node: DiagraphNode) -> None:
             if node.__is_decorated__:
@@ -365,12 +669,23 @@ class Diagraph:
             self.__state__[("result", node.key)] = DiagraphStateValueEmpty()
             self.__state__[("error", node.key)] = DiagraphStateValueEmpty()
 
-        for child in children:
+        for child in children.values():
             clear(child)
 
     def __set_state__(self, node: DiagraphNode, key: str, value: StateValue) -> None:
         self.__inc_timestamp__(node)
-        self.__state__[(key, node.key)] = value
+        if key == "result":
+            self.__save_result__(node.key, value)
+        else:
+            self.__state__[(key, node.key)] = value
+
+    def __save_result__(self, key: KeyIdentifier, result: Result) -> None:
+        state = self.__state__
+        state[("result", key)] = result
+        # an error from an earlier attempt no longer applies
+        if isinstance(state.store.get(("error", key), state.current_timestamp), DiagraphStateValue):
+            state[("error", key)] = DiagraphStateValueEmpty()
+        self.__dirty__.discard(key)
 
     def __str__(self) -> str:
         """
@@ -14,7 +14,15 @@ if TYPE_CHECKING:
 
 
 class DiagraphNode:
-    """A node in a Diagraph representing a function or a value."""
+    """
+    A node in a Diagraph representing a function or a value.
+
+    Nodes are handles onto the Diagraph's state, and hold nothing else. A Diagraph
+    creates one per key and hands out the same one every time, so prefer
+    `diagraph[key]` over constructing nodes directly.
+    """
+
+    __slots__ = ("__graph__", "diagraph", "key")
 
     diagraph: Diagraph
     __graph__: Graph
@@ -97,28 +105,31 @@ class DiagraphNode:
         """
         return is_decorated(self.fn)
 
-    def run(self, *input_args, **kwargs) -> Diagraph:
+    def run(self, *input_args, timeout: float | None = None, **kwargs) -> Diagraph:
         """
         Run the Diagraph starting from the current node.
 
         Args:
             *input_args: Input arguments to be passed to the Diagraph.
+            timeout (float | None): How long the run may take, in seconds.
 
         Returns:
             None
         """
 
-        self.diagraph.__run_from__(self, *input_args, **kwargs)
+        self.diagraph.__run_from__(self, *input_args, timeout=timeout, **kwargs)
         return self.diagraph
 
     @property
     def __ready__(self) -> bool:
-        try:
-            [ancestor.result for ancestor in self.ancestors]
-            return True
-        except Exception:
-            pass
-        return False
+        """
+        Check whether every ancestor of the node has an up-to-date result.
+
+        Returns:
+            bool: True if the node can run.
+        """
+        dirty = self.diagraph.__dirty__
+        return not any(ancestor.key in dirty for ancestor in self.ancestors)
 
     @property
     def result(self) -> Result:
@@ -151,10 +162,7 @@ class DiagraphNode:
         Returns:
             Exception | None: The error associated with the node.
         """
-        try:
-            return self.diagraph.__state__[("error", self.key)]
-        except Exception:
-            return None
+        return self.diagraph.__state__.get(("error", self.key))
 
     @error.setter
     def error(self, error: Exception) -> None:
@@ -169,6 +177,39 @@ class DiagraphNode:
         """
         self.diagraph.__set_state__(self, "error", error)
 
+    @property
+    def timeout(self) -> float | None:
+        """
+        Get how long the node may run for before it is cancelled.
+
+        Returns:
+            float | None: The timeout in seconds set on the node, or else the timeout
+            passed to @prompt, or None for no timeout.
+        """
+        timeout = self.diagraph.timeouts.get(self.key)
+        if timeout is None:
+            return getattr(self.fn, "__function_timeout__", None)
+        return timeout
+
+    @timeout.setter
+    def timeout(self, timeout: float | None) -> None:
+        """
+        Set how long the node may run for before it is cancelled.
+
+        Args:
+            timeout (float | None): The timeout in seconds, or None to fall back to the
+                                    timeout passed to @prompt.
+
+        Returns:
+            None
+        """
+        if timeout is None:
+            self.diagraph.timeouts.pop(self.key, None)
+        else:
+            if timeout <= 0:
+                raise Exception(f"Timeout must be positive, got {timeout}")
+            self.diagraph.timeouts[self.key] = timeout
+
     @property
     def prompt(self) -> str:
         """
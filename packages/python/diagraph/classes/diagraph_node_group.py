@@ -32,7 +32,7 @@ class DiagraphNodeGroup:
             if isinstance(node, DiagraphNode):
                 nodes.append(node)
             else:
-                nodes.append(DiagraphNode(self.diagraph, node))
+                nodes.append(self.diagraph.__get_node__(node))
         self.nodes = tuple(nodes)
 
     def __iter__(self) -> Iterator[DiagraphNode]:
@@ -1,29 +1,74 @@
-from collections.abc import Callable
+import threading
+from array import array
+from bisect import bisect_right
 from time import time
+from typing import Any
 
-from .diagraph_state_record import (
-    DiagraphStateRecord,
-    DiagraphStateValue,
-)
+from .diagraph_state_record import DiagraphStateValue
+from .memory_state_store import MemoryStateStore
+from .retention_policy import RetentionPolicy
+from .state_miss import StateLookupError, StateMiss
+from .state_store import StateStore
 from .types import StateKey, StateValue
 
-TupleWithTimestamp = tuple[StateKey, float]
+TupleWithTimestamp = tuple[StateKey, int]
 
 
 class DiagraphState:
-    __internal_state__: dict[StateKey, DiagraphStateRecord]
-    timestamps: list[float]
-
-    def __init__(self) -> None:
-        self.__internal_state__ = {}
-        self.timestamps = [time()]
+    """
+    Versioned state for a Diagraph.
+
+    Versions ("timestamps") come from a monotonic logical clock: every call to
+    `add_timestamp` returns the next integer, so two versions can never collide
+    however quickly they are created. The wall-clock time each version was
+    created at is optionally kept alongside, for display.
+
+    Without a retention policy every version is kept forever. With one, each
+    new version forgets the versions the policy no longer retains, and every
+    so often the store drops the values none of the retained versions can
+    see. Reads never see the difference, as versions that have been
+    forgotten cannot be read.
+
+    Values live in a StateStore, in memory unless another store is given. A
+    store that already holds history, such as a SQLite database from an
+    earlier process, is resumed from its latest version.
+    """
+
+    __lock__: threading.Lock
+    store: StateStore
+    oldest_timestamp: int
+    compacted_timestamp: int
+    timestamps: array
+    wall_times: array | None
+    retention: RetentionPolicy | None
+
+    def __init__(
+        self,
+        wall_clock: bool = True,
+        retention: RetentionPolicy | None = None,
+        store: StateStore | None = None,
+    ) -> None:
+        """
+        Initialize a DiagraphState.
+
+        Args:
+            wall_clock (bool): Whether to record the wall-clock time of each version.
+            retention (RetentionPolicy | None): How much history to keep. Defaults to all of it.
+            store (StateStore | None): Where to keep values. Defaults to a MemoryStateStore.
+        """
+        if retention is not None and retention.max_age is not None and not wall_clock:
+            raise Exception("A retention policy with a max_age requires wall_clock=True")
+        self.store = store if store is not None else MemoryStateStore()
+        self.retention = retention
+        self.__lock__ = threading.Lock()
+        self.oldest_timestamp = 0
+        # the oldest version the store was last compacted to
+        self.compacted_timestamp = 0
+        self.timestamps = array("q", [self.store.get_latest_timestamp() or 0])
+        self.wall_times = array("d", [time()]) if wall_clock else None
 
     def __setitem__(self, key: StateKey, value: StateValue) -> None:
-        record = self.__internal_state__.get(key)
-        if record is None:
-            record = DiagraphStateRecord()
-            self.__internal_state__[key] = record
-        record[self.current_timestamp] = value
+        self.store.set(key, self.current_timestamp, value)
 
     def __get_key_and_timestamp__(
         self,
@@ -35,35 +80,118 @@ class DiagraphState:
         return key, timestamp
 
     def __getitem__(self, key: StateKey | TupleWithTimestamp) -> StateValue:
+        value = self.lookup(key)
+        if isinstance(value, StateMiss):
+            raise StateLookupError(value)
+        return value
+
+    def get(self, key: StateKey | TupleWithTimestamp, default: Any = None) -> StateValue:
+        """
+        Read a value, or a default if it cannot be read.
+
+        Args:
+            key (StateKey | tuple): The key, optionally paired with the version to read.
+            default (Any): What to return if the value cannot be read.
+
+        Returns:
+            Any: The value, or the default.
+        """
+        value = self.lookup(key)
+        if isinstance(value, StateMiss):
+            return default
+        return value
+
+    def has(self, key: StateKey | TupleWithTimestamp) -> bool:
+        """
+        Check whether a value can be read.
+
+        Args:
+            key (StateKey | tuple): The key, optionally paired with the version to read.
+
+        Returns:
+            bool: True if reading the key would return a value.
+        """
+        return not isinstance(self.lookup(key), StateMiss)
+
+    def lookup(self, key: StateKey | TupleWithTimestamp) -> StateValue | StateMiss:
+        """
+        Read a value without raising if it cannot be read.
+
+        Args:
+            key (StateKey | tuple): The key, optionally paired with the version to read.
+
+        Returns:
+            Any: The value, or a StateMiss saying why it cannot be read.
+        """
         key, timestamp = self.__get_key_and_timestamp__(key)
+        if timestamp < self.oldest_timestamp:
+            return StateMiss(key, timestamp, "expired")
         # validate_key(key[0])
-        record = self.__internal_state__.get(key, None)
-        if record is None:
-            state = {key: str(val) for key, val in self.__internal_state__.items()}
-            raise Exception(f"No record for {get_key(key)}, {state}")
-        value = record[timestamp]
+        value = self.store.get(key, timestamp)
         if isinstance(value, DiagraphStateValue):
             return value.value
-        raise Exception(f"Value for {get_key(key)} is explicitly unset")
-
-    def add_timestamp(self) -> float:
-        current_time = time()
-        self.timestamps.append(current_time)
-        return current_time
+        if value is None:
+            # the store is only used if the miss is printed, to list what is recorded
+            return StateMiss(key, timestamp, "missing", self.store)
+        return StateMiss(key, timestamp, "unset")
+
+    def add_timestamp(self) -> int:
+        with self.__lock__:
+            version = self.timestamps[-1] + 1
+            self.timestamps.append(version)
+            if self.wall_times is not None:
+                self.wall_times.append(time())
+            if self.retention is not None:
+                self.__compact__(self.retention)
+        return version
+
+    def compact(self, retention: RetentionPolicy | None = None) -> None:
+        """
+        Drop the history a retention policy does not keep.
+
+        Args:
+            retention (RetentionPolicy | None): The policy to apply. Defaults to the state's own policy.
+        """
+        retention = retention or self.retention
+        if retention is None:
+            raise Exception("No retention policy to compact with")
+        with self.__lock__:
+            self.__compact__(retention, force=True)
+
+    def __compact__(self, retention: RetentionPolicy, force: bool = False) -> None:
+        start = retention.get_oldest_retained_index(self.timestamps, self.wall_times, time())
+        if start > 0:
+            del self.timestamps[:start]
+            if self.wall_times is not None:
+                del self.wall_times[:start]
+            self.oldest_timestamp = self.timestamps[0]
+
+        if self.oldest_timestamp == self.compacted_timestamp:
+            return
+        if force or self.oldest_timestamp - self.compacted_timestamp >= retention.compact_every:
+            self.store.compact(self.oldest_timestamp)
+            self.compacted_timestamp = self.oldest_timestamp
 
     @property
-    def current_timestamp(self):
+    def current_timestamp(self) -> int:
         return self.timestamps[-1]
 
-
-def get_key(key: StateKey):
-    return ".".join([get_name(f) for f in reversed(list(key))])
-
-
-def get_name(f: str | Callable) -> str:
-    if isinstance(f, str):
-        return f
-    return f.__name__
+    def get_wall_time(self, timestamp: int) -> float | None:
+        """
+        Get the wall-clock time a version was created at.
+
+        Args:
+            timestamp (int): The version.
+
+        Returns:
+            float | None: The time, in seconds since the epoch, or None if it was not recorded.
+        """
+        if self.wall_times is None:
+            return None
+        index = bisect_right(self.timestamps, timestamp) - 1
+        if index < 0:
+            return None
+        return self.wall_times[index]
 
 
 # def validate_key(key: str):
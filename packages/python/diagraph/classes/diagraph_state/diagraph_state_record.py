@@ -1,8 +1,9 @@
 # If no timestamp exists, return an empty
 # Else, return the matching timestamp if one exists
 # Else, return the closest previous timestamp, if one exists
-from ..ordered_set import OrderedSet
-from .binary_search import binary_search
+from array import array
+from bisect import bisect_left, bisect_right
+
 from .types import StateValue
 
 
@@ -27,28 +28,73 @@ class DiagraphStateValueEmpty:
 RecordValue = DiagraphStateValue | DiagraphStateValueEmpty
 
 
+EMPTY = DiagraphStateValueEmpty()
+
+
 class DiagraphStateRecord:
-    values: dict[float, RecordValue]
-    keys: OrderedSet[float]
+    """
+    The history of a single state key.
+
+    Timestamps are integer versions kept sorted in a flat array, with the value
+    written at each timestamp stored at the same index of `values`, so lookups
+    are a binary search over the array and never copy it.
+    """
+
+    keys: array
+    values: list[RecordValue]
 
     def __init__(self):
-        self.values = {}
-        self.keys = OrderedSet()
+        self.keys = array("q")
+        self.values = []
 
-    def __setitem__(self, key: float, value: StateValue) -> None:
-        self.keys.add(key)
-        if value == DiagraphStateValueEmpty():
-            self.values[key] = value
+    def __setitem__(self, key: int, value: StateValue) -> None:
+        if isinstance(value, DiagraphStateValueEmpty):
+            record_value: RecordValue = value
         else:
-            self.values[key] = DiagraphStateValue(value)
+            record_value = DiagraphStateValue(value)
+
+        keys = self.keys
+        # writes almost always happen at the latest timestamp
+        if len(keys) == 0 or key > keys[-1]:
+            keys.append(key)
+            self.values.append(record_value)
+            return
+
+        index = bisect_left(keys, key)
+        if keys[index] == key:
+            self.values[index] = record_value
+        else:
+            keys.insert(index, key)
+            self.values.insert(index, record_value)
+
+    def __getitem__(self, key: int) -> RecordValue:
+        index = bisect_right(self.keys, key) - 1
+        if index < 0:
+            return EMPTY
+        return self.values[index]
+
+    def compact(self, oldest: int) -> None:
+        """
+        Drop the history that no version from `oldest` onwards can see.
+
+        The newest value written at or before `oldest` is kept, since lookups
+        at `oldest` and later fall back to it.
+
+        Args:
+            oldest (int): The oldest timestamp that must still resolve.
+        """
+        index = bisect_right(self.keys, oldest) - 1
+        if index > 0:
+            del self.keys[:index]
+            del self.values[:index]
+
+    @property
+    def is_empty(self) -> bool:
+        return all(isinstance(value, DiagraphStateValueEmpty) for value in self.values)
 
-    def __getitem__(self, key: float) -> RecordValue:
-        closest_key_idx = binary_search(list(self.keys), key)
-        if closest_key_idx is None:
-            return DiagraphStateValueEmpty()
-        closest_key = self.keys[closest_key_idx]
-        return self.values.get(closest_key, DiagraphStateValueEmpty())
+    def __len__(self) -> int:
+        return len(self.keys)
 
     def __str__(self) -> str:
-        values = {key: str(val) for key, val in self.values.items()}
+        values = {key: str(val) for key, val in zip(self.keys, self.values, strict=True)}
         return f"DiagraphStateRecord<{values}>"
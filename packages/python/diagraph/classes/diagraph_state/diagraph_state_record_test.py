@@ -112,3 +112,59 @@ def describe_diagraph_state_record_test():
         record = DiagraphStateRecord()
         record[2] = "bar"
         assert record[key] == DiagraphStateValueEmpty()
+
+    def test_it_returns_closest_earliest_record_for_out_of_order_writes():
+        record = DiagraphStateRecord()
+        record[10] = "baz"
+        record[1] = "foo"
+        record[5] = "bar"
+        record[5] = "qux"
+
+        assert list(record.keys) == [1, 5, 10]
+        assert record[0] == DiagraphStateValueEmpty()
+        assert record[4].value == "foo"
+        assert record[7].value == "qux"
+        assert record[11].value == "baz"
+
+    def test_it_looks_up_records_across_many_timestamps():
+        record = DiagraphStateRecord()
+        for i in range(0, 20_000, 2):
+            record[i] = i
+
+        assert len(record) == 10_000
+        for key in [0, 1, 2, 9_999, 10_000, 19_998, 25_000]:
+            value = record[key]
+            assert isinstance(value, DiagraphStateValue)
+            assert value.value == min(key - key % 2, 19_998)
+
+
+def describe_compact():
+    def test_it_keeps_the_value_visible_at_the_oldest_timestamp():
+        record = DiagraphStateRecord()
+        record[1] = "foo"
+        record[3] = "bar"
+        record[5] = "baz"
+
+        record.compact(4)
+
+        assert list(record.keys) == [3, 5]
+        assert record[4].value == "bar"
+        assert record[5].value == "baz"
+
+    def test_it_keeps_everything_newer_than_the_oldest_timestamp():
+        record = DiagraphStateRecord()
+        record[3] = "foo"
+        record[5] = "bar"
+
+        record.compact(1)
+
+        assert list(record.keys) == [3, 5]
+
+    def test_it_reports_records_holding_only_empty_values():
+        record = DiagraphStateRecord()
+        record[1] = "foo"
+        record[2] = DiagraphStateValueEmpty()
+        assert record.is_empty is False
+
+        record.compact(2)
+        assert record.is_empty is True
@@ -2,6 +2,8 @@ import pytest
 
 from .diagraph_state import DiagraphState
 from .diagraph_state_record import DiagraphStateValueEmpty
+from .retention_policy import RetentionPolicy
+from .state_miss import StateLookupError, StateMiss
 
 
 def describe_diagraph_state():
@@ -125,7 +127,7 @@ def describe_diagraph_state():
                 "foo",
             )
         ] = "foo"
-        timestamps: list[float] = [state.current_timestamp]
+        timestamps: list[int] = [state.current_timestamp]
         timestamps.extend([state.add_timestamp(), state.add_timestamp()])
         state[
             tuple(
@@ -135,3 +137,199 @@ def describe_diagraph_state():
         timestamps.extend([state.add_timestamp(), state.add_timestamp()])
 
         assert state[tuple("foo"), timestamps[index]] == expectation
+
+    def test_it_versions_with_a_logical_clock(mocker):
+        mocker.patch(
+            "diagraph.classes.diagraph_state.diagraph_state.time",
+            return_value=100.0,
+        )
+        state = DiagraphState()
+        first = state.current_timestamp
+        second = state.add_timestamp()
+        third = state.add_timestamp()
+
+        assert (first, second, third) == (0, 1, 2)
+        assert state.current_timestamp == 2
+        assert list(state.timestamps) == [0, 1, 2]
+
+    def test_it_does_not_collide_versions_created_in_the_same_tick(mocker):
+        mocker.patch(
+            "diagraph.classes.diagraph_state.diagraph_state.time",
+            return_value=100.0,
+        )
+        state = DiagraphState()
+        state[tuple("foo")] = "foo"
+        version = state.add_timestamp()
+        state[tuple("foo")] = "bar"
+
+        assert state[tuple("foo"), version - 1] == "foo"
+        assert state[tuple("foo"), version] == "bar"
+
+    def test_it_records_wall_clock_times(mocker):
+        mocked_time = mocker.patch(
+            "diagraph.classes.diagraph_state.diagraph_state.time",
+            return_value=100.0,
+        )
+        state = DiagraphState()
+        mocked_time.return_value = 200.0
+        version = state.add_timestamp()
+
+        assert state.get_wall_time(0) == pytest.approx(100.0)
+        assert state.get_wall_time(version) == pytest.approx(200.0)
+        assert state.get_wall_time(-1) is None
+
+    def test_it_can_skip_wall_clock_times():
+        state = DiagraphState(wall_clock=False)
+        version = state.add_timestamp()
+
+        assert version == 1
+        assert state.get_wall_time(version) is None
+
+
+def describe_retention():
+    def test_it_keeps_every_version_by_default():
+        state = DiagraphState()
+        for i in range(10):
+            state[tuple("foo")] = i
+            state.add_timestamp()
+
+        assert len(state.timestamps) == 11
+        assert state[tuple("foo"), 0] == 0
+
+    def test_it_keeps_the_last_versions():
+        state = DiagraphState(retention=RetentionPolicy(keep_last=3, compact_every=1))
+        for i in range(10):
+            state[tuple("foo")] = i
+            state.add_timestamp()
+        state[tuple("foo")] = 10
+
+        assert list(state.timestamps) == [8, 9, 10]
+        assert state[tuple("foo"), 8] == 8
+        assert state[tuple("foo")] == 10
+        assert len(state.store.records[tuple("foo")]) == 3
+        with pytest.raises(Exception, match=r"Version 7 of o\.o\.f is no longer retained"):
+            state[tuple("foo"), 7]
+
+    def test_it_keeps_values_written_before_the_retained_versions():
+        state = DiagraphState(retention=RetentionPolicy(keep_last=1))
+        state[tuple("foo")] = "foo"
+        for _ in range(5):
+            state.add_timestamp()
+
+        assert list(state.timestamps) == [5]
+        assert state[tuple("foo")] == "foo"
+
+    def test_it_drops_records_that_are_only_unset():
+        state = DiagraphState(retention=RetentionPolicy(keep_last=1, compact_every=1))
+        state[tuple("foo")] = "foo"
+        state.add_timestamp()
+        state[tuple("foo")] = DiagraphStateValueEmpty()
+        state.add_timestamp()
+
+        assert tuple("foo") not in state.store.records
+
+    def test_it_compacts_the_store_once_every_few_versions(mocker):
+        state = DiagraphState(retention=RetentionPolicy(keep_last=2, compact_every=3))
+        compact = mocker.spy(state.store, "compact")
+        for i in range(8):
+            state[tuple("foo")] = i
+            state.add_timestamp()
+
+        assert list(state.timestamps) == [7, 8]
+        assert [call.args for call in compact.call_args_list] == [(3,), (6,)]
+        assert state[tuple("foo"), 7] == 7
+        with pytest.raises(Exception, match="no longer retained"):
+            state[tuple("foo"), 6]
+
+    def test_it_compacts_the_store_when_asked(mocker):
+        state = DiagraphState(retention=RetentionPolicy(keep_last=1, compact_every=100))
+        state[tuple("foo")] = "foo"
+        state.add_timestamp()
+        state[tuple("foo")] = DiagraphStateValueEmpty()
+        state.add_timestamp()
+        assert tuple("foo") in state.store.records
+
+        state.compact()
+        assert tuple("foo") not in state.store.records
+
+    def test_it_keeps_versions_by_age(mocker):
+        mocked_time = mocker.patch(
+            "diagraph.classes.diagraph_state.diagraph_state.time",
+            return_value=100.0,
+        )
+        state = DiagraphState(retention=RetentionPolicy(max_age=10))
+        for i in range(5):
+            mocked_time.return_value = 100.0 + i * 5
+            state.add_timestamp()
+
+        assert list(state.timestamps) == [3, 4, 5]
+        assert list(state.wall_times) == [110.0, 115.0, 120.0]
+
+    def test_it_requires_wall_clock_times_to_keep_by_age():
+        with pytest.raises(Exception, match="requires wall_clock=True"):
+            DiagraphState(wall_clock=False, retention=RetentionPolicy(max_age=10))
+
+    def test_it_compacts_on_demand():
+        state = DiagraphState()
+        for i in range(5):
+            state[tuple("foo")] = i
+            state.add_timestamp()
+
+        state.compact(RetentionPolicy(keep_last=2))
+        assert list(state.timestamps) == [4, 5]
+        assert state[tuple("foo"), 4] == 4
+
+    def test_it_requires_a_policy_to_compact():
+        with pytest.raises(Exception, match="No retention policy"):
+            DiagraphState().compact()
+
+
+def describe_lookups():
+    def test_it_gets_values():
+        state = DiagraphState()
+        state[tuple("foo")] = "foo"
+        assert state.get(tuple("foo")) == "foo"
+        assert state.get(tuple("bar")) is None
+        assert state.get(tuple("bar"), "default") == "default"
+
+    def test_it_gets_falsy_values():
+        state = DiagraphState()
+        state[tuple("foo")] = None
+        assert state.has(tuple("foo")) is True
+        assert state.get(tuple("foo"), "default") is None
+
+    def test_it_checks_for_values():
+        state = DiagraphState()
+        state[tuple("foo")] = "foo"
+        state[tuple("bar")] = DiagraphStateValueEmpty()
+        assert state.has(tuple("foo")) is True
+        assert state.has(tuple("bar")) is False
+        assert state.has(tuple("baz")) is False
+
+    def test_it_says_why_a_lookup_missed():
+        state = DiagraphState(retention=RetentionPolicy(keep_last=1))
+        state[tuple("foo")] = "foo"
+        state.add_timestamp()
+        state[tuple("bar")] = DiagraphStateValueEmpty()
+
+        assert state.lookup(tuple("foo")) == "foo"
+        assert state.lookup(tuple("baz")).reason == "missing"
+        assert state.lookup(tuple("bar")).reason == "unset"
+        assert state.lookup((tuple("foo"), 0)).reason == "expired"
+        assert not state.lookup(tuple("baz"))
+
+    def test_it_does_not_describe_misses_unless_asked(mocker):
+        state = DiagraphState()
+        state[tuple("foo")] = "foo"
+        describe = mocker.patch.object(type(state.store), "__str__", return_value="records")
+
+        miss = state.lookup(tuple("bar"))
+        assert isinstance(miss, StateMiss)
+        assert state.get(tuple("bar")) is None
+        with pytest.raises(StateLookupError) as e:
+            state[tuple("bar")]
+        describe.assert_not_called()
+
+        assert str(e.value) == "No record for r.a.b, records"
+        assert str(miss) == "No record for r.a.b, records"
+        assert describe.call_count == 2
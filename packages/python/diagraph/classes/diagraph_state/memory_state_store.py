@@ -0,0 +1,47 @@
+from .diagraph_state_record import DiagraphStateRecord, RecordValue
+from .state_store import StateStore
+from .types import StateKey, StateValue
+
+
+class MemoryStateStore(StateStore):
+    """
+    Keeps state in memory, with one DiagraphStateRecord per key.
+
+    This is the default store. Values are held by reference and never copied.
+    """
+
+    records: dict[StateKey, DiagraphStateRecord]
+
+    def __init__(self) -> None:
+        self.records = {}
+
+    def get(self, key: StateKey, timestamp: int) -> RecordValue | None:
+        record = self.records.get(key)
+        if record is None:
+            return None
+        return record[timestamp]
+
+    def set(self, key: StateKey, timestamp: int, value: StateValue) -> None:
+        record = self.records.get(key)
+        if record is None:
+            record = DiagraphStateRecord()
+            self.records[key] = record
+        record[timestamp] = value
+
+    def has(self, key: StateKey) -> bool:
+        return key in self.records
+
+    def compact(self, oldest: int) -> None:
+        compacted = []
+        for key, record in list(self.records.items()):
+            record.compact(oldest)
+            if record.is_empty:
+                compacted.append(key)
+        for key in compacted:
+            del self.records[key]
+
+    def fork(self) -> StateStore:
+        return MemoryStateStore()
+
+    def __str__(self) -> str:
+        return str({key: str(val) for key, val in self.records.items()})
@@ -0,0 +1,77 @@
+from array import array
+from bisect import bisect_left
+
+
+class RetentionPolicy:
+    """
+    Decides how much history a DiagraphState keeps.
+
+    A policy can keep the last N versions, the versions created within a
+    maximum age, or both, in which case a version must satisfy both limits to
+    be kept. `RetentionPolicy(keep_last=1)` keeps only the latest version. The
+    current version is always kept.
+
+    Forgetting a version is cheap, but clearing the values nothing can see
+    any more means walking the whole store, so that only happens once every
+    `compact_every` forgotten versions.
+    """
+
+    keep_last: int | None
+    max_age: float | None
+    compact_every: int
+
+    def __init__(
+        self,
+        keep_last: int | None = None,
+        max_age: float | None = None,
+        compact_every: int = 32,
+    ) -> None:
+        """
+        Initialize a RetentionPolicy.
+
+        Args:
+            keep_last (int | None): The number of most recent versions to keep.
+            max_age (float | None): The maximum age, in seconds, of the versions to keep.
+            compact_every (int): How many versions to forget before clearing
+                                 unreachable values from the store.
+        """
+        if keep_last is None and max_age is None:
+            raise Exception("A retention policy requires keep_last or max_age")
+        if keep_last is not None and keep_last < 1:
+            raise Exception(f"keep_last must be at least 1, got {keep_last}")
+        if max_age is not None and max_age < 0:
+            raise Exception(f"max_age must not be negative, got {max_age}")
+        if compact_every < 1:
+            raise Exception(f"compact_every must be at least 1, got {compact_every}")
+        self.keep_last = keep_last
+        self.max_age = max_age
+        self.compact_every = compact_every
+
+    def get_oldest_retained_index(
+        self,
+        timestamps: array,
+        wall_times: array | None,
+        now: float,
+    ) -> int:
+        """
+        Get the index of the oldest version to keep.
+
+        Args:
+            timestamps (array): The versions, oldest first.
+            wall_times (array | None): The wall-clock time of every version, if recorded.
+            now (float): The current time, in seconds since the epoch.
+
+        Returns:
+            int: The index into `timestamps` of the oldest version to keep.
+        """
+        start = 0
+        if self.keep_last is not None:
+            start = max(start, len(timestamps) - self.keep_last)
+        if self.max_age is not None and wall_times is not None:
+            start = max(start, bisect_left(wall_times, now - self.max_age))
+        return min(start, len(timestamps) - 1)
+
+    def __str__(self) -> str:
+        return (
+            f"RetentionPolicy<keep_last={self.keep_last}, max_age={self.max_age}, compact_every={self.compact_every}>"
+        )
@@ -0,0 +1,57 @@
+from array import array
+
+import pytest
+
+from .retention_policy import RetentionPolicy
+
+
+def describe_retention_policy():
+    def test_it_requires_a_limit():
+        with pytest.raises(Exception, match="requires keep_last or max_age"):
+            RetentionPolicy()
+
+    @pytest.mark.parametrize(
+        ("kwargs", "match"),
+        [
+            ({"keep_last": 0}, "keep_last must be at least 1"),
+            ({"max_age": -1}, "max_age must not be negative"),
+            ({"keep_last": 1, "compact_every": 0}, "compact_every must be at least 1"),
+        ],
+    )
+    def test_it_validates_limits(kwargs, match):
+        with pytest.raises(Exception, match=match):
+            RetentionPolicy(**kwargs)
+
+    @pytest.mark.parametrize(
+        ("keep_last", "expectation"),
+        [
+            (1, 4),
+            (2, 3),
+            (5, 0),
+            (10, 0),
+        ],
+    )
+    def test_it_keeps_the_last_versions(keep_last, expectation):
+        timestamps = array("q", range(5))
+        policy = RetentionPolicy(keep_last=keep_last)
+        assert policy.get_oldest_retained_index(timestamps, None, 0) == expectation
+
+    def test_it_keeps_versions_by_age():
+        timestamps = array("q", range(5))
+        wall_times = array("d", [10, 20, 30, 40, 50])
+        policy = RetentionPolicy(max_age=15)
+        assert policy.get_oldest_retained_index(timestamps, wall_times, 50) == 3
+
+    def test_it_always_keeps_the_current_version():
+        timestamps = array("q", range(5))
+        wall_times = array("d", [10, 20, 30, 40, 50])
+        policy = RetentionPolicy(max_age=0)
+        assert policy.get_oldest_retained_index(timestamps, wall_times, 100) == 4
+
+    def test_it_applies_both_limits():
+        timestamps = array("q", range(5))
+        wall_times = array("d", [10, 20, 30, 40, 50])
+        policy = RetentionPolicy(keep_last=4, max_age=25)
+        assert policy.get_oldest_retained_index(timestamps, wall_times, 50) == 2
+        policy = RetentionPolicy(keep_last=1, max_age=25)
+        assert policy.get_oldest_retained_index(timestamps, wall_times, 50) == 4
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import copy
+import inspect
+import io
+import pickle
+import sqlite3
+import threading
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .diagraph_state_record import (
+    EMPTY,
+    DiagraphStateValue,
+    DiagraphStateValueEmpty,
+    RecordValue,
+)
+from .state_store import StateStore
+from .types import StateKey, StateValue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    empty INTEGER NOT NULL,
+    value BLOB,
+    PRIMARY KEY (namespace, key, version)
+) WITHOUT ROWID
+"""
+
+Row = tuple[int, bytes | None]
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Keeps state in a SQLite database, so history can outgrow memory, be
+    queried with SQL, and survive restarts.
+
+    Rows are keyed on (namespace, key, version), so a lookup is a single index
+    seek. Writes are buffered and inserted in batches, and the database runs in
+    WAL mode so readers are not blocked by a write in progress. A Diagraph
+    flushes its store whenever a run completes; anything written outside a
+    run is persisted once a batch fills up, or on `flush` or `close`.
+
+    Values are pickled. Functions are stored by their qualified name and are
+    restored to the function registered under that name, which is every
+    function this store has seen as part of a key. Functions that share a
+    qualified name, such as closures made by the same factory, are numbered
+    in the order the store first sees them, which for a Diagraph is the order
+    of its graph. Errors that cannot be pickled are stored as an
+    UnpicklableError carrying their repr, so a node that raises one still
+    records its failure.
+
+    Forks share their parent's connection, so closing a fork only flushes it.
+    """
+
+    path: str
+    namespace: str
+    batch_size: int
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        namespace: str = "",
+        batch_size: int = 100,
+    ) -> None:
+        """
+        Initialize a SQLiteStateStore.
+
+        Args:
+            path (str | Path): The database file, created if it does not exist. Defaults to an in-memory database.
+            namespace (str): Isolates this store's rows from other stores sharing the same file.
+            batch_size (int): The number of writes to buffer before inserting them.
+        """
+        if batch_size < 1:
+            raise Exception(f"Batch size must be at least 1, got {batch_size}")
+        self.path = str(path)
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.__lock__ = threading.RLock()
+        self.__pending__: dict[str, dict[int, Row]] = {}
+        self.__pending_count__ = 0
+        self.__fns__: dict[Callable, str] = {}
+        self.__fns_by_name__: dict[str, Callable] = {}
+        self.__fork_of__: SQLiteStateStore | None = None
+        self.__connection__ = sqlite3.connect(self.path, check_same_thread=False)
+        self.__connection__.execute("PRAGMA journal_mode=WAL")
+        self.__connection__.execute("PRAGMA synchronous=NORMAL")
+        self.__connection__.execute(SCHEMA)
+        self.__connection__.commit()
+
+    def get(self, key: StateKey, timestamp: int) -> RecordValue | None:
+        encoded_key = self.__encode_key__(key)
+        with self.__lock__:
+            best: tuple[int, Row] | None = None
+            pending = self.__pending__.get(encoded_key)
+            if pending is not None:
+                versions = [version for version in pending if version <= timestamp]
+                if len(versions):
+                    version = max(versions)
+                    best = (version, pending[version])
+
+            row = self.__connection__.execute(
+                "SELECT version, empty, value FROM state"
+                " WHERE namespace = ? AND key = ? AND version <= ?"
+                " ORDER BY version DESC LIMIT 1",
+                (self.namespace, encoded_key, timestamp),
+            ).fetchone()
+            if row is not None and (best is None or row[0] > best[0]):
+                best = (row[0], (row[1], row[2]))
+
+            if best is None:
+                return EMPTY if self.__has__(encoded_key) else None
+            empty, value = best[1]
+            if empty:
+                return EMPTY
+            return DiagraphStateValue(self.__loads__(value))
+
+    def set(self, key: StateKey, timestamp: int, value: StateValue) -> None:
+        encoded_key = self.__encode_key__(key)
+        if isinstance(value, DiagraphStateValueEmpty):
+            row: Row = (1, None)
+        elif isinstance(value, BaseException):
+            row = (0, self.__dumps_error__(value))
+        else:
+            try:
+                row = (0, self.__dumps__(value))
+            except Exception as e:
+                raise Exception(f"Cannot store the value for {encoded_key}: {e}") from e
+        with self.__lock__:
+            pending = self.__pending__.setdefault(encoded_key, {})
+            if timestamp not in pending:
+                self.__pending_count__ += 1
+            pending[timestamp] = row
+            if self.__pending_count__ >= self.batch_size:
+                self.flush()
+
+    def has(self, key: StateKey) -> bool:
+        encoded_key = self.__encode_key__(key)
+        with self.__lock__:
+            return self.__has__(encoded_key)
+
+    def __has__(self, encoded_key: str) -> bool:
+        if encoded_key in self.__pending__:
+            return True
+        row = self.__connection__.execute(
+            "SELECT 1 FROM state WHERE namespace = ? AND key = ? LIMIT 1",
+            (self.namespace, encoded_key),
+        ).fetchone()
+        return row is not None
+
+    def compact(self, oldest: int) -> None:
+        with self.__lock__:
+            self.flush()
+            connection = self.__connection__
+            connection.execute(
+                "DELETE FROM state WHERE namespace = :namespace AND version < ("
+                " SELECT MAX(newest.version) FROM state AS newest"
+                " WHERE newest.namespace = state.namespace AND newest.key = state.key"
+                " AND newest.version <= :oldest)",
+                {"namespace": self.namespace, "oldest": oldest},
+            )
+            connection.execute(
+                "DELETE FROM state WHERE namespace = :namespace AND key IN ("
+                " SELECT key FROM state WHERE namespace = :namespace"
+                " GROUP BY key HAVING MIN(empty) = 1)",
+                {"namespace": self.namespace},
+            )
+            connection.commit()
+
+    def get_latest_timestamp(self) -> int | None:
+        with self.__lock__:
+            self.flush()
+            row = self.__connection__.execute(
+                "SELECT MAX(version) FROM state WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+            return row[0]
+
+    def fork(self) -> StateStore:
+        """
+        Create an empty store in the same database, under a new namespace.
+
+        The fork shares this store's connection, lock and registered functions,
+        and keeps its own buffer of pending writes.
+        """
+        with self.__lock__:
+            fork = copy.copy(self)
+            fork.namespace = f"{self.namespace}{uuid.uuid4().hex}"
+            fork.__pending__ = {}
+            fork.__pending_count__ = 0
+            fork.__fork_of__ = self
+        return fork
+
+    def flush(self) -> None:
+        with self.__lock__:
+            if self.__pending_count__ == 0:
+                return
+            rows = [
+                (self.namespace, key, version, empty, value)
+                for key, versions in self.__pending__.items()
+                for version, (empty, value) in versions.items()
+            ]
+            self.__connection__.executemany(
+                "INSERT OR REPLACE INTO state (namespace, key, version, empty, value) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.__connection__.commit()
+            self.__pending__ = {}
+            self.__pending_count__ = 0
+
+    def close(self) -> None:
+        with self.__lock__:
+            self.flush()
+            # the connection belongs to the store that was forked
+            if self.__fork_of__ is None:
+                self.__connection__.close()
+
+    def __encode_key__(self, key: StateKey) -> str:
+        if isinstance(key, str):
+            return key
+        return "/".join(part if isinstance(part, str) else self.__register__(part) for part in key)
+
+    def __register__(self, fn: Callable) -> str:
+        name = self.__fns__.get(fn)
+        if name is None:
+            with self.__lock__:
+                name = self.__fns__.get(fn)
+                if name is None:
+                    qualified_name = f"{fn.__module__}.{fn.__qualname__}"
+                    name = qualified_name
+                    count = 1
+                    while name in self.__fns_by_name__:
+                        count += 1
+                        name = f"{qualified_name}#{count}"
+                    self.__fns__[fn] = name
+                    self.__fns_by_name__[name] = fn
+        return name
+
+    def __dumps__(self, value: StateValue) -> bytes:
+        buffer = io.BytesIO()
+        StatePickler(buffer, self).dump(value)
+        return buffer.getvalue()
+
+    def __dumps_error__(self, error: BaseException) -> bytes:
+        try:
+            dumped = self.__dumps__(error)
+            # exceptions with required constructor arguments pickle, but fail to load
+            self.__loads__(dumped)
+        except Exception:
+            return self.__dumps__(UnpicklableError(error))
+        return dumped
+
+    def __loads__(self, value: bytes | None) -> StateValue:
+        return StateUnpickler(io.BytesIO(value or b""), self).load()
+
+    def __str__(self) -> str:
+        return f"SQLiteStateStore<{self.path}, namespace={self.namespace!r}>"
+
+
+class UnpicklableError(Exception):
+    """
+    Stored in place of an error that cannot be pickled.
+    """
+
+    error_type: str
+
+    def __init__(self, error: BaseException | str, error_type: str | None = None) -> None:
+        if isinstance(error, BaseException):
+            error_type = type(error).__qualname__
+            error = repr(error)
+        self.error_type = error_type or "Exception"
+        super().__init__(error)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (self.__class__, (str(self), self.error_type))
+
+
+class StatePickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, store: SQLiteStateStore) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+
+    def persistent_id(self, obj: Any) -> Any:
+        if inspect.isfunction(obj):
+            return ("fn", self.store.__register__(obj))
+        return None
+
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, store: SQLiteStateStore) -> None:
+        super().__init__(file)
+        self.store = store
+
+    def persistent_load(self, pid: Any) -> Any:
+        kind, name = pid
+        if kind != "fn":
+            raise pickle.UnpicklingError(f"Unsupported persistent id: {pid}")
+        # functions from a previous process that have not been seen yet are restored as their names
+        return self.store.__fns_by_name__.get(name, name)
@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+from .sqlite_state_store import SQLiteStateStore, UnpicklableError
+
+
+def foo():
+    return "foo"
+
+
+class RequiresArguments(Exception):
+    def __init__(self, a, b):
+        super().__init__(f"{a} {b}")
+
+
+def describe_sqlite_state_store():
+    def test_it_uses_wal_mode(tmp_path):
+        store = SQLiteStateStore(tmp_path / "state.db")
+        store.close()
+        connection = sqlite3.connect(tmp_path / "state.db")
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    def test_it_batches_writes(tmp_path):
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path, batch_size=3)
+        connection = sqlite3.connect(path)
+
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 2, "bar")
+        assert connection.execute("SELECT COUNT(*) FROM state").fetchone() == (0,)
+        assert store.get(("result", foo), 2).value == "bar"
+
+        store.set(("result", foo), 3, "baz")
+        assert connection.execute("SELECT COUNT(*) FROM state").fetchone() == (3,)
+        store.close()
+
+    def test_it_survives_restarts(tmp_path):
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path)
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 4, {"fn": foo})
+        store.close()
+
+        store = SQLiteStateStore(path)
+        assert store.get_latest_timestamp() == 4
+        assert store.get(("result", foo), 2).value == "foo"
+        assert store.get(("result", foo), 4).value == {"fn": foo}
+        store.close()
+
+    def test_it_isolates_namespaces(tmp_path):
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path, namespace="a")
+        fork = store.fork()
+        store.set(("result", foo), 1, "foo")
+        fork.set(("result", foo), 2, "bar")
+        store.flush()
+        fork.flush()
+
+        assert store.get(("result", foo), 2).value == "foo"
+        assert fork.get(("result", foo), 1) is not None
+        assert fork.get(("result", foo), 2).value == "bar"
+        assert fork.namespace.startswith("a")
+        assert store.get_latest_timestamp() == 1
+        store.close()
+        fork.close()
+
+    def test_it_stores_functions_by_name(tmp_path):
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path, batch_size=1)
+        store.set(("result", foo), 1, "foo")
+        store.close()
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT key FROM state").fetchone() == (f"result/{__name__}.foo",)
+
+    def test_it_numbers_functions_with_the_same_name(tmp_path):
+        def make():
+            def bar():
+                pass
+
+            return bar
+
+        path = tmp_path / "state.db"
+        first, second = make(), make()
+        store = SQLiteStateStore(path)
+        store.set(("result", first), 1, "foo")
+        store.set(("result", second), 1, "bar")
+        assert store.get(("result", first), 1).value == "foo"
+        assert store.get(("result", second), 1).value == "bar"
+        store.close()
+
+        connection = sqlite3.connect(path)
+        name = f"result/{__name__}.{first.__qualname__}"
+        assert connection.execute("SELECT key FROM state ORDER BY key").fetchall() == [(name,), (f"{name}#2",)]
+
+    def test_it_shares_a_connection_with_forks(tmp_path):
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path)
+        fork = store.fork()
+        fork.set(("result", foo), 1, "foo")
+        fork.close()
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT COUNT(*) FROM state").fetchone() == (1,)
+        # closing the fork leaves its parent open
+        store.set(("result", foo), 1, "bar")
+        assert store.get(("result", foo), 1).value == "bar"
+        assert fork.get(("result", foo), 1).value == "foo"
+        store.close()
+
+    def test_it_raises_for_values_it_cannot_store():
+        store = SQLiteStateStore()
+        with pytest.raises(Exception, match="Cannot store the value for result"):
+            store.set(("result", foo), 1, (i for i in range(3)))
+
+    def test_it_stores_a_stand_in_for_errors_it_cannot_pickle():
+        class HoldsAGenerator(Exception):
+            def __init__(self):
+                super().__init__("holds a generator")
+                self.generator = (i for i in range(3))
+
+        store = SQLiteStateStore()
+        store.set(("error", foo), 1, HoldsAGenerator())
+        error = store.get(("error", foo), 1).value
+        assert isinstance(error, UnpicklableError)
+        assert error.error_type.endswith(".HoldsAGenerator")
+        assert str(error) == "HoldsAGenerator('holds a generator')"
+
+    def test_it_stores_a_stand_in_for_errors_it_cannot_unpickle():
+        store = SQLiteStateStore()
+        store.set(("error", foo), 1, RequiresArguments("a", "b"))
+        error = store.get(("error", foo), 1).value
+        assert isinstance(error, UnpicklableError)
+        assert error.error_type == "RequiresArguments"
+
+    def test_it_stores_errors_it_can_pickle():
+        store = SQLiteStateStore()
+        store.set(("error", foo), 1, ValueError("foo"))
+        error = store.get(("error", foo), 1).value
+        assert type(error) is ValueError
+        assert str(error) == "foo"
+
+    def test_it_validates_the_batch_size():
+        with pytest.raises(Exception, match="Batch size must be at least 1"):
+            SQLiteStateStore(batch_size=0)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Literal
+
+from .types import StateKey
+
+if TYPE_CHECKING:
+    from .state_store import StateStore
+
+MissReason = Literal["missing", "unset", "expired"]
+
+# a store can hold the errors of earlier failed lookups, which would describe the store again
+__describing__ = threading.local()
+
+
+class StateMiss:
+    """
+    Returned by `DiagraphState.lookup` in place of a value that cannot be read.
+
+    The reason says why: nothing was ever recorded for the key ("missing"),
+    the value was explicitly unset ("unset"), or the version asked for is no
+    longer retained ("expired"). Misses are falsy, and only describe
+    themselves when converted to a string, so a miss costs nothing until
+    somebody looks at it.
+    """
+
+    __slots__ = ("key", "reason", "store", "timestamp")
+
+    key: StateKey
+    timestamp: int
+    reason: MissReason
+    store: StateStore | None
+
+    def __init__(
+        self,
+        key: StateKey,
+        timestamp: int,
+        reason: MissReason,
+        store: StateStore | None = None,
+    ) -> None:
+        self.key = key
+        self.timestamp = timestamp
+        self.reason = reason
+        self.store = store
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, StateMiss)
+            and self.reason == other.reason
+            and self.timestamp == other.timestamp
+            and self.key == other.key
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.reason, self.timestamp))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # the store is only there to describe the miss, and is not carried along
+        return (self.__class__, (self.key, self.timestamp, self.reason))
+
+    def __repr__(self) -> str:
+        return f"StateMiss({get_key(self.key)}, {self.timestamp}, {self.reason})"
+
+    def __str__(self) -> str:
+        if self.reason == "expired":
+            return f"Version {self.timestamp} of {get_key(self.key)} is no longer retained"
+        if self.reason == "unset":
+            return f"Value for {get_key(self.key)} is explicitly unset"
+        if self.store is None or getattr(__describing__, "active", False):
+            return f"No record for {get_key(self.key)}"
+        __describing__.active = True
+        try:
+            return f"No record for {get_key(self.key)}, {self.store}"
+        finally:
+            __describing__.active = False
+
+
+class StateLookupError(Exception):
+    """
+    Raised when a value cannot be read from a DiagraphState. The message is
+    only formatted if it is asked for.
+    """
+
+    miss: StateMiss
+
+    def __init__(self, miss: StateMiss) -> None:
+        self.miss = miss
+        super().__init__()
+
+    def __str__(self) -> str:
+        return str(self.miss)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (self.__class__, (self.miss,))
+
+
+def get_key(key: StateKey):
+    return ".".join([get_name(f) for f in reversed(list(key))])
+
+
+def get_name(f: str | Callable) -> str:
+    if isinstance(f, str):
+        return f
+    return f.__name__
@@ -0,0 +1,36 @@
+import pickle
+
+from .memory_state_store import MemoryStateStore
+from .state_miss import StateLookupError, StateMiss
+
+
+def foo():
+    return "foo"
+
+
+def describe_state_miss():
+    def test_it_is_falsy():
+        assert not StateMiss(("result", foo), 1, "missing")
+
+    def test_it_describes_each_reason():
+        assert str(StateMiss(("result", foo), 1, "expired")) == "Version 1 of foo.result is no longer retained"
+        assert str(StateMiss(("result", foo), 1, "unset")) == "Value for foo.result is explicitly unset"
+        assert str(StateMiss(("result", foo), 1, "missing")) == "No record for foo.result"
+
+    def test_it_lists_the_store_for_missing_values():
+        store = MemoryStateStore()
+        store.set(("result", foo), 0, "foo")
+        assert str(StateMiss(("error", foo), 1, "missing", store)).startswith("No record for foo.error, ")
+
+    def test_it_does_not_recurse_into_errors_held_by_the_store():
+        store = MemoryStateStore()
+        store.set(("error", foo), 0, StateLookupError(StateMiss(("result", foo), 0, "missing", store)))
+        message = str(StateMiss(("prompt", foo), 0, "missing", store))
+        assert message.startswith("No record for foo.prompt, ")
+        assert "No record for foo.result" in message
+
+    def test_it_can_be_pickled_without_its_store():
+        error = StateLookupError(StateMiss(("result", "foo"), 1, "missing", MemoryStateStore()))
+        unpickled = pickle.loads(pickle.dumps(error))
+        assert unpickled.miss == StateMiss(("result", "foo"), 1, "missing")
+        assert str(unpickled) == "No record for foo.result"
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+
+from .diagraph_state_record import RecordValue
+from .types import StateKey, StateValue
+
+
+class StateStore(metaclass=ABCMeta):
+    """
+    Where a DiagraphState keeps its versioned values.
+
+    A store holds, for every state key, the values written to it at each
+    version. Lookups resolve to the newest value written at or before the
+    requested version.
+    """
+
+    @abstractmethod
+    def get(self, key: StateKey, timestamp: int) -> RecordValue | None:
+        """
+        Get the value of a key as of a version.
+
+        Args:
+            key (StateKey): The state key.
+            timestamp (int): The version to read at.
+
+        Returns:
+            RecordValue | None: The newest value written at or before the version, an empty value
+            if there is none, or None if nothing was ever written to the key.
+        """
+        ...
+
+    @abstractmethod
+    def set(self, key: StateKey, timestamp: int, value: StateValue) -> None:
+        """
+        Write the value of a key at a version, replacing any value already written at that version.
+
+        Args:
+            key (StateKey): The state key.
+            timestamp (int): The version to write at.
+            value (StateValue): The value, or a DiagraphStateValueEmpty to unset the key.
+        """
+        ...
+
+    @abstractmethod
+    def has(self, key: StateKey) -> bool: ...
+
+    @abstractmethod
+    def compact(self, oldest: int) -> None:
+        """
+        Drop the history that no version from `oldest` onwards can see.
+
+        For every key, the newest value written at or before `oldest` is kept.
+        Keys left holding only empty values are removed entirely.
+
+        Args:
+            oldest (int): The oldest version that must still resolve.
+        """
+        ...
+
+    def get_latest_timestamp(self) -> int | None:
+        """
+        Get the newest version the store holds a value for.
+
+        Stores that outlive the process use this to let a new DiagraphState
+        resume from where the last one stopped.
+
+        Returns:
+            int | None: The newest version, or None if the store starts out empty.
+        """
+        return None
+
+    def fork(self) -> StateStore:
+        """
+        Create an empty store of the same kind, for a copy of the Diagraph.
+        """
+        from .memory_state_store import MemoryStateStore
+
+        return MemoryStateStore()
+
+    def flush(self) -> None:
+        """
+        Persist any buffered writes.
+        """
+        return
+
+    def close(self) -> None:
+        self.flush()
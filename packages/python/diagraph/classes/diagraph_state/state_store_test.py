@@ -0,0 +1,81 @@
+import pytest
+
+from .diagraph_state_record import EMPTY, DiagraphStateValue, DiagraphStateValueEmpty
+from .memory_state_store import MemoryStateStore
+from .sqlite_state_store import SQLiteStateStore
+
+
+def foo():
+    pass
+
+
+@pytest.fixture(
+    params=[
+        MemoryStateStore,
+        SQLiteStateStore,
+        lambda: SQLiteStateStore(batch_size=1),
+    ],
+    ids=["memory", "sqlite", "sqlite-unbatched"],
+)
+def store(request):
+    store = request.param()
+    yield store
+    store.close()
+
+
+def describe_state_store():
+    def test_it_returns_none_for_missing_keys(store):
+        assert store.get(("result", foo), 1) is None
+        assert store.has(("result", foo)) is False
+
+    def test_it_gets_values(store):
+        store.set(("result", foo), 1, "foo")
+        value = store.get(("result", foo), 1)
+        assert isinstance(value, DiagraphStateValue)
+        assert value.value == "foo"
+        assert store.has(("result", foo)) is True
+
+    def test_it_gets_the_closest_previous_value(store):
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 3, "bar")
+        assert store.get(("result", foo), 2).value == "foo"
+        assert store.get(("result", foo), 5).value == "bar"
+
+    def test_it_returns_empty_before_the_first_value(store):
+        store.set(("result", foo), 3, "foo")
+        assert store.get(("result", foo), 1) == EMPTY
+
+    def test_it_unsets_values(store):
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 2, DiagraphStateValueEmpty())
+        assert store.get(("result", foo), 2) == EMPTY
+        assert store.get(("result", foo), 1).value == "foo"
+
+    def test_it_overwrites_values_at_the_same_version(store):
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 1, "bar")
+        assert store.get(("result", foo), 1).value == "bar"
+
+    def test_it_stores_string_keys(store):
+        store.set("run", 1, {"input": (1,)})
+        assert store.get("run", 1).value == {"input": (1,)}
+
+    def test_it_compacts(store):
+        store.set(("result", foo), 1, "foo")
+        store.set(("result", foo), 3, "bar")
+        store.set(("result", foo), 5, "baz")
+        store.set(("error", foo), 1, "error")
+        store.set(("error", foo), 2, DiagraphStateValueEmpty())
+
+        store.compact(4)
+
+        assert store.get(("result", foo), 4).value == "bar"
+        assert store.get(("result", foo), 2) == EMPTY
+        assert store.get(("result", foo), 5).value == "baz"
+        assert store.has(("error", foo)) is False
+
+    def test_it_forks_to_an_empty_store(store):
+        store.set(("result", foo), 1, "foo")
+        fork = store.fork()
+        assert isinstance(fork, type(store))
+        assert fork.has(("result", foo)) is False
@@ -49,6 +49,42 @@ def describe_nodes():
         assert isinstance(node, DiagraphNode)
         assert node.fn == foo
 
+    def test_it_returns_the_same_node_for_a_key():
+        def foo():
+            return "foo"
+
+        def bar(foo: str = Depends(foo)):
+            return "bar"
+
+        dg = Diagraph(bar)
+
+        node = dg[foo]
+        assert dg[foo] is node
+        assert dg[bar].ancestors[0] is node
+        assert dg[(foo, bar)][0] is node
+        assert dg[0][0] is node
+        assert dg.terminal_nodes[0] is dg[bar]
+        assert {n.key: n for n in dg.nodes}[foo] is node
+
+    def test_it_does_not_share_nodes_with_forks():
+        def foo():
+            return "foo"
+
+        dg = Diagraph(foo)
+        fork = dg.__fork__()
+        assert fork[foo] is not dg[foo]
+        assert fork[foo].diagraph is fork
+        assert fork.terminal_nodes[0] is fork[foo]
+
+    def test_it_creates_nodes_without_attribute_dicts():
+        def foo():
+            return "foo"
+
+        node = Diagraph(foo)[foo]
+        assert not hasattr(node, "__dict__")
+        with pytest.raises(AttributeError):
+            node.foo = "foo"
+
     def describe_string_keys():
         def test_it_gets_back_a_node_wrapper_for_a_function_using_string_keys():
             def foo():
@@ -60,6 +96,15 @@ def describe_nodes():
             assert isinstance(node, DiagraphNode)
             assert node.fn == foo
 
+        def test_it_returns_the_same_node_for_a_name_and_its_function():
+            def foo():
+                return "foo"
+
+            dg = Diagraph(foo, use_string_keys=True, node_dict={"foo": foo})
+
+            assert dg["foo"] is dg[(foo,)][0]
+            assert dg[(foo,)][0] is dg[("foo",)][0]
+
         def test_it_can_run_from_a_string_key():
             def foo():
                 return "foo"
@@ -472,3 +517,61 @@ def describe_indexing():
             layer = get_layer(diagraph, index)
             for node in nodes:
                 assert node in layer
+
+
+def describe_execution_plans():
+    def test_it_computes_the_plan_for_a_set_of_starting_nodes_once(mocker):
+        spy = mocker.spy(_diagraph, "get_execution_graph")
+
+        def foo():
+            return "foo"
+
+        def bar(foo: str = Depends(foo)):
+            return f"{foo}bar"
+
+        def baz(bar: str = Depends(bar)):
+            return f"{bar}baz"
+
+        diagraph = Diagraph(baz)
+        assert diagraph[0][0].fn == foo
+        assert diagraph[-1][0].fn == baz
+        assert diagraph.run().result == "foobarbaz"
+        assert diagraph.run().result == "foobarbaz"
+        assert spy.call_count == 1
+
+        diagraph[bar].run()
+        diagraph[bar].run()
+        assert spy.call_count == 2
+
+    def test_it_recomputes_plans_when_a_function_is_replaced(mocker):
+        spy = mocker.spy(_diagraph, "get_execution_graph")
+
+        def foo():
+            return "foo"
+
+        def bar(foo: str = Depends(foo)):
+            return f"{foo}bar"
+
+        def new_foo():
+            return "new_foo"
+
+        diagraph = Diagraph(bar)
+        assert diagraph.run().result == "foobar"
+        diagraph[foo] = new_foo
+        assert diagraph.run().result == "new_foobar"
+        assert spy.call_count == 2
+
+    def test_it_gets_layers_for_string_keys():
+        def foo():
+            return "foo"
+
+        def bar(foo: str = Depends("foo")):
+            return f"{foo}bar"
+
+        diagraph = Diagraph(
+            bar,
+            use_string_keys=True,
+            node_dict={"foo": foo, "bar": bar},
+        )
+        assert diagraph[0][0].fn == foo
+        assert diagraph[-1][0].fn == bar
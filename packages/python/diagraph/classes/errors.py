@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Any, Literal
+
+from .types import KeyIdentifier
+
+TimeoutScope = Literal["node", "run"]
+
+
+def get_name(key: KeyIdentifier) -> str:
+    return getattr(key, "__name__", str(key))
+
+
+class NodeTimeoutError(Exception):
+    """
+    Recorded as the error of a node that did not finish in time, either
+    because it exceeded its own timeout or because the run did.
+    """
+
+    key: KeyIdentifier
+    timeout: float
+    scope: TimeoutScope
+
+    def __init__(self, key: KeyIdentifier, timeout: float, scope: TimeoutScope = "node") -> None:
+        self.key = key
+        self.timeout = timeout
+        self.scope = scope
+        if scope == "run":
+            message = f'The run timed out after {timeout} seconds, before "{get_name(key)}" finished'
+        else:
+            message = f'"{get_name(key)}" timed out after {timeout} seconds'
+        super().__init__(message)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (self.__class__, (self.key, self.timeout, self.scope))
+
+
+class NodeCancelledError(Exception):
+    """
+    Cancels a node that was still running when a fail-fast run stopped.
+    """
+
+    key: KeyIdentifier
+
+    def __init__(self, key: KeyIdentifier) -> None:
+        self.key = key
+        super().__init__(f'"{get_name(key)}" was cancelled because another node failed')
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (self.__class__, (self.key,))
+
+
+class DependencyError(Exception):
+    """
+    Raised when a node cannot run because one of its dependencies has no
+    result, either because the dependency failed or because it has not run.
+    """
+
+    key: KeyIdentifier
+
+    def __init__(self, key: KeyIdentifier, message: str) -> None:
+        self.key = key
+        super().__init__(message)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (self.__class__, (self.key, str(self)))
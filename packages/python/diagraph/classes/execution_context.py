@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .types import FunctionLogHandler, KeyIdentifier
+
+if TYPE_CHECKING:
+    from ..llm.llm import LLM
+    from ..llm.rate_limiter import RateLimiter
+    from .cancellation_token import CancellationToken
+    from .diagraph_node import DiagraphNode
+    from .diagraph_state.diagraph_state import DiagraphState
+
+
+class ExecutionContext:
+    """
+    Everything a node needs from the run that is executing it.
+
+    A context is created for every node execution and handed to the node
+    explicitly, so runs that share functions never share mutable state.
+    """
+
+    node: DiagraphNode
+    llm: LLM | None
+    log: FunctionLogHandler | None
+    state: DiagraphState
+    rate_limiter: RateLimiter | None
+    cancellation: CancellationToken | None
+
+    def __init__(
+        self,
+        node: DiagraphNode,
+        llm: LLM | None,
+        log: FunctionLogHandler | None,
+        state: DiagraphState,
+        rate_limiter: RateLimiter | None = None,
+        cancellation: CancellationToken | None = None,
+    ) -> None:
+        """
+        Initialize an ExecutionContext.
+
+        Args:
+            node (DiagraphNode): The node being executed.
+            llm (LLM | None): The LLM configured on the Diagraph, if any.
+            log (FunctionLogHandler | None): The Diagraph's log handler, bound to the node's function.
+            state (DiagraphState): The state of the run.
+            rate_limiter (RateLimiter | None): The rate limiter configured on the Diagraph, if any.
+            cancellation (CancellationToken | None): Tells the node if it has been cancelled.
+        """
+        self.node = node
+        self.llm = llm
+        self.log = log
+        self.state = state
+        self.rate_limiter = rate_limiter
+        self.cancellation = cancellation
+
+    @property
+    def key(self) -> KeyIdentifier:
+        return self.node.key
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raise the node's timeout error if the node has been cancelled.
+
+        Nodes cannot be stopped from the outside, so long-running work should
+        call this periodically to stop early once its result will be discarded.
+        """
+        if self.cancellation is not None:
+            self.cancellation.raise_if_cancelled()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from collections.abc import Mapping
-from typing import Generic, TypeVar
+from array import array
+from collections.abc import Iterator, Mapping
+from typing import Any, Generic, TypeVar
 
 import networkx as nx
 
@@ -11,30 +12,75 @@ K = TypeVar("K")
 
 
 class Graph(Generic[K]):
-    __G__: nx.DiGraph
+    """
+    An immutable directed acyclic graph.
+
+    Nodes are numbered in the order they are first encountered in the graph
+    definition, and edges are stored as compressed sparse rows: for every node,
+    `__out_offsets__[i]:__out_offsets__[i + 1]` is the slice of `__out_targets__`
+    holding its dependencies (out edges), and the `__in_*__` arrays hold the
+    reverse adjacency (in edges).
+    """
+
     __key_to_int__: dict[K, int]
+    __int_to_key__: list[K]
+    __out_offsets__: array
+    __out_targets__: array
+    __in_offsets__: array
+    __in_targets__: array
+    __out_view__: memoryview
+    __in_view__: memoryview
+    __root_ints__: array
+    __reachability__: list[bytes] | None
     graph_def: dict[K, list[K]]
 
     def __init__(self, graph_def: Mapping[K, list[K] | OrderedSet[K]]):
         self.graph_def = {key: list(val) for key, val in graph_def.items()}
         self.__key_to_int__ = {}
-        self.__G__ = nx.convert_node_labels_to_integers(
-            nx.DiGraph(self.graph_def),
-            label_attribute="ref",
+        self.__int_to_key__ = []
+
+        for key in self.graph_def:
+            self.__add_node__(key)
+        for deps in self.graph_def.values():
+            for dep in deps:
+                self.__add_node__(dep)
+
+        size = len(self.__int_to_key__)
+        out_edges: list[list[int]] = [[] for _ in range(size)]
+        in_edges: list[list[int]] = [[] for _ in range(size)]
+        for key, deps in self.graph_def.items():
+            source = self.__key_to_int__[key]
+            seen: set[int] = set()
+            for dep in deps:
+                target = self.__key_to_int__[dep]
+                if target not in seen:
+                    seen.add(target)
+                    out_edges[source].append(target)
+                    in_edges[target].append(source)
+
+        self.__out_offsets__, self.__out_targets__ = to_csr(out_edges)
+        self.__in_offsets__, self.__in_targets__ = to_csr(in_edges)
+        self.__out_view__ = memoryview(self.__out_targets__)
+        self.__in_view__ = memoryview(self.__in_targets__)
+        self.__root_ints__ = array(
+            "l",
+            [i for i in range(size) if len(out_edges[i]) == 0],
         )
+        self.__reachability__ = None
 
-        for int_representation in self.__G__.nodes():
-            ref = self.__G__.nodes[int_representation]["ref"]
-            self.__key_to_int__[ref] = int_representation
+    def __add_node__(self, key: K) -> None:
+        if key not in self.__key_to_int__:
+            self.__key_to_int__[key] = len(self.__int_to_key__)
+            self.__int_to_key__.append(key)
 
     def get_nodes(self) -> list[K]:
-        return [self.__G__.nodes[int_rep]["ref"] for int_rep in self.__G__.nodes()]
+        return list(self.__int_to_key__)
 
     def get_int_key_for_node(self, key: K) -> int:
         return self.__key_to_int__[key]
 
     def get_node_for_int_key(self, key: int) -> K:
-        return self.__G__.nodes[key]["ref"]
+        return self.__int_to_key__[key]
 
     def __getitem__(self, key: K):
         return key
@@ -42,48 +88,168 @@ class Graph(Generic[K]):
     def __setitem__(self, old: K, new: K):
         self.__key_to_int__[new] = self.__key_to_int__[old]
         del self.__key_to_int__[old]
-        self.__G__.nodes[self.__key_to_int__[new]]["ref"] = new
+        self.__int_to_key__[self.__key_to_int__[new]] = new
+
+    def depends_on(self, key: K, dependency: K) -> bool:
+        """
+        Check whether a node depends, directly or transitively, on another node.
+
+        The transitive closure of the graph is computed on the first call and
+        reused afterwards, so every query is a constant-time bit lookup.
+
+        Args:
+            key (K): The downstream node.
+            dependency (K): The potential upstream node.
+
+        Returns:
+            bool: True if `dependency` is an ancestor of `key`, False otherwise.
+        """
+        row = self.__get_reachability__()[self.__key_to_int__[key]]
+        int_key = self.__key_to_int__[dependency]
+        return row[int_key >> 3] & (1 << (int_key & 7)) != 0
+
+    def __get_reachability__(self) -> list[bytes]:
+        reachability = self.__reachability__
+        if reachability is None:
+            reachability = get_reachability(self)
+            self.__reachability__ = reachability
+        return reachability
+
+    def __len__(self) -> int:
+        return len(self.__int_to_key__)
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        Dump the graph in node-link format.
+
+        Returns:
+            dict: The nodes, with their keys stored as "ref", and the links between them.
+        """
+        return {
+            "directed": True,
+            "multigraph": False,
+            "graph": {},
+            "nodes": [{"ref": ref, "id": i} for i, ref in enumerate(self.__int_to_key__)],
+            "links": [
+                {"source": source, "target": target}
+                for source in range(len(self))
+                for target in self.out_edge_ints(source)
+            ],
+        }
+
+    def in_edge_ints(self, int_key: int) -> memoryview:
+        """
+        Get the int ids of the nodes that depend on the given node.
+
+        The returned view is a window onto the graph's adjacency arrays; no
+        copy is made.
+        """
+        offsets = self.__in_offsets__
+        return self.__in_view__[offsets[int_key] : offsets[int_key + 1]]
+
+    def out_edge_ints(self, int_key: int) -> memoryview:
+        """
+        Get the int ids of the nodes the given node depends on.
 
-    def to_json(self):
-        return nx.node_link_data(self.__G__)
+        The returned view is a window onto the graph's adjacency arrays; no
+        copy is made.
+        """
+        offsets = self.__out_offsets__
+        return self.__out_view__[offsets[int_key] : offsets[int_key + 1]]
 
-    def in_edges(self, key: K):
-        int_key = self.get_int_key_for_node(key)
-        int_representations = [i for i, _ in list(self.__G__.in_edges(int_key))]
-        return [self.get_node_for_int_key(i) for i in int_representations]
+    def in_edges(self, key: K) -> list[K]:
+        int_to_key = self.__int_to_key__
+        return [int_to_key[i] for i in self.in_edge_ints(self.__key_to_int__[key])]
 
-    def out_edges(self, int_key: K):
-        node = self.get_int_key_for_node(int_key)
-        int_representations = [i for _, i in list(self.__G__.out_edges(node))]
-        return [self.get_node_for_int_key(i) for i in int_representations]
+    def out_edges(self, key: K) -> list[K]:
+        int_to_key = self.__int_to_key__
+        return [int_to_key[i] for i in self.out_edge_ints(self.__key_to_int__[key])]
 
     @property
     def nodes(self) -> list[K]:
-        return [self.get_node_for_int_key(i) for i in self.__G__.nodes()]
+        return list(self.__int_to_key__)
 
     @property
     def root_nodes(self) -> list[K]:
-        int_keys: list[int] = [
-            n for n in self.__G__.nodes() if self.__G__.out_degree(n) == 0
-        ]
-        return [self.get_node_for_int_key(i) for i in int_keys]
+        int_to_key = self.__int_to_key__
+        return [int_to_key[i] for i in self.__root_ints__]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self.__int_to_key__)
+
+    def __to_networkx__(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        for i, ref in enumerate(self.__int_to_key__):
+            G.add_node(i, ref=ref)
+        G.add_edges_from((source, target) for source in range(len(self)) for target in self.out_edge_ints(source))
+        return G
 
     def _repr_html_(self) -> str:
         return nx.draw(
-            self.__G__,
+            self.__to_networkx__(),
         )
 
     def __str__(self) -> str:
-        name_mapping = {
-            key: self.get_node_for_int_key(key).__name__ for key in self.__G__.nodes()
-        }
+        G = self.__to_networkx__()
+        name_mapping = {key: self.get_node_for_int_key(key).__name__ for key in G.nodes()}
         return "\n".join(
             list(
                 nx.generate_network_text(
-                    nx.relabel_nodes(self.__G__, name_mapping).reverse(),
+                    nx.relabel_nodes(G, name_mapping).reverse(),
                     vertical_chains=True,
                     ascii_only=True,
                     with_labels=True,
                 ),
             ),
         )
+
+
+def to_csr(adjacency: list[list[int]]) -> tuple[array, array]:
+    """
+    Flatten an adjacency list into compressed sparse row arrays.
+
+    Parameters:
+    - adjacency (list[list[int]]): For every node, the int ids of its neighbors.
+
+    Returns:
+    tuple[array, array]: The row offsets, of length len(adjacency) + 1, and the flattened neighbors.
+    """
+    offsets = array("l", [0])
+    targets = array("l")
+    for neighbors in adjacency:
+        targets.extend(neighbors)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def get_reachability(graph: Graph) -> list[bytes]:
+    """
+    Compute the transitive closure of a graph's out edges as one bitset per node.
+
+    Nodes are visited in topological order starting from the root nodes, so each
+    node's bitset is the union of its dependencies' bitsets and the dependencies
+    themselves.
+
+    Parameters:
+    - graph (Graph): The graph to index.
+
+    Returns:
+    list[bytes]: For every int id, a little-endian bitset of the int ids it depends on.
+    """
+    size = len(graph)
+    remaining = [len(graph.out_edge_ints(i)) for i in range(size)]
+    ancestors = [0] * size
+    stack = list(graph.__root_ints__)
+    while len(stack):
+        int_key = stack.pop()
+        bits = 0
+        for dependency in graph.out_edge_ints(int_key):
+            bits |= ancestors[dependency] | (1 << dependency)
+        ancestors[int_key] = bits
+        for child in graph.in_edge_ints(int_key):
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                stack.append(child)
+
+    num_bytes = (size + 7) // 8
+    return [bits.to_bytes(num_bytes, "little") for bits in ancestors]
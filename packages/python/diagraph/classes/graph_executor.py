@@ -1,11 +1,20 @@
+import asyncio
 import concurrent.futures
+import inspect
+import time
+from collections.abc import Container, Iterable
 from typing import TYPE_CHECKING, Any
 
+from ..cache.cache_store import MISS
 from ..decorators.is_decorated import is_decorated
+from ..decorators.prompt import get_llm
 from ..utils.build_parameters import build_parameters
+from .cancellation_token import CancellationToken
 from .diagraph_node import DiagraphNode
 from .diagraph_node_group import DiagraphNodeGroup
-from .types import ErrorHandler, KeyIdentifier, Result
+from .errors import DependencyError, NodeCancelledError, NodeTimeoutError, get_name
+from .execution_context import ExecutionContext
+from .types import ErrorHandler, Fn, KeyIdentifier, NodeStatus, Rerunner, Result
 
 if TYPE_CHECKING:
     pass
@@ -16,7 +25,11 @@ class GraphExecutor:
     diagraph: Any
     executor: concurrent.futures.ThreadPoolExecutor
     global_error_fn: ErrorHandler | None = None
-    seen_keys: set[KeyIdentifier]
+    status: dict[KeyIdentifier, NodeStatus]
+    waiting_on: dict[KeyIdentifier, int]
+    tokens: dict[KeyIdentifier, CancellationToken]
+    timeout: float | None
+    deadline: float | None
 
     def __init__(
         self,
@@ -27,31 +40,251 @@ class GraphExecutor:
         input_kwargs,
         max_workers: int,
         global_error_fn: ErrorHandler | None,
+        timeout: float | None = None,
     ):
         self.diagraph = diagraph
         self.global_error_fn = global_error_fn
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
-        self.seen_keys = set()
+        self.__start_clock__(timeout)
+        # nodes that timed out or were cancelled are left running in their threads, and are not waited on
+        self.abandoned = False
+        try:
+            self.__run__(starting_nodes, input_args, input_kwargs)
+        finally:
+            self.executor.shutdown(wait=not self.abandoned, cancel_futures=self.abandoned)
+
+    def __start_clock__(self, timeout: float | None) -> None:
+        if timeout is not None and timeout <= 0:
+            raise Exception(f"Timeout must be positive, got {timeout}")
+        self.tokens = {}
+        self.timeout = timeout
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.failed = False
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Whether the run has stopped scheduling nodes, which a fail-fast run does
+        as soon as a node records an error.
+        """
+        return self.failed and self.diagraph.fail_fast
+
+    def __run__(
+        self,
+        starting_nodes: DiagraphNodeGroup,
+        input_args,
+        input_kwargs,
+    ) -> None:
+        """
+        Execute every node reachable from the starting nodes, submitting each node
+        to the executor as soon as all of its in-run ancestors have completed.
+        """
+        pending: dict[concurrent.futures.Future, DiagraphNode] = {}
+        for node in self.__start_run__(starting_nodes):
+            self.schedule(node, input_args, input_kwargs, pending)
+
+        while len(pending):
+            done, _ = concurrent.futures.wait(
+                pending,
+                timeout=self.__get_wait__(pending.values()),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            expired = self.__expire__(pending, done)
+            for future in [*done, *expired]:
+                node = pending.pop(future)
+                if future in done:
+                    future.result()
+                for child in self.__finish_node__(node):
+                    self.schedule(child, input_args, input_kwargs, pending)
+            if self.stopped:
+                self.__cancel_pending__(pending)
+        self.__finish_run__()
+
+    def __start_run__(self, starting_nodes: DiagraphNodeGroup) -> list[DiagraphNode]:
+        """
+        Set up the status and dependency counter of every node in the run.
+
+        Returns:
+            list[DiagraphNode]: The starting nodes that can run straight away.
+
+        Raises:
+            DependencyError: If a starting node depends on a node outside the run without a result.
+        """
+        dirty = self.diagraph.__dirty__
+        self.waiting_on = get_in_degrees(starting_nodes, dirty)
         for node in starting_nodes.nodes:
-            self.schedule(node, input_args, input_kwargs)
-        self.executor.shutdown(wait=True)
+            for ancestor in node.ancestors:
+                if ancestor.key not in self.waiting_on and ancestor.key in dirty:
+                    raise DependencyError(
+                        ancestor.key,
+                        f'"{get_name(node.key)}" cannot run, as "{get_name(ancestor.key)}" has no result. '
+                        "Run it first, or include it in the run",
+                    )
+        self.status = dict.fromkeys(self.waiting_on, "pending")
+        # every node in the run is recomputed, so it is out of date until it succeeds
+        dirty.update(self.waiting_on)
+        return [node for node in starting_nodes.nodes if self.waiting_on.get(node.key) == 0]
+
+    def __finish_run__(self) -> None:
+        """
+        Mark the nodes that never ran as skipped. Besides the descendants of
+        failed nodes, which are skipped as soon as their ancestor fails, these
+        are nodes left waiting on an ancestor outside the run without a result,
+        and, in a fail-fast run, nodes that were ready once the run stopped.
+        """
+        for key, status in self.status.items():
+            if status == "pending":
+                self.status[key] = "skipped"
 
-    def schedule(self, node: DiagraphNode, input_args, input_kwargs) -> None:
-        if node.key not in self.seen_keys:
-            self.seen_keys.add(node.key)
+    def __finish_node__(self, node: DiagraphNode) -> list[DiagraphNode]:
+        """
+        Record that a node has stopped running, and release the children that were
+        waiting on it. The descendants of a node that did not succeed can never
+        run, so they are skipped.
+
+        Returns:
+            list[DiagraphNode]: The children that are now ready to run.
+        """
+        if node.key in self.diagraph.__dirty__:
+            self.status[node.key] = "failed"
+            self.__skip_descendants__([node])
+            return []
+        self.status[node.key] = "done"
+        ready = []
+        for child in node.children:
+            if child.key in self.waiting_on:
+                self.waiting_on[child.key] -= 1
+                if self.waiting_on[child.key] == 0:
+                    ready.append(child)
+        return ready
+
+    def __skip_descendants__(self, nodes: Iterable[DiagraphNode]) -> None:
+        """
+        Mark every node in the run downstream of the given nodes as skipped, unless
+        it has already been scheduled.
+        """
+        stack = list(nodes)
+        while len(stack):
+            node = stack.pop()
+            for child in node.children:
+                if self.status.get(child.key) == "pending":
+                    self.status[child.key] = "skipped"
+                    stack.append(child)
+
+    def schedule(
+        self,
+        node: DiagraphNode,
+        input_args,
+        input_kwargs,
+        pending: dict[concurrent.futures.Future, DiagraphNode],
+    ) -> None:
+        if self.status.get(node.key) == "pending" and not self.stopped:
+            self.status[node.key] = "running"
+            self.__create_token__(node)
             future = self.executor.submit(
-                lambda node: self.__execute_node_and_catch_errors__(
-                    node,
-                    input_args,
-                    input_kwargs,
-                    rerun_kwargs=None,
-                ),
+                self.__execute_node__,
                 node,
+                input_args,
+                input_kwargs,
             )
-            concurrent.futures.wait([future])
-            for child in node.children:
-                if child.__ready__:
-                    self.schedule(child, input_args, input_kwargs)
+            pending[future] = node
+
+    def __create_token__(self, node: DiagraphNode) -> CancellationToken:
+        token = CancellationToken(
+            timeout=node.timeout,
+            run_timeout=self.timeout,
+            run_deadline=self.deadline,
+        )
+        self.tokens[node.key] = token
+        return token
+
+    def __get_wait__(self, nodes: Iterable[DiagraphNode]) -> float | None:
+        """
+        Get how long the scheduler can wait before the next node times out.
+
+        Returns:
+            float | None: The time in seconds, or None if no node can time out.
+        """
+        deadlines = [deadline for node in nodes if (deadline := self.tokens[node.key].deadline) is not None]
+        if len(deadlines) == 0:
+            return None
+        return max(0, min(deadlines) - time.monotonic())
+
+    def __expire__(
+        self,
+        pending: dict[concurrent.futures.Future, DiagraphNode],
+        done: set[concurrent.futures.Future],
+    ) -> list[concurrent.futures.Future]:
+        """
+        Cancel the pending nodes that are past their deadline.
+
+        Returns:
+            list: The futures of the nodes that timed out.
+        """
+        now = time.monotonic()
+        expired = []
+        for future, node in pending.items():
+            if future in done or not self.tokens[node.key].is_expired(now):
+                continue
+            if self.__time_out__(node, now):
+                expired.append(future)
+                if not future.cancel():
+                    self.abandoned = True
+        return expired
+
+    def __cancel_pending__(self, pending: dict[concurrent.futures.Future, DiagraphNode]) -> None:
+        """
+        Cancel every pending node, without waiting for the ones already running.
+        """
+        for future, node in pending.items():
+            self.status[node.key] = "failed"
+            if self.__cancel__(node, NodeCancelledError(node.key), record=False) and not future.cancel():
+                self.abandoned = True
+        self.__skip_descendants__(pending.values())
+        pending.clear()
+
+    def __time_out__(self, node: DiagraphNode, now: float) -> bool:
+        return self.__cancel__(node, self.tokens[node.key].get_timeout_error(node.key, now))
+
+    def __cancel__(
+        self,
+        node: DiagraphNode,
+        error: NodeTimeoutError | NodeCancelledError,
+        record: bool = True,
+    ) -> bool:
+        """
+        Cancel a node, unless it has already finished.
+
+        Args:
+            node (DiagraphNode): The node to cancel.
+            error (Exception): The error the node is cancelled with.
+            record (bool): Whether to record the error as the node's error.
+
+        Returns:
+            bool: True if the node was cancelled.
+        """
+        token = self.tokens[node.key]
+        with token.lock:
+            if token.finished or node.key not in self.diagraph.__dirty__:
+                return False
+            token.error = error
+            if record:
+                self.diagraph.__state__[("error", node.key)] = error
+                self.failed = True
+        return True
+
+    def __execute_node__(
+        self,
+        node: DiagraphNode,
+        input_args: tuple[Any, ...],
+        input_kwargs: dict[Any, Any],
+    ) -> None:
+        token = self.tokens[node.key]
+        token.start()
+        try:
+            self.__execute_node_and_catch_errors__(node, input_args, input_kwargs, None)
+        finally:
+            token.finish()
 
     def __execute_node_and_catch_errors__(
         self,
@@ -64,15 +297,13 @@ class GraphExecutor:
             rerun_kwargs = {}
         try:
             result = self.__run_node__(node, input_args, input_kwargs)
-            self.diagraph.__state__[("result", node.key)] = result
+            self.__save_result__(node, result)
+        except DependencyError:
+            # the dependency's own error, if it has one, is already recorded on it
+            return
         except Exception as e:
-            # TODO: Make this a custom error
-            if "Error found for " in str(e):
-                return
-            if "Failed to get result for " in str(e):
+            if self.tokens[node.key].cancelled:
                 return
-            fn = self.diagraph.fns[node.key]
-            fn_error_handler = getattr(fn, "__function_error__", None)
 
             def rerun(**kwargs: dict[Any, Any]):
                 self.__execute_node_and_catch_errors__(
@@ -84,35 +315,61 @@ class GraphExecutor:
                 # TODO: Refactor or remove this
                 return node.result
 
-            for err_handler, accepts_fn in [
-                (fn_error_handler, False),
-                (self.diagraph.error_handler, True),
-                (self.global_error_fn, True),
-            ]:
-                if err_handler:
-                    err_handler_args = [e, rerun]
-                    if accepts_fn:
-                        err_handler_args.append(fn)
-                    try:
-                        result = err_handler(*err_handler_args, **(rerun_kwargs or {}))
-                        self.diagraph.__state__[("result", node.key)] = result
-                    except Exception as raised_exception:
-                        self.diagraph.__state__[("error", node.key)] = raised_exception
-                    return
-            # if no error functions are defined, save the error
-            self.diagraph.__state__[("error", node.key)] = e
+            self.__handle_error__(node, e, rerun, rerun_kwargs)
 
-    def __run_node__(
+    def __handle_error__(
+        self,
+        node: DiagraphNode,
+        e: Exception,
+        rerun: Rerunner,
+        rerun_kwargs: dict[Any, Any],
+    ) -> None:
+        fn = self.diagraph.fns[node.key]
+        fn_error_handler = getattr(fn, "__function_error__", None)
+
+        for err_handler, accepts_fn in [
+            (fn_error_handler, False),
+            (self.diagraph.error_handler, True),
+            (self.global_error_fn, True),
+        ]:
+            if err_handler:
+                err_handler_args = [e, rerun]
+                if accepts_fn:
+                    err_handler_args.append(fn)
+                try:
+                    result = err_handler(*err_handler_args, **(rerun_kwargs or {}))
+                    self.__save_result__(node, result)
+                except Exception as raised_exception:
+                    self.__save_error__(node, raised_exception)
+                return
+        # if no error functions are defined, save the error
+        self.__save_error__(node, e)
+
+    def __save_result__(self, node: DiagraphNode, result: Result) -> None:
+        token = self.tokens[node.key]
+        with token.lock:
+            # a node that timed out already has its outcome, so anything it produces later is dropped
+            if not token.cancelled:
+                self.diagraph.__save_result__(node.key, result)
+
+    def __save_error__(self, node: DiagraphNode, error: Exception) -> None:
+        token = self.tokens[node.key]
+        with token.lock:
+            if not token.cancelled:
+                self.diagraph.__state__[("error", node.key)] = error
+                self.failed = True
+
+    def __prepare_node__(
         self,
         node: DiagraphNode,
         provided_args: tuple[Any, ...],
         provided_kwargs: dict[Any, Any],
-    ) -> Result:
+    ) -> tuple[Fn, list[Any], dict[str, Any]]:
         """
-        Execute a single node in the Diagraph.
+        Resolve the function and parameters for a single node in the Diagraph.
 
         Returns:
-            Any: The result of executing the node.
+            tuple: The function for the node, along with its args and kwargs.
         """
         # If a user has explicitly specified a dependency via an annotation, we hydrate
         # it below.
@@ -126,20 +383,124 @@ class GraphExecutor:
             provided_args,
             provided_kwargs,
         )
+        return fn, args, kwargs
 
+    def __get_context__(self, node: DiagraphNode, fn: Fn) -> ExecutionContext:
+        log = None
         if self.diagraph.log_handler:
             log_handler = self.diagraph.log_handler
-            fn.__diagraph_log__ = lambda event, chunk: log_handler(event, chunk, fn)
-        # if self.error_handler:
-        #     error_handler = self.error_handler
-        #     setattr(fn, "__diagraph_error__", lambda e: error_handler(e, fn))
-        fn.__diagraph_llm__ = self.diagraph.llm
-        if is_decorated(fn):
-            # have we already set a prompt
-            return fn(node, *args, **kwargs)
-
-        # if inspect.iscoroutinefunction(fn):
-        #     return await fn(*args, **kwargs)
-        # else:
-        #     return fn(*args, **kwargs)
-        return fn(*args, **kwargs)
+
+            def log(event, chunk):
+                return log_handler(event, chunk, fn)
+
+        return ExecutionContext(
+            node,
+            llm=self.diagraph.llm,
+            log=log,
+            state=self.diagraph.__state__,
+            rate_limiter=self.diagraph.rate_limiter,
+            cancellation=self.tokens.get(node.key),
+        )
+
+    def __run_node__(
+        self,
+        node: DiagraphNode,
+        provided_args: tuple[Any, ...],
+        provided_kwargs: dict[Any, Any],
+    ) -> Result:
+        """
+        Execute a single node in the Diagraph.
+
+        Returns:
+            Any: The result of executing the node.
+        """
+        fn, args, kwargs = self.__prepare_node__(node, provided_args, provided_kwargs)
+        context = self.__get_context__(node, fn) if is_decorated(fn) else None
+        cache_key, result = self.__read_cache__(node, fn, args, kwargs, context)
+        if result is not MISS:
+            return result
+
+        if context is not None:
+            result = fn(context, *args, **kwargs)
+        elif inspect.iscoroutinefunction(fn):
+            result = asyncio.run(fn(*args, **kwargs))
+        else:
+            result = fn(*args, **kwargs)
+
+        self.__write_cache__(node, cache_key, result)
+        return result
+
+    def __read_cache__(
+        self,
+        node: DiagraphNode,
+        fn: Fn,
+        args: list[Any],
+        kwargs: dict[str, Any],
+        context: ExecutionContext | None,
+    ) -> tuple[str | None, Any]:
+        """
+        Look up a node invocation in the Diagraph's result cache.
+
+        Returns:
+            tuple: The cache key, or None if the invocation is not cached, and the
+            cached result, or MISS.
+        """
+        cache = self.diagraph.cache
+        if cache is None:
+            return None, MISS
+
+        prompt = llm = None
+        if context is not None:
+            prompt = self.__get_prompt__(node)
+            llm = get_llm(fn, context)
+        cache_key = cache.get_key(fn, args, kwargs, prompt, llm)
+        if cache_key is None:
+            return None, MISS
+
+        entry = cache.get(cache_key)
+        if entry is MISS:
+            return cache_key, MISS
+        result, cached_prompt = entry
+        if cached_prompt is not None and prompt is None:
+            # the prompt is normally generated as the node runs, so it is restored from the cache
+            self.diagraph.__state__[("prompt", node.key)] = cached_prompt
+        return cache_key, result
+
+    def __write_cache__(self, node: DiagraphNode, cache_key: str | None, result: Result) -> None:
+        if cache_key is not None:
+            prompt = self.__get_prompt__(node) if is_decorated(self.diagraph.fns[node.key]) else None
+            self.diagraph.cache.set(cache_key, (result, prompt))
+
+    def __get_prompt__(self, node: DiagraphNode) -> Any:
+        return self.diagraph.__state__.get(("prompt", node.key))
+
+
+def get_in_degrees(
+    starting_nodes: DiagraphNodeGroup,
+    dirty: Container[KeyIdentifier] = (),
+) -> dict[KeyIdentifier, int]:
+    """
+    Counts, for every node reachable from the starting nodes, how many of its
+    ancestors it has to wait for: the ancestors that will also be executed as
+    part of the run, plus any ancestor outside the run that has no up-to-date
+    result, which keeps the node from running at all.
+
+    Parameters:
+    - starting_nodes (DiagraphNodeGroup): The nodes the run starts from.
+    - dirty (Container): The keys of the nodes without an up-to-date result.
+
+    Returns:
+    dict[KeyIdentifier, int]: A mapping of node keys to their in-run in-degree.
+    """
+    nodes: dict[KeyIdentifier, DiagraphNode] = {}
+    stack = list(starting_nodes.nodes)
+    while len(stack):
+        node = stack.pop()
+        if node.key not in nodes:
+            nodes[node.key] = node
+            stack.extend(node.children)
+
+    return {
+        key: sum(1 for ancestor in node.ancestors if ancestor.key in nodes or ancestor.key in dirty)
+        for key, node in nodes.items()
+    }
@@ -0,0 +1,180 @@
+import threading
+
+import pytest
+
+from ..utils.depends import Depends
+from .diagraph import Diagraph
+from .diagraph_node_group import DiagraphNodeGroup
+from .diagraph_state.diagraph_state import DiagraphState
+from .errors import DependencyError
+from .graph_executor import GraphExecutor, get_in_degrees
+
+
+def execute(diagraph, *starting_fns):
+    _, starting_nodes = diagraph.__start_run__(DiagraphNodeGroup(diagraph, *starting_fns), (), {})
+    return GraphExecutor(
+        diagraph,
+        starting_nodes,
+        input_args=(),
+        input_kwargs={},
+        max_workers=1,
+        global_error_fn=None,
+    )
+
+
+def describe_get_in_degrees():
+    def test_it_counts_ancestors_in_the_run():
+        def a():
+            return "a"
+
+        def b(a: str = Depends(a)):
+            return "b"
+
+        def c(a: str = Depends(a), b: str = Depends(b)):
+            return "c"
+
+        diagraph = Diagraph(c)
+        assert get_in_degrees(DiagraphNodeGroup(diagraph, a)) == {a: 0, b: 1, c: 2}
+
+    def test_it_counts_ancestors_outside_the_run_without_a_result():
+        def a():
+            return "a"
+
+        def x():
+            return "x"
+
+        def b(a: str = Depends(a), x: str = Depends(x)):
+            return "b"
+
+        diagraph = Diagraph(b)
+        group = DiagraphNodeGroup(diagraph, a)
+        assert get_in_degrees(group) == {a: 0, b: 1}
+        assert get_in_degrees(group, dirty={x}) == {a: 0, b: 2}
+
+
+def describe_graph_executor():
+    def test_it_tracks_the_status_of_every_node():
+        def a():
+            return "a"
+
+        def fails(a: str = Depends(a)):
+            raise Exception("fails")
+
+        def skipped(fails: str = Depends(fails)):
+            return "skipped"
+
+        diagraph = Diagraph(skipped)
+        executor = execute(diagraph, a)
+        assert executor.status == {a: "done", fails: "failed", skipped: "skipped"}
+        assert executor.waiting_on == {a: 0, fails: 0, skipped: 1}
+
+    def test_it_waits_for_every_ancestor():
+        def a():
+            return "a"
+
+        def b():
+            return "b"
+
+        def c(a: str = Depends(a), b: str = Depends(b)):
+            return a + b
+
+        diagraph = Diagraph(c)
+        execute(diagraph, a, b)
+        assert diagraph[c].result == "ab"
+
+    def test_it_does_not_run_nodes_with_an_ancestor_outside_the_run_without_a_result(mocker):
+        stub = mocker.stub()
+
+        def a():
+            return "a"
+
+        def x():
+            return "x"
+
+        def b(a: str = Depends(a), x: str = Depends(x)):
+            stub()
+
+        diagraph = Diagraph(b)
+        executor = execute(diagraph, a)
+        stub.assert_not_called()
+        assert executor.status[b] == "skipped"
+
+    def test_it_raises_for_a_starting_node_that_can_never_run(mocker):
+        stub = mocker.stub()
+
+        def x():
+            return "x"
+
+        def b(x: str = Depends(x)):
+            stub()
+
+        diagraph = Diagraph(b)
+        with pytest.raises(DependencyError, match='"b" cannot run, as "x" has no result') as excinfo:
+            # the executor is started directly, as a Diagraph validates ancestors before starting a run
+            GraphExecutor(
+                diagraph,
+                DiagraphNodeGroup(diagraph, b),
+                input_args=(),
+                input_kwargs={},
+                max_workers=1,
+                global_error_fn=None,
+            )
+        assert excinfo.value.key == x
+        stub.assert_not_called()
+
+    def test_it_skips_the_descendants_of_cancelled_nodes():
+        release = threading.Event()
+
+        def fails():
+            release.wait(timeout=5)
+            raise Exception("fails")
+
+        def slow():
+            release.set()
+            threading.Event().wait(0.5)
+            return "slow"
+
+        def after(slow: str = Depends(slow)):
+            return "after"
+
+        def last(after: str = Depends(after)):
+            return "last"
+
+        diagraph = Diagraph(fails, last)
+        diagraph.fail_fast = True
+        _, starting_nodes = diagraph.__start_run__(DiagraphNodeGroup(diagraph, fails, slow), (), {})
+        executor = GraphExecutor(
+            diagraph,
+            starting_nodes,
+            input_args=(),
+            input_kwargs={},
+            max_workers=2,
+            global_error_fn=None,
+        )
+        assert executor.status == {fails: "failed", slow: "failed", after: "skipped", last: "skipped"}
+
+    def test_it_decides_readiness_without_raising(mocker):
+        def a():
+            raise Exception("a")
+
+        def b(a: str = Depends(a)):
+            return "b"
+
+        def c(b: str = Depends(b)):
+            return "c"
+
+        getitem = DiagraphState.__getitem__
+        misses = []
+
+        def spy(self, key):
+            try:
+                return getitem(self, key)
+            except Exception:
+                misses.append(key)
+                raise
+
+        diagraph = Diagraph(c)
+        mocker.patch.object(DiagraphState, "__getitem__", spy)
+        executor = execute(diagraph, a)
+        assert executor.status == {a: "failed", b: "skipped", c: "skipped"}
+        assert [key for key in misses if key[0] == "result"] == []
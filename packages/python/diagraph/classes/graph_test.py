@@ -96,3 +96,88 @@ def test_it_can_get_out_edges():
 #             "target": graph_2.get_int_key_for_node("c"),
 #         },
 #     ]
+
+
+def test_it_numbers_nodes_in_order_of_appearance():
+    graph = Graph({"a": ["b", "d"], "b": ["c"], "d": ["c"], "e": ["c"]})
+
+    assert graph.nodes == ["a", "b", "d", "e", "c"]
+    assert [graph.get_int_key_for_node(key) for key in graph.nodes] == [0, 1, 2, 3, 4]
+
+
+def test_it_gets_in_edges_in_order_of_definition():
+    graph = Graph({"a": ["b", "d"], "b": ["c"], "d": ["c"], "e": ["c"]})
+
+    assert graph.in_edges("c") == ["b", "d", "e"]
+    assert graph.in_edges("a") == []
+
+
+def test_it_ignores_duplicate_edges():
+    graph = Graph({"a": ["b", "b"], "b": []})
+
+    assert graph.out_edges("a") == ["b"]
+    assert graph.in_edges("b") == ["a"]
+
+
+def test_it_gets_root_nodes():
+    graph = Graph({"a": ["b", "d"], "b": ["c"], "d": ["c"], "e": []})
+
+    assert graph.root_nodes == ["e", "c"]
+
+
+def test_it_gets_int_edges_without_copying():
+    graph = Graph({"a": ["b", "d"], "b": ["c"], "d": ["c"]})
+
+    out_edges = graph.out_edge_ints(graph.get_int_key_for_node("a"))
+    in_edges = graph.in_edge_ints(graph.get_int_key_for_node("c"))
+    assert isinstance(out_edges, memoryview)
+    assert list(out_edges) == [
+        graph.get_int_key_for_node("b"),
+        graph.get_int_key_for_node("d"),
+    ]
+    assert list(in_edges) == [
+        graph.get_int_key_for_node("b"),
+        graph.get_int_key_for_node("d"),
+    ]
+
+
+def test_it_renders_as_text():
+    def a():
+        pass
+
+    def b():
+        pass
+
+    graph = Graph({b: [a]})
+
+    assert str(graph) == "\n".join(["+-- a", "    !", "    b"])
+
+
+def test_it_checks_transitive_dependencies():
+    graph = Graph({"a": ["b", "d"], "b": ["c"], "d": ["c"], "e": []})
+
+    assert graph.depends_on("a", "b") is True
+    assert graph.depends_on("a", "c") is True
+    assert graph.depends_on("b", "c") is True
+    assert graph.depends_on("c", "a") is False
+    assert graph.depends_on("b", "d") is False
+    assert graph.depends_on("a", "e") is False
+    assert graph.depends_on("a", "a") is False
+
+
+def test_it_checks_transitive_dependencies_across_many_paths():
+    # every node in a layer depends on every node in the previous layer
+    width, depth = 8, 40
+    graph_def: dict[str, list[str]] = {}
+    previous_layer = ["root"]
+    for d in range(depth):
+        layer = [f"{d}-{w}" for w in range(width)]
+        for key in layer:
+            graph_def[key] = previous_layer
+        previous_layer = layer
+    graph = Graph(graph_def)
+
+    assert graph.depends_on(f"{depth - 1}-0", "root") is True
+    assert graph.depends_on(f"{depth - 1}-0", "0-7") is True
+    assert graph.depends_on("0-7", f"{depth - 1}-0") is False
+    assert graph.depends_on(f"{depth - 1}-0", f"{depth - 1}-1") is False
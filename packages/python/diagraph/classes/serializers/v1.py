@@ -1,4 +1,3 @@
-import inspect
 from collections.abc import Callable
 from typing import Any
 
@@ -6,6 +5,7 @@ from pydantic import BaseModel
 from pydantic.functional_validators import field_validator
 
 from ...utils.depends import FnDependency
+from ...utils.get_signature import get_declared_dependencies
 from ..types import Fn
 from .get_fn import dump_fn, get_fn
 
@@ -48,12 +48,7 @@ class V1Config(BaseModel):
 
 
 def collect_dependencies(fn: Callable) -> list[FnDependency]:
-    dependencies: list[FnDependency] = []
-    for parameter in inspect.signature(fn).parameters.values():
-        if parameter.default is not None and parameter.default is not inspect._empty:
-            if isinstance(parameter.default, FnDependency):
-                dependencies.append(parameter.default.dependency)
-    return dependencies
+    return list(get_declared_dependencies(fn))
 
 
 def collect_string_dependencies(fn: Callable) -> list[str]:
@@ -8,6 +8,7 @@ Fn = Callable[..., Any]
 Result = Any
 
 LogEventName = Literal["start", "end", "data"]
+NodeStatus = Literal["pending", "running", "done", "failed", "skipped"]
 Rerunner = Callable[..., None]
 
 LogHandler = Callable[[str, dict | None, Fn], None]
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import functools
+import inspect
 from typing import Any
 
-from ..classes.diagraph_node import DiagraphNode
+from ..classes.execution_context import ExecutionContext
 from ..classes.types import Fn, FunctionErrorHandler, FunctionLogHandler, LogEventName
 from ..llm.llm import LLM
 from ..llm.openai_llm import OpenAI
@@ -40,26 +42,29 @@ def get_if_valid_llm(llm: Any) -> LLM:
     return llm
 
 
-def get_llm(wrapper_fn) -> LLM:
+def get_llm(wrapper_fn, context: ExecutionContext) -> LLM:
     function_llm = getattr(wrapper_fn, "__function_llm__", None)
     if function_llm is not None:
         return get_if_valid_llm(function_llm)
 
-    diagraph_llm = getattr(wrapper_fn, "__diagraph_llm__", None)
-    if diagraph_llm is not None:
-        return get_if_valid_llm(diagraph_llm)
+    if context.llm is not None:
+        return get_if_valid_llm(context.llm)
     return get_default_llm()
 
 
 def generate_prompt(func, *args, **kwargs) -> Any:
-    # if inspect.iscoroutinefunction(func):
-    #     return await func(*args, **kwargs)
-    # else:
-    #     return func(*args, **kwargs)
+    if inspect.iscoroutinefunction(func):
+        return asyncio.run(func(*args, **kwargs))
+    return func(*args, **kwargs)
+
+
+async def agenerate_prompt(func, *args, **kwargs) -> Any:
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
     return func(*args, **kwargs)
 
 
-def decorate(prompt_fn, _func=None, **kwargs):
+def decorate(prompt_fn, _func=None, aprompt_fn=None, **kwargs):
     def decorator(
         func: Fn,
     ):  # -> _Wrapped[Callable[..., Any], Any, Callable[..., Any], Generator[Any | Literal[''] | None, Any, None]]:
@@ -67,6 +72,13 @@ def decorate(prompt_fn, _func=None, **kwargs):
         def wrapper_fn(*args, **kwargs) -> Any:
             return prompt_fn(wrapper_fn, func, *args, **kwargs)
 
+        if aprompt_fn is not None:
+
+            async def async_wrapper_fn(*args, **kwargs) -> Any:
+                return await aprompt_fn(wrapper_fn, func, *args, **kwargs)
+
+            wrapper_fn.__arun__ = async_wrapper_fn
+
         setattr(wrapper_fn, IS_DECORATED_KEY, True)
         wrapper_fn.__fn__ = func
         for key, value in kwargs.items():
@@ -88,35 +100,69 @@ def prompt(
     log: FunctionLogHandler | None = None,
     llm: LLM | None = None,
     error: FunctionErrorHandler | None = None,
+    timeout: float | None = None,
 ):
-    def prompt_fn(
-        wrapper_fn,
-        decorated_fn: Fn,
-        node: DiagraphNode,
-        *args,
-        **kwargs,
-    ) -> Any:
-        llm = get_llm(wrapper_fn)
-        diagraph_log = getattr(wrapper_fn, "__diagraph_log__", None)
+    def get_log(context: ExecutionContext) -> FunctionLogHandler:
+        diagraph_log = context.log
 
         def _log(event: LogEventName, chunk: dict | None) -> None:
+            # LLMs log every chunk they stream, so a cancelled node stops at the next one
+            context.raise_if_cancelled()
             if log:
                 log(event, chunk)
             elif diagraph_log:
                 diagraph_log(event, chunk)
 
-        prompt = None
-        try:
-            prompt = node.prompt
-        except Exception:
-            pass
+        return _log
+
+    def get_prompt(context: ExecutionContext) -> Any:
+        return context.state.get(("prompt", context.key))
+
+    def prompt_fn(
+        wrapper_fn,
+        decorated_fn: Fn,
+        context: ExecutionContext,
+        *args,
+        **kwargs,
+    ) -> Any:
+        llm = get_llm(wrapper_fn, context)
+        node_log = get_log(context)
+
+        prompt = get_prompt(context)
         if prompt is None:
-            node.diagraph.__state__[("prompt", node.key)] = generate_prompt(
-                decorated_fn,
-                *args,
-                **kwargs,
-            )
+            prompt = generate_prompt(decorated_fn, *args, **kwargs)
+            context.state[("prompt", context.key)] = prompt
 
-        return llm.run(node.prompt, log=_log)
+        if context.rate_limiter is not None:
+            context.rate_limiter.acquire(prompt)
+        context.raise_if_cancelled()
+        return llm.run(prompt, log=node_log, cancellation=context.cancellation)
 
-    return decorate(prompt_fn, _func, __function_llm__=llm, __function_error__=error)
+    async def aprompt_fn(
+        wrapper_fn,
+        decorated_fn: Fn,
+        context: ExecutionContext,
+        *args,
+        **kwargs,
+    ) -> Any:
+        llm = get_llm(wrapper_fn, context)
+        node_log = get_log(context)
+
+        prompt = get_prompt(context)
+        if prompt is None:
+            prompt = await agenerate_prompt(decorated_fn, *args, **kwargs)
+            context.state[("prompt", context.key)] = prompt
+
+        if context.rate_limiter is not None:
+            await context.rate_limiter.aacquire(prompt)
+        context.raise_if_cancelled()
+        return await llm.arun(prompt, log=node_log, cancellation=context.cancellation)
+
+    return decorate(
+        prompt_fn,
+        _func,
+        aprompt_fn=aprompt_fn,
+        __function_llm__=llm,
+        __function_error__=error,
+        __function_timeout__=timeout,
+    )
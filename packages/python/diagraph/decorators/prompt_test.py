@@ -737,3 +737,76 @@ def describe_errors():
             function_handle_errors.assert_any_call(0)
             assert dg.result is None
             assert str(dg[fn].error) == "stop"
+
+
+def describe_timeouts():
+    def test_it_sets_the_timeout_on_the_function():
+        @prompt(timeout=5)
+        def fn():
+            return "prompt"
+
+        @prompt
+        def no_timeout():
+            return "prompt"
+
+        assert fn.__function_timeout__ == 5
+        assert no_timeout.__function_timeout__ is None
+
+    def test_it_stops_streaming_once_cancelled():
+        from ..classes.cancellation_token import CancellationToken
+        from ..classes.diagraph_state.diagraph_state import DiagraphState
+        from ..classes.errors import NodeTimeoutError
+        from ..classes.execution_context import ExecutionContext
+
+        token = CancellationToken()
+        chunks = []
+
+        class CancellingLLM(LLM):
+            def run(self, prompt, log, **kwargs):
+                log("start", None)
+                token.error = NodeTimeoutError("fn", 1)
+                log("data", "never")
+                chunks.append("never")
+
+        @prompt(llm=CancellingLLM())
+        def fn():
+            return "prompt"
+
+        diagraph = Diagraph(fn)
+        context = ExecutionContext(
+            diagraph[fn],
+            llm=None,
+            log=None,
+            state=DiagraphState(),
+            cancellation=token,
+        )
+        with pytest.raises(NodeTimeoutError, match="timed out after 1 seconds"):
+            fn(context)
+        assert chunks == []
+
+    def test_it_passes_the_cancellation_token_to_the_llm():
+        from ..classes.cancellation_token import CancellationToken
+        from ..classes.diagraph_state.diagraph_state import DiagraphState
+        from ..classes.execution_context import ExecutionContext
+
+        token = CancellationToken()
+        received = []
+
+        class RecordingLLM(LLM):
+            def run(self, prompt, log, cancellation=None, **kwargs):
+                received.append(cancellation)
+                return "response"
+
+        @prompt(llm=RecordingLLM())
+        def fn():
+            return "prompt"
+
+        context = ExecutionContext(
+            Diagraph(fn)[fn],
+            llm=None,
+            log=None,
+            state=DiagraphState(),
+            cancellation=token,
+        )
+        assert fn(context) == "response"
+        assert received == [token]
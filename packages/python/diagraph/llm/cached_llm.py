@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from ..cache.cache_store import MISS, CacheStore
+from ..cache.memory_cache_store import MemoryCacheStore
+from ..classes.types import FunctionLogHandler, LogEventName
+from .get_request_key import get_request_key
+from .llm import LLM
+
+if TYPE_CHECKING:
+    from ..classes.cancellation_token import CancellationToken
+
+LogEvent = tuple[LogEventName, Any]
+
+
+class CachedLLM(LLM):
+    """
+    Wraps an LLM and caches its responses.
+
+    Requests are keyed on the normalized messages of the prompt, along with
+    the wrapped LLM's configuration and the keyword arguments of the call.
+    Every event sent to `log` is recorded with the response, and replayed in
+    order on a cache hit, so streaming consumers still see the `start`,
+    `data` and `end` events.
+    """
+
+    llm: LLM
+    store: CacheStore
+
+    def __init__(self, llm: LLM, store: CacheStore | None = None) -> None:
+        """
+        Initialize a CachedLLM.
+
+        Args:
+            llm (LLM): The LLM to cache responses from.
+            store (CacheStore | None): Where to cache responses. Defaults to a MemoryCacheStore.
+        """
+        self.llm = llm
+        self.store = store if store is not None else MemoryCacheStore()
+
+    @property
+    def kwargs(self) -> dict[str, Any]:
+        return getattr(self.llm, "kwargs", {})
+
+    def run(
+        self,
+        _prompt: Any,
+        log: FunctionLogHandler,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> Any:
+        key = self.get_key(_prompt, kwargs)
+        entry = self.store.get(key)
+        if entry is not MISS:
+            return replay(entry, log)
+
+        events: list[LogEvent] = []
+        result = self.llm.run(_prompt, log=record(events, log), cancellation=cancellation, **kwargs)
+        self.store.set(key, {"events": events, "result": result})
+        return result
+
+    async def arun(
+        self,
+        _prompt: Any,
+        log: FunctionLogHandler,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> Any:
+        key = self.get_key(_prompt, kwargs)
+        entry = self.store.get(key)
+        if entry is not MISS:
+            return replay(entry, log)
+
+        events: list[LogEvent] = []
+        result = await self.llm.arun(_prompt, log=record(events, log), cancellation=cancellation, **kwargs)
+        self.store.set(key, {"events": events, "result": result})
+        return result
+
+    def get_key(self, prompt: Any, kwargs: dict[str, Any]) -> str:
+        return get_request_key(self.llm, prompt, kwargs)
+
+
+def record(events: list[LogEvent], log: FunctionLogHandler) -> FunctionLogHandler:
+    def _log(event: LogEventName, chunk: Any) -> None:
+        events.append((event, chunk))
+        log(event, chunk)
+
+    return _log
+
+
+def replay(entry: dict[str, Any], log: FunctionLogHandler) -> Any:
+    for event, chunk in entry["events"]:
+        log(event, chunk)
+    return entry["result"]
@@ -0,0 +1,148 @@
+import pytest
+
+from ..cache.disk_cache_store import DiskCacheStore
+from ..cache.memory_cache_store import MemoryCacheStore
+from ..classes.cancellation_token import CancellationToken
+from .cached_llm import CachedLLM
+from .llm import LLM
+
+
+class StreamingLLM(LLM):
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.calls = []
+
+    def run(self, prompt, log, **kwargs):
+        self.calls.append((prompt, kwargs))
+        log("start", None)
+        for word in ["a", "b", "c"]:
+            log("data", {"content": word})
+        log("end", None)
+        return "abc"
+
+
+class FailingLLM(LLM):
+    def __init__(self):
+        self.kwargs = {}
+        self.calls = 0
+
+    def run(self, prompt, log, **kwargs):
+        self.calls += 1
+        log("start", None)
+        raise Exception("upstream error")
+
+
+def describe_cached_llm():
+    def test_it_caches_responses(mocker):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm)
+
+        assert cached.run("foo", log=mocker.stub()) == "abc"
+        assert cached.run("foo", log=mocker.stub()) == "abc"
+        assert len(llm.calls) == 1
+
+    def test_it_replays_log_events_in_order(mocker):
+        cached = CachedLLM(StreamingLLM())
+        first_log = mocker.stub()
+        second_log = mocker.stub()
+
+        cached.run("foo", log=first_log)
+        cached.run("foo", log=second_log)
+
+        assert second_log.call_args_list == first_log.call_args_list
+        assert [c.args for c in second_log.call_args_list] == [
+            ("start", None),
+            ("data", {"content": "a"}),
+            ("data", {"content": "b"}),
+            ("data", {"content": "c"}),
+            ("end", None),
+        ]
+
+    def test_it_normalizes_prompts_to_messages(mocker):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm)
+
+        cached.run("foo", log=mocker.stub())
+        cached.run([{"role": "user", "content": "foo"}], log=mocker.stub())
+        cached.run({"messages": [{"content": "foo", "role": "user"}]}, log=mocker.stub())
+
+        assert len(llm.calls) == 1
+
+    @pytest.mark.parametrize(
+        ("prompt", "kwargs"),
+        [
+            ("bar", {}),
+            ("foo", {"model": "gpt-4"}),
+            ({"messages": [{"role": "user", "content": "foo"}], "temperature": 0}, {}),
+        ],
+    )
+    def test_it_misses_for_different_requests(mocker, prompt, kwargs):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm)
+
+        cached.run("foo", log=mocker.stub())
+        cached.run(prompt, log=mocker.stub(), **kwargs)
+
+        assert len(llm.calls) == 2
+
+    def test_it_misses_for_a_differently_configured_llm(mocker):
+        store = MemoryCacheStore()
+        llm = StreamingLLM(model="gpt-4")
+
+        CachedLLM(StreamingLLM(model="gpt-3.5-turbo"), store=store).run("foo", log=mocker.stub())
+        CachedLLM(llm, store=store).run("foo", log=mocker.stub())
+
+        assert len(llm.calls) == 1
+
+    def test_it_passes_the_cancellation_token_upstream(mocker):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm)
+        token = CancellationToken()
+
+        cached.run("foo", log=mocker.stub(), cancellation=token)
+        cached.run("foo", log=mocker.stub(), cancellation=CancellationToken())
+
+        # the token is not part of the request, so the second call is a hit
+        assert llm.calls == [("foo", {"cancellation": token})]
+
+    def test_it_does_not_cache_errors(mocker):
+        llm = FailingLLM()
+        cached = CachedLLM(llm)
+
+        for _ in range(2):
+            with pytest.raises(Exception, match="upstream error"):
+                cached.run("foo", log=mocker.stub())
+        assert llm.calls == 2
+
+    def test_it_evicts_with_its_store(mocker):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm, store=MemoryCacheStore(max_size=1))
+
+        cached.run("foo", log=mocker.stub())
+        cached.run("bar", log=mocker.stub())
+        cached.run("foo", log=mocker.stub())
+
+        assert len(llm.calls) == 3
+
+    def test_it_caches_to_disk(mocker, tmp_path):
+        llm = StreamingLLM()
+
+        CachedLLM(llm, store=DiskCacheStore(tmp_path)).run("foo", log=mocker.stub())
+        log = mocker.stub()
+        assert CachedLLM(llm, store=DiskCacheStore(tmp_path)).run("foo", log=log) == "abc"
+
+        assert len(llm.calls) == 1
+        assert log.call_count == 5
+
+    @pytest.mark.asyncio
+    async def test_it_caches_async_responses(mocker):
+        llm = StreamingLLM()
+        cached = CachedLLM(llm)
+        log = mocker.stub()
+
+        assert await cached.arun("foo", log=mocker.stub()) == "abc"
+        assert await cached.arun("foo", log=log) == "abc"
+        assert cached.run("foo", log=mocker.stub()) == "abc"
+
+        assert len(llm.calls) == 1
+        assert log.call_count == 5
@@ -0,0 +1,34 @@
+import hashlib
+import json
+from typing import Any
+
+from .llm import LLM
+from .openai_llm.cast_to_input import cast_to_input
+
+
+def get_request_key(llm: LLM, prompt: Any, kwargs: dict[str, Any]) -> str:
+    """
+    Hash an LLM request.
+
+    The prompt is normalized to its messages first, so a plain string and the
+    equivalent list of messages produce the same key.
+
+    Parameters:
+    - llm (LLM): The LLM the request is for; its class and kwargs are part of the key.
+    - prompt (Any): The prompt, as a string, a list of messages, or a dict of messages and options.
+    - kwargs (dict): The keyword arguments of the call.
+
+    Returns:
+    str: A hex SHA-256 digest of the request.
+    """
+    messages, rest = cast_to_input(prompt)
+    llm_class = type(llm)
+    request = {
+        "llm": f"{llm_class.__module__}.{llm_class.__qualname__}",
+        "config": getattr(llm, "kwargs", {}),
+        "messages": messages,
+        "options": rest,
+        "kwargs": kwargs,
+    }
+    payload = json.dumps(request, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
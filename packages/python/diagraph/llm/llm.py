@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABCMeta, abstractmethod
 from typing import Any
 
@@ -7,14 +8,25 @@ from diagraph.classes.types import FunctionLogHandler
 
 
 class LLM(metaclass=ABCMeta):
+    """
+    Sends prompts to a language model.
+
+    Prompts call `run` with the node's `cancellation` token as a keyword
+    argument, so an LLM that does work between log events, such as waiting
+    to retry, can stop once its result would be discarded.
+    """
+
     kwargs: dict[str, Any]
 
     @abstractmethod
     def run(self, _prompt: Any, log: FunctionLogHandler, **kwargs) -> Any:
         ...
 
-    # @abstractmethod
-    # async def arun(
-    #     self, _prompt: Any, log: FunctionLogHandler, **kwargs
-    # ) -> Awaitable[Any]:
-    #     ...
+    async def arun(self, _prompt: Any, log: FunctionLogHandler, **kwargs) -> Any:
+        """
+        Run the LLM without blocking the event loop.
+
+        LLMs that do not provide a native async implementation fall back to
+        running their synchronous `run` in a worker thread.
+        """
+        return await asyncio.to_thread(self.run, _prompt, log, **kwargs)
@@ -1,4 +1,6 @@
-from typing import Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
 
 from openai import AsyncOpenAI
 from openai import OpenAI as SyncOpenAI
@@ -6,9 +8,14 @@ from openai.types.chat import ChatCompletionMessageParam
 
 from ...classes.types import FunctionLogHandler
 from ..llm import LLM
+from ..rate_limiter import RateLimiter
+from ..retry_policy import RetryPolicy
 from .build_dict import build_dict
 from .cast_to_input import cast_to_input
 
+if TYPE_CHECKING:
+    from ...classes.cancellation_token import CancellationToken
+
 DEFAULT_MODEL = "gpt-3.5-turbo"
 
 
@@ -17,9 +24,19 @@ class OpenAI(LLM):
     __client__: SyncOpenAI | None = None
     kwargs: dict[Any, Any]
     api_key: None | str
+    rate_limiter: RateLimiter | None
+    retry: RetryPolicy | None
 
-    def __init__(self, api_key=None, **kwargs) -> None:
+    def __init__(
+        self,
+        api_key=None,
+        rate_limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        **kwargs,
+    ) -> None:
         self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.retry = retry
         self.kwargs = kwargs
 
     @property
@@ -46,13 +63,83 @@ class OpenAI(LLM):
         log: FunctionLogHandler,
         # TODO: Deprecate model as an arg
         model=None,
+        cancellation: CancellationToken | None = None,
         **kwargs,
     ) -> str | dict[str, str]:
+        kwargs = self.__build_request__(prompt, model, kwargs)
+        if self.retry is not None:
+            return self.retry.run(self.__run__, kwargs, log, cancellation=cancellation)
+        return self.__run__(kwargs, log)
+
+    async def arun(
+        self,
+        prompt: str | list[ChatCompletionMessageParam] | dict[str, Any],
+        log: FunctionLogHandler,
+        model=None,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> str | dict[str, str]:
+        kwargs = self.__build_request__(prompt, model, kwargs)
+        if self.retry is not None:
+            return await self.retry.arun(self.__arun__, kwargs, log, cancellation=cancellation)
+        return await self.__arun__(kwargs, log)
+
+    def __run__(self, kwargs: dict[str, Any], log: FunctionLogHandler) -> str | dict[str, str]:
         client = self.client
+        # every attempt is a request of its own, so retries are rate limited too
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(kwargs["messages"])
+
+        response: dict[str, str] = {}
+        started = False
+        stream = client.chat.completions.create(**kwargs)
+        try:
+            for resp in stream:
+                if started is False:
+                    log("start", None)
+                    started = True
+                response = handle_chunk(response, resp, log)
+            log("end", None)
+        finally:
+            # a stream abandoned part way, say because its node was cancelled, is closed
+            # rather than left holding the connection open
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        return parse_response(response)
+
+    async def __arun__(self, kwargs: dict[str, Any], log: FunctionLogHandler) -> str | dict[str, str]:
+        aclient = self.aclient
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(kwargs["messages"])
+
+        response: dict[str, str] = {}
+        started = False
+        stream = await aclient.chat.completions.create(**kwargs)
+        try:
+            async for resp in stream:
+                if started is False:
+                    log("start", None)
+                    started = True
+                response = handle_chunk(response, resp, log)
+            log("end", None)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+
+        return parse_response(response)
+
+    def __build_request__(
+        self,
+        prompt: str | list[ChatCompletionMessageParam] | dict[str, Any],
+        model: str | None,
+        kwargs: dict[str, Any],
+    ) -> dict[str, Any]:
         model = model if model else self.kwargs.get("model", DEFAULT_MODEL)
         messages, rest = cast_to_input(prompt)
 
-        response: dict[str, str] = {}
         if "stream" in kwargs:
             del kwargs["stream"]
         kwargs = {
@@ -64,24 +151,28 @@ class OpenAI(LLM):
         }
         for key in rest.keys():
             kwargs[key] = rest[key]
-        started = False
-        for resp in client.chat.completions.create(**kwargs):
-            if started is False:
-                log("start", None)
-                started = True
-            choices = resp.choices
-            choice = choices[0]
-            delta = choice.delta
-            delta = delta.model_dump(exclude_unset=True)
-            log("data", delta)
-            response = build_dict(response, delta)
-        log("end", None)
-
-        # TODO: Remove this block once we have return type coercion.
-        # LLM should not alter the response, that should be the provenance
-        # of the return type.
-        if len(response.keys()) == 1:
-            if "content" not in response:
-                raise Exception(f"Unknown key found: {response.keys()}")
-            return response["content"]
-        return response
+        return kwargs
+
+
+def handle_chunk(
+    response: dict[str, str],
+    resp: Any,
+    log: FunctionLogHandler,
+) -> dict[str, str]:
+    choices = resp.choices
+    choice = choices[0]
+    delta = choice.delta
+    delta = delta.model_dump(exclude_unset=True)
+    log("data", delta)
+    return build_dict(response, delta)
+
+
+def parse_response(response: dict[str, str]) -> str | dict[str, str]:
+    # TODO: Remove this block once we have return type coercion.
+    # LLM should not alter the response, that should be the provenance
+    # of the return type.
+    if len(response.keys()) == 1:
+        if "content" not in response:
+            raise Exception(f"Unknown key found: {response.keys()}")
+        return response["content"]
+    return response
@@ -1,7 +1,9 @@
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from ...classes.cancellation_token import CancellationToken
+
 
 def make_completion(_content: str):
     class Delta:
@@ -198,32 +200,213 @@ def describe_openai_llm():
 
             assert OpenAI(model="gpt-foo").run("foo", log=handle_log) == "012"
 
+    def describe_arun():
+        @pytest.mark.asyncio
+        async def test_it_runs_foo():
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.AsyncOpenAI",
+                MockASyncOpenAI,
+            ):
+                from .openai_llm import OpenAI
+
+                assert await OpenAI().arun("foo", log=handle_log) == "0"
+
+        @pytest.mark.asyncio
+        async def test_it_calls_all_events(mocker):
+            handle_log = mocker.stub()
+
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.AsyncOpenAI",
+                lambda api_key=None: MockASyncOpenAI(api_key, times=3),
+            ):
+                from .openai_llm import OpenAI
+
+                assert await OpenAI().arun("foo", log=handle_log) == "012"
+
+                handle_log.assert_any_call("start", None)
+                handle_log.assert_any_call("data", {"content": "0"})
+                handle_log.assert_any_call("data", {"content": "1"})
+                handle_log.assert_any_call("data", {"content": "2"})
+                handle_log.assert_any_call("end", None)
+
+        @pytest.mark.asyncio
+        async def test_it_passes_kwargs():
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.AsyncOpenAI",
+            ) as mocked_async_openai:
+                fake_create = AsyncMock(return_value=FakeGenerator(1))
+                mocked_async_openai.return_value.chat.completions.create = fake_create
+                from .openai_llm import OpenAI
+
+                await OpenAI(model="gpt-foo").arun("foo", log=handle_log, foo="foo")
+                fake_create.assert_awaited_with(
+                    messages=[{"role": "user", "content": "foo"}],
+                    model="gpt-foo",
+                    foo="foo",
+                    stream=True,
+                )
+
+    # # except openai.error.Timeout as e:
+    # #   # Handle timeout error, e.g. retry or log
+    # #   print(f"OpenAI API request timed out: {e}")
+    # #   pass
+    # # except openai.error.APIError as e:
+    # #   # Handle API error, e.g. retry or log
+    # #   print(f"OpenAI API returned an API Error: {e}")
+    # #   pass
+    # # except openai.error.APIConnectionError as e:
+    # #   # Handle connection error, e.g. check network or log
+    # #   print(f"OpenAI API request failed to connect: {e}")
+    # #   pass
+    # # except openai.error.InvalidRequestError as e:
+    # #   # Handle invalid request error, e.g. validate parameters or log
+    # #   print(f"OpenAI API request was invalid: {e}")
+    # #   pass
+    # # except openai.error.AuthenticationError as e:
+    # #   # Handle authentication error, e.g. check credentials or log
+    # #   print(f"OpenAI API request was not authorized: {e}")
+    # #   pass
+    # # except openai.error.PermissionError as e:
+    # #   # Handle permission error, e.g. check scope or log
+    # #   print(f"OpenAI API request was not permitted: {e}")
+    # #   pass
+    # # except openai.error.RateLimitError as e:
+    # #   # Handle rate limit error, e.g. wait or log
+    # #   print(f"OpenAI API request exceeded rate limit: {e}")
+    # #   pass
+
+    def describe_rate_limiting():
+        def test_it_acquires_from_its_rate_limiter(mocker):
+            rate_limiter = mocker.Mock()
+            with patch("diagraph.llm.openai_llm.openai_llm.SyncOpenAI", MockSyncOpenAI):
+                from .openai_llm import OpenAI
+
+                assert OpenAI(rate_limiter=rate_limiter).run("foo", log=handle_log) == "0"
+            rate_limiter.acquire.assert_called_once_with([{"role": "user", "content": "foo"}])
+
+        @pytest.mark.asyncio
+        async def test_it_acquires_from_its_rate_limiter_asynchronously(mocker):
+            rate_limiter = mocker.Mock()
+            rate_limiter.aacquire = mocker.AsyncMock()
+            with patch("diagraph.llm.openai_llm.openai_llm.AsyncOpenAI", MockASyncOpenAI):
+                from .openai_llm import OpenAI
+
+                assert await OpenAI(rate_limiter=rate_limiter).arun("foo", log=handle_log) == "0"
+            rate_limiter.aacquire.assert_awaited_once_with([{"role": "user", "content": "foo"}])
+            rate_limiter.acquire.assert_not_called()
+
+    def describe_retries():
+        def test_it_retries_transient_errors(mocker):
+            handle_log = mocker.stub()
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.SyncOpenAI",
+            ) as mocked_sync_openai:
+                fake_create = Mock(side_effect=[TimeoutError("timed out"), iterable(2)])
+                mocked_sync_openai.return_value.chat.completions.create = fake_create
+                from ..retry_policy import RetryPolicy
+                from .openai_llm import OpenAI
+
+                sleep = mocker.stub()
+                llm = OpenAI(retry=RetryPolicy(jitter=False, sleep=sleep))
+                assert llm.run("foo", log=handle_log) == "01"
+            assert fake_create.call_count == 2
+            sleep.assert_called_once_with(1)
+
+        def test_it_does_not_retry_other_errors(mocker):
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.SyncOpenAI",
+            ) as mocked_sync_openai:
+                fake_create = Mock(side_effect=Exception("wruh wroh"))
+                mocked_sync_openai.return_value.chat.completions.create = fake_create
+                from ..retry_policy import RetryPolicy
+                from .openai_llm import OpenAI
+
+                with pytest.raises(Exception, match="wruh wroh"):
+                    OpenAI(retry=RetryPolicy(sleep=mocker.stub())).run("foo", log=handle_log)
+            assert fake_create.call_count == 1
+
+        def test_it_rate_limits_every_attempt(mocker):
+            rate_limiter = mocker.Mock()
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.SyncOpenAI",
+            ) as mocked_sync_openai:
+                fake_create = Mock(side_effect=[TimeoutError("timed out"), iterable(1)])
+                mocked_sync_openai.return_value.chat.completions.create = fake_create
+                from ..retry_policy import RetryPolicy
+                from .openai_llm import OpenAI
+
+                llm = OpenAI(rate_limiter=rate_limiter, retry=RetryPolicy(sleep=mocker.stub()))
+                assert llm.run("foo", log=handle_log) == "0"
+            assert rate_limiter.acquire.call_count == 2
+
+        def test_it_does_not_retry_a_cancelled_request(mocker):
+            token = CancellationToken()
+            token.error = Exception("cancelled")
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.SyncOpenAI",
+            ) as mocked_sync_openai:
+                fake_create = Mock(side_effect=[TimeoutError("timed out"), iterable(2)])
+                mocked_sync_openai.return_value.chat.completions.create = fake_create
+                from ..retry_policy import RetryPolicy
+                from .openai_llm import OpenAI
+
+                llm = OpenAI(retry=RetryPolicy(sleep=mocker.stub()))
+                with pytest.raises(Exception, match="cancelled"):
+                    llm.run("foo", log=handle_log, cancellation=token)
+            assert fake_create.call_count == 1
+
+        @pytest.mark.asyncio
+        async def test_it_retries_asynchronously(mocker):
+            create = AsyncMock(side_effect=[TimeoutError("timed out"), FakeGenerator(3)])
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.AsyncOpenAI",
+            ) as mocked_async_openai:
+                mocked_async_openai.return_value.chat.completions.create = create
+                from ..retry_policy import RetryPolicy
+                from .openai_llm import OpenAI
+
+                sleep = mocker.stub()
+                asleep = mocker.AsyncMock()
+                llm = OpenAI(retry=RetryPolicy(jitter=False, sleep=sleep, asleep=asleep))
+                assert await llm.arun("foo", log=handle_log) == "012"
+            assert create.await_count == 2
+            asleep.assert_awaited_once_with(1)
+            sleep.assert_not_called()
+
+    def describe_cancellation():
+        def test_it_closes_a_stream_that_is_abandoned(mocker):
+            stream = mocker.MagicMock()
+            stream.__iter__.return_value = iter([make_completion("0"), make_completion("1")])
+
+            def log(event, chunk):
+                if event == "data":
+                    raise Exception("cancelled")
+
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.SyncOpenAI",
+            ) as mocked_sync_openai:
+                mocked_sync_openai.return_value.chat.completions.create = Mock(return_value=stream)
+                from .openai_llm import OpenAI
+
+                with pytest.raises(Exception, match="cancelled"):
+                    OpenAI().run("foo", log=log)
+            stream.close.assert_called_once()
+
+        @pytest.mark.asyncio
+        async def test_it_closes_an_async_stream_that_is_abandoned(mocker):
+            class Stream(FakeGenerator):
+                close = mocker.AsyncMock()
+
+            def log(event, chunk):
+                if event == "data":
+                    raise Exception("cancelled")
+
+            with patch(
+                "diagraph.llm.openai_llm.openai_llm.AsyncOpenAI",
+            ) as mocked_async_openai:
+                mocked_async_openai.return_value.chat.completions.create = AsyncMock(return_value=Stream(3))
+                from .openai_llm import OpenAI
 
-# # except openai.error.Timeout as e:
-# #   # Handle timeout error, e.g. retry or log
-# #   print(f"OpenAI API request timed out: {e}")
-# #   pass
-# # except openai.error.APIError as e:
-# #   # Handle API error, e.g. retry or log
-# #   print(f"OpenAI API returned an API Error: {e}")
-# #   pass
-# # except openai.error.APIConnectionError as e:
-# #   # Handle connection error, e.g. check network or log
-# #   print(f"OpenAI API request failed to connect: {e}")
-# #   pass
-# # except openai.error.InvalidRequestError as e:
-# #   # Handle invalid request error, e.g. validate parameters or log
-# #   print(f"OpenAI API request was invalid: {e}")
-# #   pass
-# # except openai.error.AuthenticationError as e:
-# #   # Handle authentication error, e.g. check credentials or log
-# #   print(f"OpenAI API request was not authorized: {e}")
-# #   pass
-# # except openai.error.PermissionError as e:
-# #   # Handle permission error, e.g. check scope or log
-# #   print(f"OpenAI API request was not permitted: {e}")
-# #   pass
-# # except openai.error.RateLimitError as e:
-# #   # Handle rate limit error, e.g. wait or log
-# #   print(f"OpenAI API request exceeded rate limit: {e}")
-# #   pass
+                with pytest.raises(Exception, match="cancelled"):
+                    await OpenAI().arun("foo", log=log)
+            Stream.close.assert_awaited_once()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from .openai_llm.cast_to_input import cast_to_input
+
+SECONDS_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units, refilled at `rate` units per second.
+
+    Reservations are taken out immediately, even if the bucket runs into
+    debt; the debt tells the caller how long to wait before going ahead. This
+    keeps callers in the order they reserved in.
+    """
+
+    capacity: float
+    rate: float
+    level: float
+    updated_at: float
+
+    def __init__(self, capacity: float, rate: float, now: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated_at = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        """
+        Take `cost` units out of the bucket.
+
+        Args:
+            cost (float): The units to take. Costs above the bucket's capacity are capped to it.
+            now (float): The current time, in seconds.
+
+        Returns:
+            float: How many seconds to wait before the units are available.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.level -= min(cost, self.capacity)
+        if self.level >= 0:
+            return 0
+        return -self.level / self.rate
+
+
+class RateLimiter:
+    """
+    Throttles LLM requests to a number of requests and estimated tokens per minute.
+
+    Each budget is a token bucket that starts full, so short bursts go through
+    immediately and sustained load is spread out at the budgeted rate.
+    A single limiter can be shared between LLMs, Diagraphs and threads.
+    """
+
+    requests_per_minute: float | None
+    tokens_per_minute: float | None
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        estimate_tokens: Callable[[Any], int] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ) -> None:
+        """
+        Initialize a RateLimiter.
+
+        Args:
+            requests_per_minute (float | None): The request budget, or None for no limit.
+            tokens_per_minute (float | None): The token budget, or None for no limit.
+            estimate_tokens (Callable | None): Estimates the tokens in a prompt. Defaults to counting them with
+                                               tiktoken.
+            clock (Callable): The clock to measure time with, in seconds.
+            sleep (Callable): How to wait in synchronous code.
+        """
+        if requests_per_minute is None and tokens_per_minute is None:
+            raise Exception("A rate limiter requires requests_per_minute or tokens_per_minute")
+        for name, budget in [("requests_per_minute", requests_per_minute), ("tokens_per_minute", tokens_per_minute)]:
+            if budget is not None and budget <= 0:
+                raise Exception(f"{name} must be positive, got {budget}")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.estimate_tokens = estimate_tokens or count_tokens
+        self.clock = clock
+        self.sleep = sleep
+        self.__lock__ = threading.Lock()
+        now = clock()
+        self.__requests__ = (
+            None
+            if requests_per_minute is None
+            else TokenBucket(requests_per_minute, requests_per_minute / SECONDS_PER_MINUTE, now)
+        )
+        self.__tokens__ = (
+            None
+            if tokens_per_minute is None
+            else TokenBucket(tokens_per_minute, tokens_per_minute / SECONDS_PER_MINUTE, now)
+        )
+
+    def reserve(self, prompt: Any) -> float:
+        """
+        Reserve capacity for a request without waiting for it.
+
+        Args:
+            prompt (Any): The prompt of the request.
+
+        Returns:
+            float: How many seconds to wait before sending the request.
+        """
+        tokens = self.estimate_tokens(prompt) if self.__tokens__ is not None else 0
+        with self.__lock__:
+            now = self.clock()
+            wait = 0.0
+            if self.__requests__ is not None:
+                wait = max(wait, self.__requests__.reserve(1, now))
+            if self.__tokens__ is not None:
+                wait = max(wait, self.__tokens__.reserve(tokens, now))
+            return wait
+
+    def acquire(self, prompt: Any) -> float:
+        """
+        Wait until a request can be sent.
+
+        Args:
+            prompt (Any): The prompt of the request.
+
+        Returns:
+            float: How many seconds were spent waiting.
+        """
+        wait = self.reserve(prompt)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    async def aacquire(self, prompt: Any) -> float:
+        """
+        Wait until a request can be sent, without blocking the event loop.
+
+        Args:
+            prompt (Any): The prompt of the request.
+
+        Returns:
+            float: How many seconds were spent waiting.
+        """
+        wait = self.reserve(prompt)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+__encoding__: Any = None
+__encoding_unavailable__ = False
+
+
+def get_encoding() -> Any:
+    global __encoding__, __encoding_unavailable__
+    if __encoding__ is None and not __encoding_unavailable__:
+        try:
+            import tiktoken
+
+            __encoding__ = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # the encoding is downloaded on first use, which is not always possible
+            __encoding_unavailable__ = True
+    return __encoding__
+
+
+def count_tokens(prompt: Any) -> int:
+    """
+    Estimate the number of tokens in a prompt.
+
+    Message contents are counted with tiktoken, plus a few tokens of overhead
+    per message. If the encoding cannot be loaded, a rough estimate of four
+    characters per token is used instead.
+
+    Parameters:
+    - prompt (Any): The prompt, as a string, a list of messages, or a dict of messages and options.
+
+    Returns:
+    int: The estimated number of tokens.
+    """
+    messages, _ = cast_to_input(prompt)
+    contents = [str(message.get("content") or "") for message in messages]
+    encoding = get_encoding()
+    if encoding is None:
+        tokens = sum(len(content) // 4 + 1 for content in contents)
+    else:
+        tokens = sum(len(encoding.encode(content)) for content in contents)
+    return tokens + 4 * len(messages)
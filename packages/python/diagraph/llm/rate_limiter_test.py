@@ -0,0 +1,120 @@
+import pytest
+
+from . import rate_limiter as rate_limiter_module
+from .rate_limiter import RateLimiter, TokenBucket, count_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def describe_token_bucket():
+    def test_it_starts_full():
+        bucket = TokenBucket(10, 1, now=0)
+        assert bucket.reserve(10, now=0) == 0
+
+    def test_it_waits_for_refills():
+        bucket = TokenBucket(10, 2, now=0)
+        bucket.reserve(10, now=0)
+        assert bucket.reserve(4, now=0) == 2
+        assert bucket.reserve(2, now=0) == 3
+
+    def test_it_refills_up_to_its_capacity():
+        bucket = TokenBucket(10, 1, now=0)
+        bucket.reserve(10, now=0)
+        assert bucket.reserve(10, now=1000) == 0
+        assert bucket.reserve(1, now=1000) == 1
+
+    def test_it_caps_costs_to_its_capacity():
+        bucket = TokenBucket(10, 1, now=0)
+        assert bucket.reserve(50, now=0) == 0
+        assert bucket.reserve(10, now=0) == 10
+
+
+def describe_rate_limiter():
+    def test_it_requires_a_budget():
+        with pytest.raises(Exception, match="requires requests_per_minute or tokens_per_minute"):
+            RateLimiter()
+
+    def test_it_validates_budgets():
+        with pytest.raises(Exception, match="requests_per_minute must be positive"):
+            RateLimiter(requests_per_minute=0)
+
+    def test_it_allows_bursts_up_to_the_budget():
+        clock = Clock()
+        limiter = RateLimiter(requests_per_minute=3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            limiter.acquire("foo")
+        assert clock.sleeps == []
+
+    def test_it_spreads_sustained_requests_at_the_budgeted_rate():
+        clock = Clock()
+        limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+        for _ in range(63):
+            limiter.acquire("foo")
+        assert clock.sleeps == [1, 1, 1]
+
+    def test_it_budgets_estimated_tokens():
+        clock = Clock()
+        limiter = RateLimiter(
+            tokens_per_minute=600,
+            estimate_tokens=len,
+            clock=clock,
+            sleep=clock.sleep,
+        )
+        limiter.acquire("a" * 600)
+        assert limiter.acquire("a" * 100) == 10
+        assert clock.sleeps == [10]
+
+    def test_it_applies_the_tightest_budget():
+        clock = Clock()
+        limiter = RateLimiter(
+            requests_per_minute=60,
+            tokens_per_minute=60,
+            estimate_tokens=lambda _: 30,
+            clock=clock,
+            sleep=clock.sleep,
+        )
+        limiter.acquire("foo")
+        limiter.acquire("foo")
+        assert limiter.reserve("foo") == 30
+
+    @pytest.mark.asyncio
+    async def test_it_waits_without_blocking_the_loop(mocker):
+        clock = Clock()
+        sleep = mocker.patch("diagraph.llm.rate_limiter.asyncio.sleep")
+        limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+
+        await limiter.aacquire("foo")
+        assert await limiter.aacquire([{"role": "user", "content": "foo"}]) == 0
+        for _ in range(58):
+            await limiter.aacquire("foo")
+        await limiter.aacquire("foo")
+
+        sleep.assert_called_once_with(1)
+        assert clock.sleeps == []
+
+
+def describe_count_tokens():
+    def test_it_counts_with_tiktoken(mocker):
+        encoding = mocker.Mock()
+        encoding.encode = lambda content: content.split(" ")
+        mocker.patch.object(rate_limiter_module, "__encoding__", encoding)
+
+        assert count_tokens("one two three") == 3 + 4
+        assert count_tokens([{"role": "user", "content": "one"}, {"role": "assistant", "content": "two"}]) == 2 + 8
+
+    def test_it_estimates_without_an_encoding(mocker):
+        mocker.patch.object(rate_limiter_module, "__encoding__", None)
+        mocker.patch.object(rate_limiter_module, "__encoding_unavailable__", True)
+
+        assert count_tokens("a" * 40) == 11 + 4
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+if TYPE_CHECKING:
+    from ..classes.cancellation_token import CancellationToken
+
+T = TypeVar("T")
+
+RetryOn = tuple[type[BaseException], ...] | Callable[[BaseException], bool]
+
+# errors that are likely to go away if the request is repeated. APIConnectionError
+# includes APITimeoutError.
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class RetryPolicy:
+    """
+    Retries failed LLM requests with exponential backoff and jitter.
+
+    The delay before attempt `n + 1` is drawn uniformly between zero and
+    `min(max_delay, initial_delay * multiplier ** (n - 1))` when `jitter` is
+    on ("full jitter"), which keeps many clients that failed together from
+    retrying together. Only errors matched by `retry_on` are retried, which
+    by default are connection errors, timeouts, rate limits and server
+    errors; any other error, or the error of the last attempt, is raised.
+
+    A request whose node has been cancelled is not retried: the policy checks
+    the `cancellation` token, when given, before waiting and again before
+    every retry, so a node that timed out stops instead of sending another
+    request. Synchronous delays wait on the token rather than sleeping, so
+    they end as soon as the node is cancelled.
+    """
+
+    max_attempts: int
+    initial_delay: float
+    max_delay: float
+    multiplier: float
+    jitter: bool
+    retry_on: RetryOn
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        initial_delay: float = 1.0,
+        max_delay: float = 30.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        retry_on: RetryOn = TRANSIENT_ERRORS,
+        sleep: Callable[[float], Any] = time.sleep,
+        asleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        random: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Initialize a RetryPolicy.
+
+        Args:
+            max_attempts (int): The maximum number of attempts, including the first.
+            initial_delay (float): The delay, in seconds, before the first retry.
+            max_delay (float): The longest delay, in seconds, between attempts.
+            multiplier (float): How much the delay grows after every attempt.
+            jitter (bool): Whether to randomize delays.
+            retry_on (tuple | Callable): The exception types to retry, or a predicate that decides.
+            sleep (Callable): How to wait in synchronous code, when there is no cancellation token to wait on.
+            asleep (Callable): How to wait in asynchronous code.
+            random (Callable): A source of random numbers in [0, 1).
+        """
+        if max_attempts < 1:
+            raise Exception(f"max_attempts must be at least 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_on = retry_on
+        self.sleep = sleep
+        self.asleep = asleep
+        self.random = random
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """
+        Decide whether to retry after a failed attempt.
+
+        Args:
+            error (BaseException): The error the attempt failed with.
+            attempt (int): The number of the failed attempt, starting from 1.
+
+        Returns:
+            bool: True if another attempt should be made.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if isinstance(self.retry_on, tuple):
+            return isinstance(error, self.retry_on)
+        return self.retry_on(error)
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Get how long to wait after a failed attempt.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting from 1.
+
+        Returns:
+            float: The delay, in seconds.
+        """
+        delay = min(self.max_delay, self.initial_delay * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            return delay * self.random()
+        return delay
+
+    def run(
+        self,
+        fn: Callable[..., T],
+        *args,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> T:
+        """
+        Call a function, retrying it according to the policy.
+
+        `cancellation`, if given, is checked before every retry, and raises
+        once the request should stop. Delays are spent waiting on it, so a
+        request cancelled while backing off stops straight away.
+        """
+        attempt = 1
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+            raise_if_cancelled(cancellation)
+            delay = self.get_delay(attempt)
+            if cancellation is None:
+                self.sleep(delay)
+            else:
+                cancellation.wait(delay)
+            raise_if_cancelled(cancellation)
+            attempt += 1
+
+    async def arun(
+        self,
+        fn: Callable[..., Awaitable[T]],
+        *args,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> T:
+        """
+        Await a coroutine function, retrying it according to the policy.
+
+        Delays are awaited, so waiting for a retry does not block the event loop.
+        """
+        attempt = 1
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+            raise_if_cancelled(cancellation)
+            await self.asleep(self.get_delay(attempt))
+            raise_if_cancelled(cancellation)
+            attempt += 1
+
+
+def raise_if_cancelled(cancellation: CancellationToken | None) -> None:
+    if cancellation is not None:
+        cancellation.raise_if_cancelled()
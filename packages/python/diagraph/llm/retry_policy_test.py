@@ -0,0 +1,167 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from openai import APIConnectionError, AuthenticationError, RateLimitError
+
+from ..classes.cancellation_token import CancellationToken
+from .retry_policy import RetryPolicy
+
+request = Mock()
+
+
+def make_response(status_code):
+    return Mock(request=request, status_code=status_code, headers={})
+
+
+def rate_limit_error():
+    return RateLimitError("slow down", response=make_response(429), body=None)
+
+
+class Failing:
+    def __init__(self, errors, result="foo"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def describe_retry_policy():
+    def test_it_validates_max_attempts():
+        with pytest.raises(Exception, match="max_attempts must be at least 1"):
+            RetryPolicy(max_attempts=0)
+
+    def describe_get_delay():
+        def test_it_backs_off_exponentially():
+            policy = RetryPolicy(initial_delay=1, multiplier=2, max_delay=100, jitter=False)
+            assert [policy.get_delay(attempt) for attempt in range(1, 5)] == [1, 2, 4, 8]
+
+        def test_it_caps_delays():
+            policy = RetryPolicy(initial_delay=1, multiplier=10, max_delay=30, jitter=False)
+            assert policy.get_delay(3) == 30
+
+        def test_it_jitters_delays():
+            policy = RetryPolicy(initial_delay=1, multiplier=2, random=lambda: 0.25)
+            assert policy.get_delay(3) == 1
+
+    def describe_should_retry():
+        def test_it_retries_transient_errors_by_default():
+            policy = RetryPolicy()
+            assert policy.should_retry(rate_limit_error(), 1) is True
+            assert policy.should_retry(APIConnectionError(request=request), 1) is True
+            assert policy.should_retry(TimeoutError(), 1) is True
+
+        def test_it_does_not_retry_other_errors_by_default():
+            policy = RetryPolicy()
+            error = AuthenticationError("no", response=make_response(401), body=None)
+            assert policy.should_retry(error, 1) is False
+            assert policy.should_retry(Exception("foo"), 1) is False
+
+        def test_it_stops_after_max_attempts():
+            policy = RetryPolicy(max_attempts=3)
+            assert policy.should_retry(TimeoutError(), 2) is True
+            assert policy.should_retry(TimeoutError(), 3) is False
+
+        def test_it_accepts_a_predicate():
+            policy = RetryPolicy(retry_on=lambda error: str(error) == "again")
+            assert policy.should_retry(Exception("again"), 1) is True
+            assert policy.should_retry(Exception("foo"), 1) is False
+
+    def describe_run():
+        def test_it_returns_the_first_success():
+            sleeps = []
+            fn = Failing([TimeoutError(), rate_limit_error()])
+            policy = RetryPolicy(jitter=False, sleep=sleeps.append)
+            assert policy.run(fn, "bar") == "foo"
+            assert fn.calls == 3
+            assert sleeps == [1, 2]
+
+        def test_it_raises_the_last_error():
+            fn = Failing([TimeoutError("1"), TimeoutError("2"), TimeoutError("3")])
+            policy = RetryPolicy(max_attempts=2, sleep=lambda _: None)
+            with pytest.raises(TimeoutError, match="2"):
+                policy.run(fn)
+            assert fn.calls == 2
+
+        def test_it_does_not_retry_unretryable_errors():
+            fn = Failing([Exception("foo")])
+            policy = RetryPolicy(sleep=lambda _: None)
+            with pytest.raises(Exception, match="foo"):
+                policy.run(fn)
+            assert fn.calls == 1
+
+        def test_it_stops_waiting_once_cancelled(mocker):
+            fn = Failing([TimeoutError("1"), TimeoutError("2")])
+            sleep = mocker.stub()
+            token = CancellationToken()
+            timer = threading.Timer(0.05, lambda: setattr(token, "error", Exception("cancelled")))
+
+            policy = RetryPolicy(initial_delay=30, jitter=False, sleep=sleep)
+            started = time.monotonic()
+            timer.start()
+            with pytest.raises(Exception, match="cancelled"):
+                policy.run(fn, cancellation=token)
+            assert time.monotonic() - started < 5
+            assert fn.calls == 1
+            sleep.assert_not_called()
+
+        def test_it_does_not_wait_once_cancelled(mocker):
+            fn = Failing([TimeoutError("1")])
+            sleep = mocker.stub()
+            token = CancellationToken()
+            token.error = Exception("cancelled")
+
+            with pytest.raises(Exception, match="cancelled"):
+                RetryPolicy(sleep=sleep).run(fn, cancellation=token)
+            sleep.assert_not_called()
+
+    def describe_arun():
+        @pytest.mark.asyncio
+        async def test_it_awaits_delays_without_sleeping(mocker):
+            sleep = mocker.stub()
+            asleep = mocker.AsyncMock()
+            failing = Failing([TimeoutError()])
+
+            async def fn(*args, **kwargs):
+                return failing(*args, **kwargs)
+
+            policy = RetryPolicy(jitter=False, sleep=sleep, asleep=asleep)
+            assert await policy.arun(fn) == "foo"
+            asleep.assert_awaited_once_with(1)
+            sleep.assert_not_called()
+
+        @pytest.mark.asyncio
+        async def test_it_raises_the_last_error():
+            failing = Failing([TimeoutError("1"), TimeoutError("2")])
+
+            async def fn():
+                return failing()
+
+            async def asleep(_):
+                pass
+
+            policy = RetryPolicy(max_attempts=2, asleep=asleep)
+            with pytest.raises(TimeoutError, match="2"):
+                await policy.arun(fn)
+
+        @pytest.mark.asyncio
+        async def test_it_does_not_retry_once_cancelled():
+            failing = Failing([TimeoutError("1"), TimeoutError("2")])
+            token = CancellationToken()
+
+            async def fn():
+                return failing()
+
+            async def asleep(_):
+                token.error = Exception("cancelled")
+
+            policy = RetryPolicy(asleep=asleep)
+            with pytest.raises(Exception, match="cancelled"):
+                await policy.arun(fn, cancellation=token)
+            assert failing.calls == 1
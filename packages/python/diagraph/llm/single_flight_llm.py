@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+from ..classes.cancellation_token import CancellationToken
+from ..classes.types import FunctionLogHandler, LogEventName
+from .get_request_key import get_request_key
+from .llm import LLM
+
+LogEvent = tuple[LogEventName, Any]
+
+# how often, in seconds, a flight waiting to retry checks if its waiters have been cancelled
+POLL_INTERVAL = 0.05
+
+
+class Waiter:
+    """
+    A single request waiting on a flight, and the outcome it receives.
+
+    Synchronous waiters block on `done`. Asynchronous waiters await `future`,
+    which must belong to the event loop the flight runs on.
+    """
+
+    log: FunctionLogHandler
+    cancellation: CancellationToken | None
+    done: threading.Event
+    future: asyncio.Future | None
+    result: Any
+    error: BaseException | None
+
+    def __init__(
+        self,
+        log: FunctionLogHandler,
+        cancellation: CancellationToken | None = None,
+        future: asyncio.Future | None = None,
+    ) -> None:
+        self.log = log
+        self.cancellation = cancellation
+        self.done = threading.Event()
+        self.future = future
+        self.result = None
+        self.error = None
+
+    def resolve(self, result: Any = None, error: BaseException | None = None) -> None:
+        if self.done.is_set():
+            return
+        self.result = result
+        self.error = error
+        if self.future is not None and not self.future.done():
+            if error is None:
+                self.future.set_result(result)
+            elif isinstance(error, asyncio.CancelledError):
+                self.future.cancel()
+            else:
+                self.future.set_exception(error)
+        self.done.set()
+
+    def get_result(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class Flight:
+    """
+    A single upstream request, and everyone waiting on it.
+
+    Every log event is recorded as it arrives and forwarded to each waiter. A
+    waiter that joins late is first sent the events it missed, so every
+    waiter sees the full stream, in order.
+
+    Waiters are isolated from each other. A waiter whose log handler raises,
+    or whose cancellation token is cancelled, such as a node that timed out,
+    is unsubscribed and fails on its own, while the request carries on for
+    everyone else. The request is only stopped once no one is left waiting
+    on it, which is when its own `cancellation` token is cancelled.
+    """
+
+    lock: threading.Lock
+    events: list[LogEvent]
+    waiters: list[Waiter]
+    closed: bool
+    task: asyncio.Task | None
+    cancellation: FlightCancellation
+
+    def __init__(self, waiter: Waiter) -> None:
+        self.lock = threading.Lock()
+        self.events = []
+        self.waiters = [waiter]
+        self.closed = False
+        self.task = None
+        self.cancellation = FlightCancellation(self)
+
+    def join(self, waiter: Waiter) -> bool:
+        """
+        Subscribe a waiter to the flight.
+
+        Args:
+            waiter (Waiter): The waiter.
+
+        Returns:
+            bool: False if the flight has already finished or been abandoned, and cannot be joined.
+        """
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                for event, chunk in self.events:
+                    waiter.log(event, chunk)
+            except BaseException as e:
+                waiter.resolve(error=e)
+                return True
+            self.waiters.append(waiter)
+        return True
+
+    def leave(self, waiter: Waiter) -> bool:
+        """
+        Unsubscribe a waiter from the flight.
+
+        Args:
+            waiter (Waiter): The waiter.
+
+        Returns:
+            bool: True if no one is left waiting, in which case the flight is abandoned.
+        """
+        with self.lock:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            if self.waiters or self.closed:
+                return False
+            self.closed = True
+            return True
+
+    def log(self, event: LogEventName, chunk: Any) -> None:
+        with self.lock:
+            self.events.append((event, chunk))
+            waiters = list(self.waiters)
+        for waiter in waiters:
+            self.__notify__(waiter, event, chunk)
+
+    def __notify__(self, waiter: Waiter, event: LogEventName, chunk: Any) -> None:
+        try:
+            waiter.log(event, chunk)
+        except BaseException as e:
+            if self.__drop__(waiter, e):
+                # no one is left to receive the response, so the request is stopped
+                raise
+
+    def drop_cancelled(self) -> None:
+        """
+        Unsubscribe every waiter whose cancellation token has been cancelled.
+        """
+        with self.lock:
+            waiters = list(self.waiters)
+        for waiter in waiters:
+            if waiter.cancellation is not None and waiter.cancellation.error is not None:
+                self.__drop__(waiter, waiter.cancellation.error)
+
+    def __drop__(self, waiter: Waiter, error: BaseException) -> bool:
+        waiter.resolve(error=error)
+        if self.leave(waiter):
+            self.cancellation.error = error
+            return True
+        return False
+
+    def finish(self, result: Any = None, error: BaseException | None = None) -> None:
+        with self.lock:
+            self.closed = True
+            waiters = list(self.waiters)
+            self.waiters.clear()
+        for waiter in waiters:
+            waiter.resolve(result, error)
+
+
+class FlightCancellation(CancellationToken):
+    """
+    The cancellation token of a flight's upstream request, which is cancelled
+    once every request waiting on the flight has been cancelled.
+    """
+
+    flight: Flight
+
+    def __init__(self, flight: Flight) -> None:
+        super().__init__()
+        self.flight = flight
+
+    def raise_if_cancelled(self) -> None:
+        # waiters are cancelled by their own nodes, so they are checked whenever the request asks
+        self.flight.drop_cancelled()
+        super().raise_if_cancelled()
+
+    def wait(self, timeout: float) -> bool:
+        # the waiters' tokens do not wake the flight, so they are polled while it waits
+        deadline = time.monotonic() + timeout
+        while True:
+            self.flight.drop_cancelled()
+            remaining = deadline - time.monotonic()
+            if self.cancelled or remaining <= 0:
+                return self.cancelled
+            super().wait(min(remaining, POLL_INTERVAL))
+
+
+class SingleFlightLLM(LLM):
+    """
+    Wraps an LLM and coalesces identical requests that are in flight at the
+    same time.
+
+    The first request for a given prompt and configuration goes upstream.
+    Identical requests made while it is in flight wait for it instead, and
+    receive its log events and its result, or its error. Once a request
+    completes, the next identical request goes upstream again.
+
+    A request that times out or is cancelled only fails itself: the
+    upstream request carries on for the others waiting on it, and is only
+    stopped once every one of them has gone.
+
+    Synchronous requests are coalesced across threads. Asynchronous requests
+    are coalesced within an event loop.
+    """
+
+    llm: LLM
+
+    def __init__(self, llm: LLM) -> None:
+        """
+        Initialize a SingleFlightLLM.
+
+        Args:
+            llm (LLM): The LLM to send requests to.
+        """
+        self.llm = llm
+        self.__lock__ = threading.Lock()
+        self.__flights__: dict[str, Flight] = {}
+        self.__async_flights__: dict[tuple[int, str], Flight] = {}
+
+    @property
+    def kwargs(self) -> dict[str, Any]:
+        return getattr(self.llm, "kwargs", {})
+
+    def run(
+        self,
+        _prompt: Any,
+        log: FunctionLogHandler,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> Any:
+        key = get_request_key(self.llm, _prompt, kwargs)
+        waiter = Waiter(log, cancellation)
+        flight, is_leader = self.__board__(self.__flights__, key, waiter)
+
+        if is_leader:
+            # a thread cannot hand off the request it is running, so a leader that
+            # fails keeps running it for everyone else, and raises its own error afterwards
+            try:
+                result = self.llm.run(_prompt, log=flight.log, cancellation=flight.cancellation, **kwargs)
+            except BaseException as e:
+                self.__land__(self.__flights__, key, flight, error=e)
+            else:
+                self.__land__(self.__flights__, key, flight, result=result)
+
+        waiter.done.wait()
+        return waiter.get_result()
+
+    async def arun(
+        self,
+        _prompt: Any,
+        log: FunctionLogHandler,
+        cancellation: CancellationToken | None = None,
+        **kwargs,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        key = (id(loop), get_request_key(self.llm, _prompt, kwargs))
+        waiter = Waiter(log, cancellation, future=loop.create_future())
+        flight, is_leader = self.__board__(self.__async_flights__, key, waiter)
+
+        if is_leader:
+            # the request runs in a task of its own, so it outlives a leader that is cancelled
+            flight.task = loop.create_task(self.__afly__(key, flight, _prompt, kwargs))
+
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if flight.leave(waiter) and flight.task is not None:
+                flight.task.cancel()
+            raise
+
+    def __board__(self, flights: dict[Any, Flight], key: Any, waiter: Waiter) -> tuple[Flight, bool]:
+        while True:
+            with self.__lock__:
+                flight = flights.get(key)
+                if flight is None:
+                    flight = Flight(waiter)
+                    flights[key] = flight
+                    return flight, True
+            if flight.join(waiter):
+                return flight, False
+            # the flight was abandoned before it landed, so the request goes upstream again
+            with self.__lock__:
+                if flights.get(key) is flight:
+                    del flights[key]
+
+    async def __afly__(self, key: Any, flight: Flight, prompt: Any, kwargs: dict[str, Any]) -> None:
+        try:
+            result = await self.llm.arun(prompt, log=flight.log, cancellation=flight.cancellation, **kwargs)
+        except BaseException as e:
+            self.__land__(self.__async_flights__, key, flight, error=e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self.__land__(self.__async_flights__, key, flight, result=result)
+
+    def __land__(
+        self,
+        flights: dict[Any, Flight],
+        key: Any,
+        flight: Flight,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        with self.__lock__:
+            if flights.get(key) is flight:
+                del flights[key]
+        flight.finish(result, error)
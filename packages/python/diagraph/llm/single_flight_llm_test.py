@@ -0,0 +1,352 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ..classes.cancellation_token import CancellationToken
+from ..classes.errors import NodeTimeoutError
+from .llm import LLM
+from .retry_policy import RetryPolicy
+from .single_flight_llm import SingleFlightLLM
+
+
+class GatedLLM(LLM):
+    """Streams one event, then waits to be released before finishing."""
+
+    def __init__(self, error=None, **kwargs):
+        self.kwargs = kwargs
+        self.calls = 0
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def run(self, prompt, log, **kwargs):
+        self.calls += 1
+        log("start", None)
+        log("data", {"content": "a"})
+        self.started.set()
+        assert self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        log("data", {"content": "b"})
+        log("end", None)
+        return f"response to {prompt}"
+
+
+class AsyncGatedLLM(GatedLLM):
+    async def arun(self, prompt, log, **kwargs):
+        self.calls += 1
+        log("start", None)
+        log("data", {"content": "a"})
+        self.started.set()
+        while not self.release.is_set():
+            await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        log("data", {"content": "b"})
+        log("end", None)
+        return f"response to {prompt}"
+
+
+class PollingLLM(LLM):
+    """Checks its cancellation token until released, like an LLM waiting to retry."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.stopped = threading.Event()
+
+    def run(self, prompt, log, cancellation=None, **kwargs):
+        log("start", None)
+        self.started.set()
+        try:
+            while not self.release.wait(timeout=0.001):
+                cancellation.raise_if_cancelled()
+        finally:
+            self.stopped.set()
+        return f"response to {prompt}"
+
+
+EVENTS = [
+    ("start", None),
+    ("data", {"content": "a"}),
+    ("data", {"content": "b"}),
+    ("end", None),
+]
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def fail_after(log, calls, error):
+    """Raises from the log handler once it has been called a number of times, like a node that timed out."""
+
+    def side_effect(*_args):
+        if log.call_count > calls:
+            raise error
+
+    log.side_effect = side_effect
+    return log
+
+
+def run_in_thread(fn, results, index):
+    def target():
+        try:
+            results[index] = fn()
+        except Exception as e:
+            results[index] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def describe_single_flight_llm():
+    def test_it_coalesces_identical_requests(mocker):
+        llm = GatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        logs = [mocker.stub() for _ in range(3)]
+        results = [None] * 3
+
+        leader = run_in_thread(lambda: single_flight.run("foo", log=logs[0]), results, 0)
+        assert llm.started.wait(timeout=5)
+        followers = [run_in_thread(lambda i=i: single_flight.run("foo", log=logs[i]), results, i) for i in range(1, 3)]
+        # wait for the followers to join the flight, and replay what they missed
+        for log in logs[1:]:
+            wait_until(lambda log=log: log.call_count == 2)
+        llm.release.set()
+        for thread in [leader, *followers]:
+            thread.join(timeout=5)
+
+        assert llm.calls == 1
+        assert results == ["response to foo"] * 3
+        for log in logs:
+            assert [c.args for c in log.call_args_list] == EVENTS
+
+    def test_it_does_not_coalesce_different_requests(mocker):
+        llm = GatedLLM()
+        llm.release.set()
+        single_flight = SingleFlightLLM(llm)
+
+        assert single_flight.run("foo", log=mocker.stub()) == "response to foo"
+        assert single_flight.run("bar", log=mocker.stub()) == "response to bar"
+        assert llm.calls == 2
+
+    def test_it_sends_completed_requests_upstream_again(mocker):
+        llm = GatedLLM()
+        llm.release.set()
+        single_flight = SingleFlightLLM(llm)
+
+        single_flight.run("foo", log=mocker.stub())
+        single_flight.run("foo", log=mocker.stub())
+        assert llm.calls == 2
+
+    def test_it_shares_errors(mocker):
+        llm = GatedLLM(error=Exception("upstream error"))
+        single_flight = SingleFlightLLM(llm)
+        results = [None] * 2
+
+        leader = run_in_thread(lambda: single_flight.run("foo", log=mocker.stub()), results, 0)
+        assert llm.started.wait(timeout=5)
+        follower_log = mocker.stub()
+        follower = run_in_thread(lambda: single_flight.run("foo", log=follower_log), results, 1)
+        wait_until(lambda: follower_log.call_count == 2)
+        llm.release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        assert llm.calls == 1
+        assert [str(result) for result in results] == ["upstream error"] * 2
+
+    def test_it_only_fails_a_follower_that_times_out(mocker):
+        llm = GatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        timeout = NodeTimeoutError("follower", 0.1)
+        logs = [mocker.stub(), fail_after(mocker.stub(), 2, timeout), mocker.stub()]
+        results = [None] * 3
+
+        leader = run_in_thread(lambda: single_flight.run("foo", log=logs[0]), results, 0)
+        assert llm.started.wait(timeout=5)
+        followers = [run_in_thread(lambda i=i: single_flight.run("foo", log=logs[i]), results, i) for i in range(1, 3)]
+        for log in logs[1:]:
+            wait_until(lambda log=log: log.call_count == 2)
+        llm.release.set()
+        for thread in [leader, *followers]:
+            thread.join(timeout=5)
+
+        assert llm.calls == 1
+        assert results == ["response to foo", timeout, "response to foo"]
+        # the follower is unsubscribed once its handler raises
+        assert logs[1].call_count == 3
+        for log in (logs[0], logs[2]):
+            assert [c.args for c in log.call_args_list] == EVENTS
+
+    def test_it_hands_the_request_over_when_the_leader_times_out(mocker):
+        llm = GatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        timeout = NodeTimeoutError("leader", 0.1)
+        leader_log = fail_after(mocker.stub(), 2, timeout)
+        follower_log = mocker.stub()
+        results = [None] * 2
+
+        leader = run_in_thread(lambda: single_flight.run("foo", log=leader_log), results, 0)
+        assert llm.started.wait(timeout=5)
+        follower = run_in_thread(lambda: single_flight.run("foo", log=follower_log), results, 1)
+        wait_until(lambda: follower_log.call_count == 2)
+        llm.release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        assert llm.calls == 1
+        assert results == [timeout, "response to foo"]
+        assert [c.args for c in follower_log.call_args_list] == EVENTS
+
+    def test_it_stops_the_request_when_no_one_is_waiting(mocker):
+        llm = GatedLLM()
+        llm.release.set()
+        single_flight = SingleFlightLLM(llm)
+        timeout = NodeTimeoutError("leader", 0.1)
+
+        with pytest.raises(NodeTimeoutError):
+            single_flight.run("foo", log=fail_after(mocker.stub(), 1, timeout))
+        # the flight has landed, so the next request goes upstream
+        assert single_flight.run("foo", log=mocker.stub()) == "response to foo"
+        assert llm.calls == 2
+
+    def test_it_only_cancels_the_request_once_every_waiter_is_cancelled(mocker):
+        llm = PollingLLM()
+        single_flight = SingleFlightLLM(llm)
+        tokens = [CancellationToken(), CancellationToken()]
+        errors = [NodeTimeoutError("leader", 0.1), NodeTimeoutError("follower", 0.1)]
+        follower_log = mocker.stub()
+        results = [None] * 2
+
+        leader = run_in_thread(lambda: single_flight.run("foo", log=mocker.stub(), cancellation=tokens[0]), results, 0)
+        assert llm.started.wait(timeout=5)
+        follower = run_in_thread(
+            lambda: single_flight.run("foo", log=follower_log, cancellation=tokens[1]),
+            results,
+            1,
+        )
+        wait_until(lambda: follower_log.call_count == 1)
+
+        tokens[0].error = errors[0]
+        # the request carries on for the follower
+        assert not llm.stopped.wait(timeout=0.05)
+        tokens[1].error = errors[1]
+        assert llm.stopped.wait(timeout=5)
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        assert results == errors
+
+    def test_it_stops_backing_off_once_every_waiter_is_cancelled(mocker):
+        flaky = mocker.Mock(side_effect=TimeoutError("upstream timed out"))
+
+        class RetryingLLM(LLM):
+            kwargs = {}
+
+            def run(self, prompt, log, cancellation=None, **kwargs):
+                return RetryPolicy(initial_delay=30, jitter=False).run(flaky, cancellation=cancellation)
+
+        token = CancellationToken()
+        threading.Timer(0.05, lambda: setattr(token, "error", NodeTimeoutError("fn", 0.05))).start()
+        started = time.monotonic()
+        with pytest.raises(NodeTimeoutError):
+            SingleFlightLLM(RetryingLLM()).run("foo", log=mocker.stub(), cancellation=token)
+        assert time.monotonic() - started < 5
+        assert flaky.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_it_coalesces_identical_async_requests(mocker):
+        llm = AsyncGatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        logs = [mocker.stub() for _ in range(3)]
+
+        tasks = [asyncio.create_task(single_flight.arun("foo", log=log)) for log in logs]
+        while not llm.started.is_set():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        llm.release.set()
+        results = await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+        assert llm.calls == 1
+        assert results == ["response to foo"] * 3
+        for log in logs:
+            assert [c.args for c in log.call_args_list] == EVENTS
+
+    @pytest.mark.asyncio
+    async def test_it_shares_async_errors(mocker):
+        llm = AsyncGatedLLM(error=Exception("upstream error"))
+        single_flight = SingleFlightLLM(llm)
+
+        tasks = [asyncio.create_task(single_flight.arun("foo", log=mocker.stub())) for _ in range(2)]
+        while not llm.started.is_set():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        llm.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert llm.calls == 1
+        assert [str(result) for result in results] == ["upstream error"] * 2
+
+    @pytest.mark.asyncio
+    async def test_it_only_fails_an_async_follower_that_times_out(mocker):
+        llm = AsyncGatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        timeout = NodeTimeoutError("follower", 0.1)
+        logs = [mocker.stub(), fail_after(mocker.stub(), 2, timeout)]
+
+        tasks = [asyncio.create_task(single_flight.arun("foo", log=log)) for log in logs]
+        while not llm.started.is_set():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        llm.release.set()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=5)
+
+        assert llm.calls == 1
+        assert results == ["response to foo", timeout]
+
+    @pytest.mark.asyncio
+    async def test_it_hands_the_request_over_when_the_async_leader_is_cancelled(mocker):
+        llm = AsyncGatedLLM()
+        single_flight = SingleFlightLLM(llm)
+        follower_log = mocker.stub()
+
+        leader = asyncio.create_task(single_flight.arun("foo", log=mocker.stub()))
+        while not llm.started.is_set():
+            await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.arun("foo", log=follower_log))
+        await asyncio.sleep(0)
+        leader.cancel()
+        llm.release.set()
+
+        assert await asyncio.wait_for(follower, timeout=5) == "response to foo"
+        assert leader.cancelled()
+        assert llm.calls == 1
+        assert [c.args for c in follower_log.call_args_list] == EVENTS
+
+    @pytest.mark.asyncio
+    async def test_it_cancels_the_request_when_every_async_waiter_is_cancelled(mocker):
+        llm = AsyncGatedLLM()
+        single_flight = SingleFlightLLM(llm)
+
+        tasks = [asyncio.create_task(single_flight.arun("foo", log=mocker.stub())) for _ in range(2)]
+        while not llm.started.is_set():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while single_flight.__async_flights__:
+            await asyncio.sleep(0)
+
+        llm.release.set()
+        assert await single_flight.arun("foo", log=mocker.stub()) == "response to foo"
+        assert llm.calls == 2
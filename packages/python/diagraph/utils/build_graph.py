@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import inspect
 from collections.abc import Callable, Generator
 from typing import TYPE_CHECKING
 
 from ..classes.ordered_set import OrderedSet
 from ..classes.types import Fn
-from .depends import FnDependency
+from .get_signature import get_declared_dependencies
 
 if TYPE_CHECKING:
     from ..classes.diagraph import Diagraph
@@ -26,29 +25,26 @@ def get_dependencies(
     Yields:
     Generator[Fn, None, None]: A generator of functions representing the dependencies.
     """
-    for val in inspect.signature(node).parameters.values():
-        if isinstance(val.default, FnDependency):
-            dep = val.default.dependency
-
-            if diagraph.use_string_keys:
-                if node_dict is None:
+    for dep in get_declared_dependencies(node):
+        if diagraph.use_string_keys:
+            if node_dict is None:
+                raise Exception(
+                    "Cannot use string keys without providing a dictionary mapping",
+                )
+            if isinstance(dep, str):
+                fn = node_dict.get(dep)
+                if fn is None:
                     raise Exception(
-                        "Cannot use string keys without providing a dictionary mapping",
+                        f'Function "{dep}" not found in nodes dictionary mapping',
                     )
-                if isinstance(dep, str):
-                    fn = node_dict.get(dep)
-                    if fn is None:
-                        raise Exception(
-                            f'Function "{dep}" not found in nodes dictionary mapping',
-                        )
-                    yield fn
-                else:
-                    raise Exception(f"Dependency {dep} is not a string")
+                yield fn
+            else:
+                raise Exception(f"Dependency {dep} is not a string")
+        else:
+            if isinstance(dep, Callable):
+                yield dep
             else:
-                if isinstance(dep, Callable):
-                    yield dep
-                else:
-                    raise Exception(f"Dependency {dep} is not a callable function")
+                raise Exception(f"Dependency {dep} is not a callable function")
 
 
 def build_graph(
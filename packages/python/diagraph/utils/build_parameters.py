@@ -1,15 +1,114 @@
 from __future__ import annotations
 
 import inspect
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Literal
 
-from ..classes.diagraph_state.diagraph_state_record import DiagraphStateValueEmpty
-from ..classes.types import Fn
+from ..classes.diagraph_state.state_miss import StateMiss
+from ..classes.errors import DependencyError
+from ..classes.types import Fn, KeyIdentifier
 from .depends import FnDependency
+from .get_signature import get_signature
 
 if TYPE_CHECKING:
     from ..classes.diagraph import Diagraph
 
+# "dependency": filled with the result of another node
+# "optional": has a default, but takes the next input arg if there is one
+# "required": takes the next input arg, which must exist
+# "variadic": *args or **kwargs, takes every remaining input arg
+# "misplaced": a required parameter after *args, which cannot be filled
+SlotKind = Literal["dependency", "optional", "required", "variadic", "misplaced"]
+
+
+class ParameterSlot:
+    """A single parameter of a function, and how to fill it when the function runs."""
+
+    __slots__ = ("dependency", "key", "kind", "name")
+
+    kind: SlotKind
+    name: str
+    dependency: KeyIdentifier | None
+    key: KeyIdentifier | None
+
+    def __init__(
+        self,
+        kind: SlotKind,
+        name: str,
+        dependency: KeyIdentifier | None = None,
+        key: KeyIdentifier | None = None,
+    ) -> None:
+        self.kind = kind
+        self.name = name
+        self.dependency = dependency
+        self.key = key
+
+
+class ParameterPlan:
+    """
+    The parameters of a function, inspected once so that binding them on
+    every run is a loop over precomputed slots.
+    """
+
+    __slots__ = ("fn_name", "slots")
+
+    fn_name: str
+    slots: tuple[ParameterSlot, ...]
+
+    def __init__(self, fn_name: str, slots: tuple[ParameterSlot, ...]) -> None:
+        self.fn_name = fn_name
+        self.slots = slots
+
+
+def compile_parameters(diagraph: Diagraph, fn: Fn) -> ParameterPlan:
+    """
+    Inspects the signature of a function and works out how each of its parameters is filled.
+
+    Parameters:
+    - diagraph (Diagraph): The directed graph representing the dependency structure.
+    - fn (Fn): The function to compile a plan for.
+
+    Returns:
+    ParameterPlan: The slots of the function, in order.
+    """
+    slots = []
+    encountered_star = False
+    for parameter in get_signature(fn).parameters.values():
+        if parameter.default is not None and parameter.default is not inspect._empty:
+            if isinstance(parameter.default, FnDependency):
+                dep = parameter.default.dependency
+                try:
+                    key = diagraph[dep].key
+                except Exception:
+                    # reported when the function runs, as it would be without a plan
+                    key = None
+                slots.append(ParameterSlot("dependency", parameter.name, dep, key))
+            else:
+                slots.append(ParameterSlot("optional", parameter.name))
+        elif parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            encountered_star = True
+            slots.append(ParameterSlot("variadic", parameter.name))
+        else:
+            slots.append(ParameterSlot("misplaced" if encountered_star else "required", parameter.name))
+    return ParameterPlan(fn.__name__, tuple(slots))
+
+
+def get_parameter_plan(diagraph: Diagraph, fn: Fn) -> ParameterPlan:
+    """
+    Gets the compiled plan for a function, compiling it if the Diagraph has not yet.
+
+    Parameters:
+    - diagraph (Diagraph): The directed graph representing the dependency structure.
+    - fn (Fn): The function to get a plan for.
+
+    Returns:
+    ParameterPlan: The slots of the function, in order.
+    """
+    plan = diagraph.__parameter_plans__.get(fn)
+    if plan is None:
+        plan = compile_parameters(diagraph, fn)
+        diagraph.__parameter_plans__[fn] = plan
+    return plan
+
 
 def build_parameters(
     diagraph: Diagraph,
@@ -28,64 +127,50 @@ def build_parameters(
     Returns:
     list[Any]: The list of parameters for the function.
     """
+    state = diagraph.__state__
     args = []
     arg_index = 0
-    encountered_star = False
+    arg_count = len(provided_args)
     kwargs = {
         **provided_kwargs,
     }
-    for parameter in inspect.signature(fn).parameters.values():
-        if parameter.default is not None and parameter.default is not inspect._empty:
-            if isinstance(parameter.default, FnDependency):
-                dep: Fn = parameter.default.dependency
-                try:
-                    key_for_fn = dep
-                    diagraph[key_for_fn]
-                except Exception:
-                    raise Exception(
-                        f"No function has been set for dep {dep}. Available functions: {diagraph.fns}",
-                    ) from None
-                if diagraph[key_for_fn].error is not None:
-                    raise Exception(f"Error found for {key_for_fn}")
-                try:
-                    result = diagraph[key_for_fn].result
-                    if result == DiagraphStateValueEmpty():
-                        raise Exception(f"Result is None for {key_for_fn}")
-                    # args.append(diagraph[key_for_fn].result)
-                    kwargs[parameter.name] = diagraph[key_for_fn].result
-                except Exception as e:
-                    raise Exception(
-                        f"Failed to get result for {key_for_fn}: {e}",
-                    ) from None
-            else:
-                # This block is for handling the case of: a function has defined a keyword arg,
-                # but the user has passed a positional arg for that parameter.
-                # Consider:
-                # def foo(a, b=1):
-                #   ...
-                #
-                # foo(1, 2)
-                #
-                # This block of code is to ensure that the above scenario works
-                if arg_index <= len(provided_args) - 1:
-                    kwargs[parameter.name] = provided_args[arg_index]
-                    arg_index += 1
-
-        elif not str(parameter).startswith("*"):
-            if encountered_star:
+    for slot in get_parameter_plan(diagraph, fn).slots:
+        kind = slot.kind
+        if kind == "dependency":
+            key_for_fn = slot.dependency
+            if slot.key is None:
                 raise Exception(
-                    " ".join(
-                        [
-                            "Found arguments defined after * args.",
-                            "Ensure *args and **kwargs come at the end of the function parameter definitions.",
-                        ],
-                    ),
+                    f"No function has been set for dep {key_for_fn}. Available functions: {diagraph.fns}",
+                )
+            if state.get(("error", slot.key)) is not None:
+                raise DependencyError(key_for_fn, f"Error found for {key_for_fn}")
+            result = state.lookup(("result", slot.key))
+            if isinstance(result, StateMiss):
+                # the miss is not formatted in full, as these errors are usually discarded
+                raise DependencyError(
+                    key_for_fn,
+                    f"Failed to get result for {key_for_fn}: {result!r}",
                 )
-            if arg_index > len(provided_args) - 1:
+            kwargs[slot.name] = result
+        elif kind == "optional":
+            # This block is for handling the case of: a function has defined a keyword arg,
+            # but the user has passed a positional arg for that parameter.
+            # Consider:
+            # def foo(a, b=1):
+            #   ...
+            #
+            # foo(1, 2)
+            #
+            # This block of code is to ensure that the above scenario works
+            if arg_index < arg_count:
+                kwargs[slot.name] = provided_args[arg_index]
+                arg_index += 1
+        elif kind == "required":
+            if arg_index >= arg_count:
                 raise Exception(
                     " ".join(
                         [
-                            f'No argument provided for "{parameter.name}" in function {fn.__name__}.',
+                            f'No argument provided for "{slot.name}" in function {fn.__name__}.',
                             'This indicates you forgot to call ".run()" with sufficient arguments.',
                         ],
                     ),
@@ -93,9 +178,16 @@ def build_parameters(
 
             args.append(provided_args[arg_index])
             arg_index += 1
-        else:
-            encountered_star = True
-
-            if arg_index < len(provided_args):
+        elif kind == "variadic":
+            if arg_index < arg_count:
                 args += provided_args[arg_index:]
+        else:
+            raise Exception(
+                " ".join(
+                    [
+                        "Found arguments defined after * args.",
+                        "Ensure *args and **kwargs come at the end of the function parameter definitions.",
+                    ],
+                ),
+            )
     return args, kwargs
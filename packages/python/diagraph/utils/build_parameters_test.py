@@ -1,7 +1,10 @@
+import inspect
+
 import pytest
 
 from ..classes.diagraph import Diagraph
-from .build_parameters import build_parameters
+from ..classes.errors import DependencyError
+from .build_parameters import build_parameters, compile_parameters
 from .depends import Depends
 
 
@@ -276,3 +279,103 @@ def describe_build_parameters():
     #         ("i1", "i3", "baz"),
     #         {},
     #     ) == (["i1", "foo", "i3", "baz"], {})
+
+    def describe_dependency_errors():
+        def test_it_raises_when_a_dependency_has_not_run():
+            def a():
+                return "a"
+
+            def b(a: str = Depends(a)):
+                return a
+
+            diagraph = Diagraph(b)
+            diagraph.__state__.add_timestamp()
+            with pytest.raises(DependencyError, match="Failed to get result for") as e:
+                build_parameters(diagraph, b, (), {})
+            assert e.value.key is a
+
+        def test_it_raises_when_a_dependency_failed():
+            def a():
+                raise Exception("a failed")
+
+            def b(a: str = Depends(a)):
+                return a
+
+            diagraph = Diagraph(b)
+            with pytest.raises(Exception, match="Errors encountered"):
+                diagraph.run()
+            with pytest.raises(DependencyError, match="Error found for") as e:
+                build_parameters(diagraph, b, (), {})
+            assert e.value.key is a
+
+
+def describe_compile_parameters():
+    def test_it_compiles_a_slot_per_parameter():
+        def a():
+            return "a"
+
+        def foo(x, y=None, z="z", *args, a: str = Depends(a), **kwargs):
+            return "foo"
+
+        diagraph = Diagraph(foo)
+        plan = compile_parameters(diagraph, foo)
+        assert plan.fn_name == "foo"
+        assert [(slot.kind, slot.name) for slot in plan.slots] == [
+            ("required", "x"),
+            ("required", "y"),
+            ("optional", "z"),
+            ("variadic", "args"),
+            ("dependency", "a"),
+            ("variadic", "kwargs"),
+        ]
+        assert plan.slots[4].key is a
+
+    def test_it_marks_required_parameters_after_star_args():
+        def foo(*args, bar):
+            return "foo"
+
+        diagraph = Diagraph(foo)
+        assert [slot.kind for slot in compile_parameters(diagraph, foo).slots] == ["variadic", "misplaced"]
+        with pytest.raises(Exception, match="Found arguments defined after"):
+            build_parameters(diagraph, foo, ("foo",), {})
+
+    def test_it_resolves_string_dependencies():
+        def foo():
+            return "foo"
+
+        def bar(foo=Depends("foo")):
+            return "bar"
+
+        diagraph = Diagraph(bar, use_string_keys=True, node_dict={"foo": foo, "bar": bar})
+        assert compile_parameters(diagraph, bar).slots[0].key == "foo"
+
+    def test_it_compiles_plans_when_the_diagraph_is_built(mocker):
+        def a():
+            return "a"
+
+        def b(a: str = Depends(a)):
+            return a
+
+        diagraph = Diagraph(b)
+        assert set(diagraph.__parameter_plans__) == {a, b}
+        signature = mocker.spy(inspect, "signature")
+        diagraph.run()
+        diagraph.run()
+        signature.assert_not_called()
+        assert diagraph.result == "a"
+
+    def test_it_compiles_plans_for_replaced_functions():
+        def a():
+            return "a"
+
+        def b(a: str = Depends(a)):
+            return a
+
+        def replaced(input: str, a: str = Depends(a)):
+            return input + a
+
+        diagraph = Diagraph(b)
+        fork = diagraph.__fork__()
+        diagraph[b] = replaced
+        assert diagraph.run("input:").result == "input:a"
+        assert replaced not in fork.__parameter_plans__
@@ -36,13 +36,7 @@ def ancestor_is_upstream_dependency(
     Returns:
     bool: True if the potential upstream dependency is an ancestor of the target node, False otherwise.
     """
-    for ancestor in graph.out_edges(potential_upstream_dependency):
-        if (
-            ancestor == parent
-            or ancestor_is_upstream_dependency(graph, ancestor, parent) is True
-        ):
-            return True
-    return False
+    return graph.depends_on(potential_upstream_dependency, parent)
 
 
 def has_unexecuted_upstream_dependencies(
@@ -4,7 +4,11 @@ from ..classes.diagraph import Diagraph
 from ..classes.graph import Graph
 from ..classes.types import KeyIdentifier
 from .depends import Depends
-from .get_execution_graph import get_execution_graph
+from .get_execution_graph import (
+    ancestor_is_upstream_dependency,
+    get_execution_graph,
+    has_unexecuted_upstream_dependencies,
+)
 
 complicated_graph_def = {
     "d0b": [],
@@ -236,3 +240,21 @@ def describe_execution_graph():
         )
 
         assert execution_graph == [[a], [b, c]]
+
+
+def describe_upstream_dependencies():
+    def test_it_checks_if_a_node_is_upstream():
+        graph = Graph(complicated_graph_def)
+
+        assert ancestor_is_upstream_dependency(graph, "d3a", "d0b") is True
+        assert ancestor_is_upstream_dependency(graph, "d2b", "d0a") is True
+        assert ancestor_is_upstream_dependency(graph, "d2b", "d0b") is True
+        assert ancestor_is_upstream_dependency(graph, "d2a", "d0b") is False
+        assert ancestor_is_upstream_dependency(graph, "d0b", "d3a") is False
+
+    def test_it_checks_for_unexecuted_upstream_dependencies():
+        graph = Graph(complicated_graph_def)
+
+        assert has_unexecuted_upstream_dependencies(graph, "d2b", "d0b", set()) is True
+        assert has_unexecuted_upstream_dependencies(graph, "d2b", "d0b", {"d1c"}) is False
+        assert has_unexecuted_upstream_dependencies(graph, "d2a", "d0b", set()) is False
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import inspect
+import threading
+from weakref import WeakKeyDictionary
+
+from ..classes.types import Fn, KeyIdentifier
+from .depends import FnDependency
+
+# shared by every Diagraph, and keyed weakly so functions can still be garbage collected
+__signatures__: WeakKeyDictionary[Fn, inspect.Signature] = WeakKeyDictionary()
+__dependencies__: WeakKeyDictionary[Fn, tuple[KeyIdentifier, ...]] = WeakKeyDictionary()
+__lock__ = threading.Lock()
+
+
+def get_signature(fn: Fn) -> inspect.Signature:
+    """
+    Gets the signature of a function, inspecting it only the first time it is asked for.
+
+    Callables that cannot be weakly referenced or hashed are inspected every time.
+
+    Parameters:
+    - fn (Fn): The function to get the signature of.
+
+    Returns:
+    inspect.Signature: The signature of the function.
+    """
+    try:
+        signature = __signatures__.get(fn)
+    except TypeError:
+        return inspect.signature(fn)
+    if signature is None:
+        signature = inspect.signature(fn)
+        with __lock__:
+            __signatures__[fn] = signature
+    return signature
+
+
+def get_declared_dependencies(fn: Fn) -> tuple[KeyIdentifier, ...]:
+    """
+    Gets the dependencies a function declares with Depends, in parameter order.
+
+    Parameters:
+    - fn (Fn): The function to get the dependencies of.
+
+    Returns:
+    tuple[KeyIdentifier, ...]: The functions or string keys the function depends on.
+    """
+    try:
+        dependencies = __dependencies__.get(fn)
+    except TypeError:
+        return collect_declared_dependencies(fn)
+    if dependencies is None:
+        dependencies = collect_declared_dependencies(fn)
+        with __lock__:
+            __dependencies__[fn] = dependencies
+    return dependencies
+
+
+def collect_declared_dependencies(fn: Fn) -> tuple[KeyIdentifier, ...]:
+    return tuple(
+        parameter.default.dependency
+        for parameter in get_signature(fn).parameters.values()
+        if isinstance(parameter.default, FnDependency)
+    )
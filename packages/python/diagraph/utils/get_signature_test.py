@@ -0,0 +1,73 @@
+import gc
+import inspect
+import weakref
+
+from .depends import Depends
+from .get_signature import __signatures__, get_declared_dependencies, get_signature
+
+
+def describe_get_signature():
+    def test_it_inspects_a_function_once(mocker):
+        def foo(a, b="b"):
+            return "foo"
+
+        signature = mocker.spy(inspect, "signature")
+        assert get_signature(foo) is get_signature(foo)
+        assert list(get_signature(foo).parameters) == ["a", "b"]
+        signature.assert_called_once_with(foo)
+
+    def test_it_does_not_keep_functions_alive():
+        def foo():
+            return "foo"
+
+        get_signature(foo)
+        assert foo in __signatures__
+        reference = weakref.ref(foo)
+        del foo
+        gc.collect()
+        assert reference() is None
+
+    def test_it_inspects_unhashable_callables_every_time(mocker):
+        class Unhashable:
+            __hash__ = None
+
+            def __call__(self, a):
+                return a
+
+        fn = Unhashable()
+        signature = mocker.spy(inspect, "signature")
+        assert list(get_signature(fn).parameters) == ["a"]
+        assert list(get_signature(fn).parameters) == ["a"]
+        assert signature.call_count == 2
+
+
+def describe_get_declared_dependencies():
+    def test_it_gets_dependencies_in_parameter_order():
+        def a():
+            return "a"
+
+        def foo(input, b=Depends("b"), c=None, a=Depends(a)):
+            return "foo"
+
+        assert get_declared_dependencies(foo) == ("b", a)
+
+    def test_it_gets_no_dependencies():
+        def foo(input, bar="bar"):
+            return "foo"
+
+        assert get_declared_dependencies(foo) == ()
+
+    def test_it_shares_dependencies_across_diagraphs(mocker):
+        from ..classes.diagraph import Diagraph
+
+        def a():
+            return "a"
+
+        def b(a: str = Depends(a)):
+            return a
+
+        Diagraph(b)
+        signature = mocker.spy(inspect, "signature")
+        Diagraph(b).run()
+        Diagraph(b).to_json()
+        signature.assert_not_called()
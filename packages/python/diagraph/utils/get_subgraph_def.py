@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from typing import TypeVar
 
 from ..classes.graph import Graph
@@ -15,7 +16,12 @@ def get_subgraph_def(
     subgraph: dict[K, OrderedSet[K]] | None = None,
 ) -> dict[K, OrderedSet[K]]:
     """
-    Recursively generates a subgraph definition for a given set of nodes and their ancestors.
+    Generates a subgraph definition for a given set of nodes and all of their descendants.
+
+    The graph is walked depth first with an explicit stack, so long chains do not
+    hit the recursion limit. Every node is expanded at most once and every edge is
+    followed at most once, bounding the work at O(V + E) however many paths lead
+    to a shared descendant.
 
     Parameters:
     - graph (Graph): The directed graph from which to extract the subgraph.
@@ -34,17 +40,22 @@ def get_subgraph_def(
     if seen is None:
         seen = set()
 
-    for key in node_keys:
-        if key not in seen:
-            if subgraph.get(key) is None:
-                subgraph[key] = OrderedSet()
-
-            children = graph.in_edges(key)
-            for child in children:
-                if subgraph.get(child) is None:
-                    subgraph[child] = OrderedSet()
-                subgraph[child].add(key)
-            subgraph = get_subgraph_def(graph, children, seen, subgraph)
-            seen.add(key)
+    stack: list[Iterator[K]] = [iter(node_keys)]
+    while len(stack):
+        for key in stack[-1]:
+            if key not in seen:
+                seen.add(key)
+                if subgraph.get(key) is None:
+                    subgraph[key] = OrderedSet()
+
+                children = graph.in_edges(key)
+                for child in children:
+                    if subgraph.get(child) is None:
+                        subgraph[child] = OrderedSet()
+                    subgraph[child].add(key)
+                stack.append(iter(children))
+                break
+        else:
+            stack.pop()
 
     return subgraph
@@ -74,3 +74,35 @@ def describe_get_subgraph_def():
             print(f"expectation: {expectation}")
             print(f"subgraph: {subgraph}")
             raise e
+
+    def describe_large_graphs():
+        def test_it_handles_a_long_chain(mocker):
+            size = 10_000
+            graph = Graph({i: [i - 1] for i in range(1, size)})
+            in_edges = mocker.spy(graph, "in_edges")
+
+            subgraph = get_subgraph_def(graph, [0])
+
+            assert len(subgraph) == size
+            assert list(subgraph[size - 1]) == [size - 2]
+            assert in_edges.call_count == size
+
+        def test_it_handles_dense_diamonds(mocker):
+            # every node in a layer depends on every node in the previous layer,
+            # so the number of paths from the root grows as width ** depth
+            width, depth = 8, 40
+            graph_def: dict[str, list[str]] = {}
+            previous_layer = ["root"]
+            for d in range(depth):
+                layer = [f"{d}-{w}" for w in range(width)]
+                for key in layer:
+                    graph_def[key] = previous_layer
+                previous_layer = layer
+            graph = Graph(graph_def)
+            in_edges = mocker.spy(graph, "in_edges")
+
+            subgraph = get_subgraph_def(graph, ["root"])
+
+            assert len(subgraph) == 1 + width * depth
+            assert list(subgraph[f"{depth - 1}-0"]) == [f"{depth - 2}-{w}" for w in range(width)]
+            assert in_edges.call_count == 1 + width * depth
@@ -14,12 +14,11 @@ def validate_node_ancestor(node: DiagraphNode) -> None:
     Raises:
     - Exception: If the node's result is None, indicating a missing result.
     """
-    try:
-        assert node.result
-    except Exception:
+    # a miss is falsy, like a missing result
+    if not node.diagraph.__state__.get(("result", node.key)):
         raise Exception(
             "An ancestor is missing a result, run the traversal first",
-        ) from None
+        )
 
 
 def validate_node_ancestors(node_group: DiagraphNodeGroup) -> None:
@@ -6,8 +6,6 @@ import random
 from importlib import resources
 from importlib.metadata import distribution
 
-import networkx as nx
-
 diagraph_version = distribution("diagraph").metadata["version"]
 
 
@@ -22,14 +20,11 @@ def load_resource(resource_filepath: str, pkg="diagraph") -> str:
 
 
 def render_repr_html(diagraph):
-    G = diagraph.__graph__.__G__
-
     graph = {}
     nodes = []
-    links = nx.node_link_data(G)["links"]
+    links = diagraph.__graph__.to_json()["links"]
     if len(links) == 0:
-        for int_key in nx.topological_sort(G):
-            fn = diagraph.__graph__.get_node_for_int_key(int_key)
+        for fn in diagraph.__graph__.nodes:
             graph[fn.__name__] = []
     else:
         for link in links:
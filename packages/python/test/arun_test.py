@@ -0,0 +1,146 @@
+import asyncio
+import threading
+
+import pytest
+
+from diagraph import LLM, Depends, Diagraph, prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults(request):
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+    yield
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+
+
+class MockLLM(LLM):
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def run(self, prompt, log, **kwargs):
+        log("start", None)
+        log("data", prompt)
+        log("end", None)
+        return f"sync:{prompt}"
+
+
+class MockAsyncLLM(LLM):
+    in_flight: int
+    threads: set[int]
+
+    def __init__(self, wait_for=1, **kwargs):
+        self.kwargs = kwargs
+        self.wait_for = wait_for
+        self.in_flight = 0
+        self.threads = set()
+
+    def run(self, prompt, log, **kwargs):
+        raise Exception("Should not be called")
+
+    async def arun(self, prompt, log, **kwargs):
+        self.threads.add(threading.get_ident())
+        self.in_flight += 1
+        log("start", None)
+        # every request must be in flight at the same time for this to resolve
+        while self.in_flight < self.wait_for:
+            await asyncio.sleep(0)
+        log("data", prompt)
+        log("end", None)
+        return f"async:{prompt}"
+
+
+def describe_arun():
+    @pytest.mark.asyncio
+    async def test_it_runs_coroutine_functions():
+        async def d0(input: str):
+            await asyncio.sleep(0)
+            return f"{input}_d0"
+
+        async def d1(d0: str = Depends(d0)):
+            return f"{d0}_d1"
+
+        diagraph = await Diagraph(d1).arun("foo")
+        assert diagraph.result == "foo_d0_d1"
+        assert diagraph[d0].result == "foo_d0"
+
+    @pytest.mark.asyncio
+    async def test_it_runs_synchronous_functions():
+        def d0(input: str):
+            return f"{input}_d0"
+
+        async def d1(d0: str = Depends(d0)):
+            return f"{d0}_d1"
+
+        def d2(d1: str = Depends(d1)):
+            return f"{d1}_d2"
+
+        assert (await Diagraph(d2).arun("foo")).result == "foo_d0_d1_d2"
+
+    @pytest.mark.asyncio
+    async def test_it_runs_prompt_functions_concurrently_on_one_loop():
+        llm = MockAsyncLLM(wait_for=3)
+
+        @prompt
+        def a():
+            return "a"
+
+        @prompt
+        def b():
+            return "b"
+
+        @prompt
+        async def c():
+            return "c"
+
+        diagraph = await asyncio.wait_for(Diagraph(a, b, c, llm=llm).arun(), timeout=5)
+        assert diagraph.result == ("async:a", "async:b", "async:c")
+        assert diagraph[c].prompt == "c"
+        assert llm.threads == {threading.get_ident()}
+
+    @pytest.mark.asyncio
+    async def test_it_falls_back_to_a_synchronous_llm(mocker):
+        log = mocker.stub()
+
+        @prompt
+        def a(input: str):
+            return input
+
+        diagraph = await Diagraph(a, llm=MockLLM(), log=log).arun("foo")
+        assert diagraph.result == "sync:foo"
+        log.assert_any_call("start", None, a)
+        log.assert_any_call("data", "foo", a)
+        log.assert_any_call("end", None, a)
+
+    @pytest.mark.asyncio
+    async def test_it_raises_for_errors():
+        async def d0():
+            raise Exception("foo")
+
+        def d1(d0: str = Depends(d0)):
+            return d0
+
+        diagraph = Diagraph(d1)
+        with pytest.raises(Exception, match="Errors encountered"):
+            await diagraph.arun()
+        assert str(diagraph[d0].error) == "foo"
+
+    @pytest.mark.asyncio
+    async def test_it_calls_error_handlers_that_can_rerun():
+        calls = []
+
+        async def d0():
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("foo")
+            return "d0"
+
+        def handle_error(e, rerun, fn):
+            return rerun()
+
+        diagraph = await Diagraph(d0, error=handle_error).arun()
+        assert diagraph.result == "d0"
+        assert len(calls) == 3
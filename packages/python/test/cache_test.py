@@ -0,0 +1,161 @@
+import pytest
+
+from diagraph import LLM, Depends, Diagraph, DiskCacheStore, ResultCache, prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults(request):
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+    yield
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+
+
+class CountingLLM(LLM):
+    prompts: list[str]
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.prompts = []
+
+    def run(self, prompt, log, **kwargs):
+        self.prompts.append(prompt)
+        return f"llm({prompt})"
+
+
+class Rows:
+    """Has a repr that leaves out its contents."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __repr__(self):
+        return f"Rows(n={len(self.rows)})"
+
+
+def summarize(input: str):
+    return f"summarize {input}"
+
+
+summarize = prompt(summarize)
+
+
+def shout(summarize: str = Depends(summarize)):
+    return summarize.upper()
+
+
+def describe_result_cache():
+    def test_it_does_not_cache_by_default():
+        llm = CountingLLM()
+        Diagraph(shout, llm=llm).run("foo")
+        Diagraph(shout, llm=llm).run("foo")
+        assert len(llm.prompts) == 2
+
+    def test_it_reuses_results_across_runs():
+        llm = CountingLLM()
+        cache = ResultCache()
+
+        first = Diagraph(shout, llm=llm, cache=cache).run("foo")
+        second = Diagraph(shout, llm=llm, cache=cache).run("foo")
+
+        assert llm.prompts == ["summarize foo"]
+        assert second.result == first.result == "LLM(SUMMARIZE FOO)"
+        assert second[summarize].prompt == "summarize foo"
+
+    def test_it_misses_for_new_inputs():
+        llm = CountingLLM()
+        cache = ResultCache()
+
+        Diagraph(shout, llm=llm, cache=cache).run("foo")
+        Diagraph(shout, llm=llm, cache=cache).run("bar")
+
+        assert llm.prompts == ["summarize foo", "summarize bar"]
+
+    def test_it_misses_for_a_different_llm_configuration():
+        cache = ResultCache()
+        llm = CountingLLM(model="a")
+        other_llm = CountingLLM(model="b")
+
+        Diagraph(shout, llm=llm, cache=cache).run("foo")
+        Diagraph(shout, llm=other_llm, cache=cache).run("foo")
+
+        assert len(llm.prompts) == 1
+        assert len(other_llm.prompts) == 1
+
+    def test_it_misses_for_an_edited_prompt():
+        llm = CountingLLM()
+        cache = ResultCache()
+
+        dg = Diagraph(shout, llm=llm, cache=cache).run("foo")
+        dg[summarize].prompt = "something else"
+        dg.rerun()
+
+        assert llm.prompts == ["summarize foo", "something else"]
+        assert dg.result == "LLM(SOMETHING ELSE)"
+
+    def test_it_reuses_results_from_disk(tmp_path):
+        llm = CountingLLM()
+
+        Diagraph(shout, llm=llm, cache=ResultCache(DiskCacheStore(tmp_path))).run("foo")
+        dg = Diagraph(shout, llm=llm, cache=ResultCache(DiskCacheStore(tmp_path))).run("foo")
+
+        assert llm.prompts == ["summarize foo"]
+        assert dg.result == "LLM(SUMMARIZE FOO)"
+
+    def test_it_does_not_cache_errors(mocker):
+        # a stub is fingerprinted the same however often it is called, so it does not change the cache key
+        calls = mocker.stub()
+
+        def flaky(input: str):
+            calls(input)
+            if calls.call_count == 1:
+                raise Exception("flaky")
+            return input
+
+        cache = ResultCache()
+        with pytest.raises(Exception, match="Errors encountered"):
+            Diagraph(flaky, cache=cache).run("foo")
+        assert Diagraph(flaky, cache=cache).run("foo").result == "foo"
+        assert Diagraph(flaky, cache=cache).run("foo").result == "foo"
+        assert calls.call_count == 2
+
+    def test_it_misses_for_objects_that_repr_the_same():
+        def count(rows: Rows):
+            return sum(rows.rows)
+
+        cache = ResultCache()
+        assert Diagraph(count, cache=cache).run(Rows([1, 2, 3])).result == 6
+        assert Diagraph(count, cache=cache).run(Rows([4, 5, 6])).result == 15
+
+    def test_it_ignores_corrupt_entries_on_disk(tmp_path):
+        llm = CountingLLM()
+        Diagraph(shout, llm=llm, cache=ResultCache(DiskCacheStore(tmp_path))).run("foo")
+        for entry in tmp_path.glob("*/*.pkl"):
+            entry.write_bytes(entry.read_bytes()[:10])
+
+        dg = Diagraph(shout, llm=llm, cache=ResultCache(DiskCacheStore(tmp_path))).run("foo")
+        assert llm.prompts == ["summarize foo", "summarize foo"]
+        assert dg.result == "LLM(SUMMARIZE FOO)"
+
+    def test_it_shares_the_cache_across_mapped_runs():
+        llm = CountingLLM()
+        dg = Diagraph(shout, llm=llm, cache=ResultCache())
+
+        results = dict(dg.map(["foo", "foo", "bar"], concurrency=1))
+
+        assert sorted(llm.prompts) == ["summarize bar", "summarize foo"]
+        assert results[1].result == "LLM(SUMMARIZE FOO)"
+
+    @pytest.mark.asyncio
+    async def test_it_reuses_results_when_run_asynchronously():
+        llm = CountingLLM()
+        cache = ResultCache()
+
+        await Diagraph(shout, llm=llm, cache=cache).arun("foo")
+        dg = await Diagraph(shout, llm=llm, cache=cache).arun("foo")
+
+        assert llm.prompts == ["summarize foo"]
+        assert dg.result == "LLM(SUMMARIZE FOO)"
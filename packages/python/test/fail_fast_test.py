@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from diagraph import LLM, Depends, Diagraph, prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults(request):
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+    yield
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+
+
+def describe_fail_fast():
+    def test_it_does_not_schedule_nodes_after_an_error(mocker):
+        downstream = mocker.stub()
+
+        def fails():
+            raise Exception("fails")
+
+        def a(fails: str = Depends(fails)):
+            downstream("a")
+
+        def b():
+            downstream("b")
+
+        def c(b: str = Depends(b)):
+            downstream("c")
+
+        # a single worker runs the nodes one at a time, so b is still queued when fails fails
+        diagraph = Diagraph(a, c, fail_fast=True, max_workers=1)
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+
+        downstream.assert_not_called()
+        assert str(diagraph[fails].error) == "fails"
+        assert diagraph[b].error is None
+
+    def test_it_keeps_running_other_nodes_by_default(mocker):
+        downstream = mocker.stub()
+
+        def fails():
+            raise Exception("fails")
+
+        def b():
+            downstream("b")
+
+        diagraph = Diagraph(fails, b, max_workers=1)
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        downstream.assert_called_once_with("b")
+
+    def test_it_returns_without_waiting_for_running_nodes():
+        release = threading.Event()
+        finished = threading.Event()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(timeout=5)
+            finished.set()
+            return "slow"
+
+        def fails():
+            assert started.wait(timeout=5)
+            raise Exception("fails")
+
+        diagraph = Diagraph(slow, fails, fail_fast=True)
+        try:
+            start = time.monotonic()
+            with pytest.raises(Exception, match="Errors encountered"):
+                diagraph.run()
+            assert time.monotonic() - start < 2
+        finally:
+            release.set()
+
+        assert finished.wait(timeout=5)
+        time.sleep(0.05)
+        # the abandoned node's result is discarded, and it is not blamed for the failure
+        assert diagraph[slow].error is None
+        with pytest.raises(Exception, match="No record for"):
+            diagraph[slow].result
+
+    def test_it_continues_after_handled_errors(mocker):
+        downstream = mocker.stub()
+
+        def fails():
+            raise Exception("fails")
+
+        def after(fails: str = Depends(fails)):
+            downstream(fails)
+            return fails
+
+        def handle_error(e, rerun, fn):
+            return "handled"
+
+        diagraph = Diagraph(after, fail_fast=True, error=handle_error).run()
+        assert diagraph.result == "handled"
+        downstream.assert_called_once_with("handled")
+
+    def test_it_is_kept_by_mapped_runs():
+        def fails(i):
+            if i == 1:
+                raise Exception("fails")
+            return i
+
+        def after(fails: int = Depends(fails)):
+            return fails
+
+        diagraph = Diagraph(after, fail_fast=True)
+        runs = dict(diagraph.map([0, 1]))
+        assert runs[0].fail_fast is True
+        assert runs[0].result == 0
+        assert str(runs[1][fails].error) == "fails"
+
+    def describe_arun():
+        @pytest.mark.asyncio
+        async def test_it_cancels_running_prompts():
+            cancelled = asyncio.Event()
+
+            class HangingLLM(LLM):
+                async def arun(self, prompt, log, **kwargs):
+                    try:
+                        await asyncio.sleep(5)
+                    except asyncio.CancelledError:
+                        cancelled.set()
+                        raise
+
+                def run(self, prompt, log, **kwargs):
+                    raise NotImplementedError
+
+            @prompt(llm=HangingLLM())
+            def hangs():
+                return "hangs"
+
+            async def fails():
+                await asyncio.sleep(0.01)
+                raise Exception("fails")
+
+            diagraph = Diagraph(hangs, fails, fail_fast=True)
+            with pytest.raises(Exception, match="Errors encountered"):
+                await asyncio.wait_for(diagraph.arun(), timeout=2)
+
+            assert cancelled.is_set()
+            assert str(diagraph[fails].error) == "fails"
+            assert diagraph[hangs].error is None
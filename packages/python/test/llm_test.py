@@ -1,6 +1,6 @@
 import pytest
 
-from diagraph import LLM, Diagraph, prompt
+from diagraph import LLM, CachedLLM, Diagraph, RateLimiter, prompt
 
 
 @pytest.fixture(autouse=True)
@@ -176,3 +176,73 @@ def describe_llm():
             i = f"{i}"
             log.assert_any_call("data", i, fn)
         log.assert_any_call("end", None, fn)
+
+    def test_it_keeps_diagraph_llms_separate_for_shared_functions(mocker):
+        import threading
+
+        barrier = threading.Barrier(2, timeout=5)
+
+        class WaitingLLM(MockLLM):
+            def run(self, prompt, log, **kwargs):
+                # both runs are in flight before either returns
+                barrier.wait()
+                return super().run(prompt, log, **kwargs)
+
+        @prompt
+        def fn():
+            return "test prompt"
+
+        log_a = mocker.stub()
+        log_b = mocker.stub()
+        diagraph_a = Diagraph(fn, log=log_a, llm=WaitingLLM(times=2))
+        diagraph_b = Diagraph(fn, log=log_b, llm=WaitingLLM(times=4))
+
+        thread = threading.Thread(target=diagraph_a.run)
+        thread.start()
+        diagraph_b.run()
+        thread.join()
+
+        assert diagraph_a.result == "01"
+        assert diagraph_b.result == "0123"
+        assert log_a.call_count == 2 + 2
+        assert log_b.call_count == 2 + 4
+        assert not hasattr(fn, "__diagraph_llm__")
+        assert not hasattr(fn, "__diagraph_log__")
+
+    def test_it_replays_cached_responses_to_the_diagraph_log(mocker):
+        llm = MockLLM(times=3)
+        run = mocker.spy(llm, "run")
+        cached = CachedLLM(llm)
+
+        @prompt
+        def fn():
+            return "test prompt"
+
+        first_log = mocker.stub()
+        second_log = mocker.stub()
+        assert Diagraph(fn, log=first_log, llm=cached).run().result == "012"
+        assert Diagraph(fn, log=second_log, llm=cached).run().result == "012"
+
+        assert run.call_count == 1
+        assert second_log.call_args_list == first_log.call_args_list
+        second_log.assert_any_call("data", "2", fn)
+
+    def test_it_rate_limits_prompt_functions(mocker):
+        sleep = mocker.stub()
+        rate_limiter = RateLimiter(requests_per_minute=2, clock=lambda: 0, sleep=sleep)
+
+        @prompt
+        def a():
+            return "a"
+
+        @prompt
+        def b():
+            return "b"
+
+        @prompt
+        def c():
+            return "c"
+
+        Diagraph(a, b, c, llm=MockLLM(), rate_limiter=rate_limiter).run()
+
+        sleep.assert_called_once_with(30)
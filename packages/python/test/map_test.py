@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from diagraph import Depends, Diagraph
+from diagraph.classes import diagraph as _diagraph
+
+
+def describe_map():
+    def test_it_runs_over_many_inputs():
+        def d0(input: str):
+            return f"{input}_d0"
+
+        def d1(input: str, d0: str = Depends(d0)):
+            return f"{input}_{d0}-d1"
+
+        diagraph = Diagraph(d1)
+        results = dict(diagraph.map(["foo", "bar", "baz"]))
+
+        assert sorted(results.keys()) == [0, 1, 2]
+        assert results[0].result == "foo_foo_d0-d1"
+        assert results[1].result == "bar_bar_d0-d1"
+        assert results[2].result == "baz_baz_d0-d1"
+        assert results[1][d0].result == "bar_d0"
+
+    def test_it_accepts_tuples_as_positional_arguments_and_shared_kwargs():
+        def d0(a: str, b: str, suffix: str = "!"):
+            return f"{a}{b}{suffix}"
+
+        results = dict(Diagraph(d0).map([("a", "b"), ("c", "d")], suffix="?"))
+        assert results[0].result == "ab?"
+        assert results[1].result == "cd?"
+
+    def test_it_isolates_state_between_runs():
+        def d0(input: str):
+            return input
+
+        diagraph = Diagraph(d0)
+        results = dict(diagraph.map(["foo", "bar"]))
+
+        assert results[0] is not diagraph
+        assert results[0].result == "foo"
+        assert results[1].result == "bar"
+        with pytest.raises(Exception, match="has not been run"):
+            diagraph.result
+
+    def test_it_builds_the_graph_once(mocker):
+        spy = mocker.spy(_diagraph, "build_graph_mapping")
+
+        def d0(input: str):
+            return input
+
+        def d1(d0: str = Depends(d0)):
+            return d0
+
+        results = dict(Diagraph(d1).map(range(10)))
+        assert [results[i].result for i in range(10)] == list(range(10))
+        assert spy.call_count == 1
+
+    def test_it_runs_inputs_concurrently():
+        barrier = threading.Barrier(3, timeout=5)
+
+        def d0(input: str):
+            barrier.wait()
+            return input
+
+        results = dict(Diagraph(d0).map(["a", "b", "c"], concurrency=3))
+        assert [results[i].result for i in range(3)] == ["a", "b", "c"]
+
+    def test_it_limits_concurrency():
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def d0(input: int):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            threading.Event().wait(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return input
+
+        results = dict(Diagraph(d0).map(range(12), concurrency=2))
+        assert len(results) == 12
+        assert max_in_flight[0] <= 2
+
+    def test_it_yields_runs_that_errored():
+        def d0(input: str):
+            if input == "bad":
+                raise Exception("bad input")
+            return input
+
+        results = dict(Diagraph(d0).map(["good", "bad"]))
+        assert results[0].result == "good"
+        assert str(results[1][d0].error) == "bad input"
+
+    def test_it_raises_for_invalid_concurrency():
+        def d0(input: str):
+            return input
+
+        with pytest.raises(Exception, match="Concurrency must be at least 1"):
+            list(Diagraph(d0).map(["foo"], concurrency=0))
+
+    def test_it_pulls_inputs_as_runs_finish():
+        pulled = []
+
+        def inputs():
+            for i in range(4):
+                pulled.append(i)
+                yield i
+
+        def d0(input: int):
+            return input
+
+        runs = Diagraph(d0).map(inputs(), concurrency=2)
+        next(runs)
+        assert len(pulled) == 3
+        assert len(list(runs)) == 3
+
+    def test_it_keeps_the_settings_of_the_diagraph():
+        def d0(input: str):
+            return input
+
+        diagraph = Diagraph(d0, fail_fast=True, max_workers=2)
+        diagraph[d0].timeout = 5
+        diagraph.custom = "custom"
+        fork = diagraph.__fork__()
+
+        assert fork.fail_fast is True
+        assert fork.max_workers == 2
+        assert fork.custom == "custom"
+        assert fork[d0].timeout == 5
+        fork[d0].timeout = 10
+        assert diagraph[d0].timeout == 5
+        assert fork.terminal_nodes[0].diagraph is fork
+        assert fork.__state__ is not diagraph.__state__
@@ -0,0 +1,287 @@
+import inspect
+
+import pytest
+
+from diagraph import LLM, Depends, Diagraph, SQLiteStateStore, prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults(request):
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+    yield
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+
+
+class CountingLLM(LLM):
+    prompts: list[str]
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.prompts = []
+
+    def run(self, prompt, log, **kwargs):
+        self.prompts.append(prompt)
+        return f"llm({prompt})"
+
+
+def describe_rerun():
+    def test_it_runs_everything_the_first_time():
+        def d0(input: str):
+            return f"{input}_d0"
+
+        def d1(d0: str = Depends(d0)):
+            return f"{d0}_d1"
+
+        assert Diagraph(d1).rerun("foo").result == "foo_d0_d1"
+
+    def test_it_only_reruns_the_node_whose_prompt_changed():
+        llm = CountingLLM()
+        nodes = []
+        for i in range(10):
+
+            @prompt
+            def branch(input: str, i=i):
+                return f"{input}-{i}"
+
+            branch.__name__ = f"branch_{i}"
+            nodes.append(branch)
+
+        def join(**kwargs):
+            return ",".join(kwargs[f"branch_{i}"] for i in range(10))
+
+        # join depends on every branch
+        join.__signature__ = inspect.Signature(
+            [
+                inspect.Parameter(
+                    f"branch_{i}",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    default=Depends(node),
+                )
+                for i, node in enumerate(nodes)
+            ],
+        )
+
+        dg = Diagraph(join, llm=llm).run("foo")
+        assert len(llm.prompts) == 10
+
+        dg[nodes[3]].prompt = "changed"
+        dg.rerun()
+
+        assert llm.prompts[10:] == ["changed"]
+        assert "llm(changed)" in dg.result
+        assert "llm(foo-4)" in dg.result
+
+    def test_it_reruns_descendants_of_an_overridden_result():
+        calls = []
+
+        def d0(input: str):
+            calls.append("d0")
+            return f"{input}_d0"
+
+        def d1(d0: str = Depends(d0)):
+            calls.append("d1")
+            return f"{d0}_d1"
+
+        def d2(d1: str = Depends(d1)):
+            calls.append("d2")
+            return f"{d1}_d2"
+
+        dg = Diagraph(d2).run("foo")
+        calls.clear()
+
+        dg[d0].result = "bar"
+        dg.rerun()
+
+        assert calls == ["d1", "d2"]
+        assert dg.result == "bar_d1_d2"
+
+    def test_it_reruns_a_replaced_function():
+        def d0(input: str):
+            return f"{input}_d0"
+
+        def d1(d0: str = Depends(d0)):
+            return f"{d0}_d1"
+
+        dg = Diagraph(d1).run("foo")
+        dg[d0] = lambda input: f"{input}_new"
+        dg.rerun()
+
+        assert dg.result == "foo_new_d1"
+
+    def test_it_does_nothing_when_every_result_is_current():
+        calls = []
+
+        def d0(input: str):
+            calls.append("d0")
+            return f"{input}_d0"
+
+        dg = Diagraph(d0).run("foo")
+        dg.rerun()
+
+        assert calls == ["d0"]
+        assert dg.result == "foo_d0"
+
+    def test_it_reruns_failed_nodes():
+        attempts = []
+
+        def d0(input: str):
+            return f"{input}_d0"
+
+        def d1(d0: str = Depends(d0)):
+            attempts.append(d0)
+            if len(attempts) == 1:
+                raise Exception("flaky")
+            return f"{d0}_d1"
+
+        def d2(d1: str = Depends(d1)):
+            return f"{d1}_d2"
+
+        dg = Diagraph(d2)
+        with pytest.raises(Exception, match="Errors encountered"):
+            dg.run("foo")
+
+        dg.rerun()
+
+        assert attempts == ["foo_d0", "foo_d0"]
+        assert dg.result == "foo_d0_d1_d2"
+
+    def test_it_accepts_new_inputs():
+        def d0(input: str):
+            return f"{input}_d0"
+
+        def d1(d0: str = Depends(d0)):
+            return f"{d0}_d1"
+
+        dg = Diagraph(d1).run("foo")
+        dg[d0].result = "bar"
+
+        assert dg.rerun("baz").result == "bar_d1"
+        assert dg.__latest_run__["input"] == ("baz",)
+
+    def test_it_invalidates_a_long_chain():
+        def d0():
+            return 0
+
+        nodes = [d0]
+        for i in range(1, 3000):
+
+            def node(previous: int = Depends(nodes[-1])):
+                return previous + 1
+
+            node.__name__ = node.__qualname__ = f"d{i}"
+            nodes.append(node)
+
+        dg = Diagraph(nodes[-1])
+        dg[d0].result = 5
+
+        assert all(node in dg.__dirty__ for node in nodes[1:])
+
+    def test_it_invalidates_each_node_in_a_diamond_once(mocker):
+        layers = [[]]
+
+        def d0():
+            return 0
+
+        layers[0].append(d0)
+        # every node depends on all 4 nodes of the layer above, so there are 4**5 paths to the last node
+        for i in range(1, 7):
+            layer = []
+            for j in range(1 if i == 6 else 4):
+
+                def node(**kwargs):
+                    return sum(kwargs.values())
+
+                node.__name__ = node.__qualname__ = f"d{i}_{j}"
+                node.__signature__ = inspect.Signature(
+                    [
+                        inspect.Parameter(
+                            parent.__name__,
+                            inspect.Parameter.KEYWORD_ONLY,
+                            default=Depends(parent),
+                        )
+                        for parent in layers[-1]
+                    ],
+                )
+                layer.append(node)
+            layers.append(layer)
+
+        dg = Diagraph(layers[-1][0])
+        visited = mocker.spy(dg, "get_children_of_node")
+        dg[d0].result = 5
+
+        assert visited.call_count == sum(len(layer) for layer in layers)
+        assert all(node in dg.__dirty__ for layer in layers[1:] for node in layer)
+
+    def describe_stores():
+        def test_it_keeps_results_restored_from_a_store(tmp_path):
+            calls = []
+
+            def d0(input: str):
+                calls.append("d0")
+                return f"{input}_d0"
+
+            def d1(d0: str = Depends(d0)):
+                calls.append("d1")
+                return f"{d0}_d1"
+
+            path = tmp_path / "state.db"
+            store = SQLiteStateStore(path)
+            Diagraph(d1, store=store).run("foo")
+            store.close()
+            calls.clear()
+
+            restored = Diagraph(d1, store=SQLiteStateStore(path))
+            assert restored.rerun().result == "foo_d0_d1"
+            assert calls == []
+
+        def test_it_reruns_nodes_that_failed_before_a_restart(tmp_path):
+            calls = []
+
+            def d0(input: str):
+                calls.append("d0")
+                return f"{input}_d0"
+
+            def d1(d0: str = Depends(d0)):
+                calls.append("d1")
+                if len(calls) == 2:
+                    raise Exception("flaky")
+                return f"{d0}_d1"
+
+            def d2(d1: str = Depends(d1)):
+                calls.append("d2")
+                return f"{d1}_d2"
+
+            path = tmp_path / "state.db"
+            store = SQLiteStateStore(path)
+            with pytest.raises(Exception, match="Errors encountered"):
+                Diagraph(d2, store=store).run("foo")
+            store.close()
+            calls.clear()
+
+            restored = Diagraph(d2, store=SQLiteStateStore(path))
+            assert restored.rerun().result == "foo_d0_d1_d2"
+            assert calls == ["d1", "d2"]
+
+        def test_it_runs_a_node_restored_from_a_store(tmp_path):
+            calls = []
+
+            def d0(input: str):
+                return f"{input}_d0"
+
+            def d1(d0: str = Depends(d0)):
+                calls.append(d0)
+                return f"{d0}_d1"
+
+            path = tmp_path / "state.db"
+            store = SQLiteStateStore(path)
+            Diagraph(d1, store=store).run("foo")
+            store.close()
+            calls.clear()
+
+            restored = Diagraph(d1, store=SQLiteStateStore(path))
+            restored[d1].run()
+            assert calls == ["foo_d0"]
@@ -1,3 +1,4 @@
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -181,6 +182,48 @@ def describe_run():
 
             assert Diagraph(a, b).run().result == ("01", "01")
 
+        def test_it_runs_sibling_functions_at_the_same_time():
+            barrier = threading.Barrier(3, timeout=5)
+
+            def root():
+                return "root"
+
+            def a(root: str = Depends(root)):
+                barrier.wait()
+                return f"{root}a"
+
+            def b(root: str = Depends(root)):
+                barrier.wait()
+                return f"{root}b"
+
+            def c(root: str = Depends(root)):
+                barrier.wait()
+                return f"{root}c"
+
+            def d(a: str = Depends(a), b: str = Depends(b), c: str = Depends(c)):
+                return f"{a}{b}{c}"
+
+            assert Diagraph(d).run().result == "rootarootbrootc"
+
+        def test_it_does_not_wait_for_unrelated_branches():
+            slow_started = threading.Event()
+            fast_finished = threading.Event()
+
+            def slow():
+                slow_started.set()
+                assert fast_finished.wait(timeout=5)
+                return "slow"
+
+            def fast():
+                assert slow_started.wait(timeout=5)
+                return "fast"
+
+            def fast_child(fast: str = Depends(fast)):
+                fast_finished.set()
+                return f"{fast}_child"
+
+            assert Diagraph(slow, fast_child).run().result == ("slow", "fast_child")
+
     def test_it_calls_functions_in_order():
         def l0():
             return "foo"
@@ -1,6 +1,32 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+
 import pytest
 
-from diagraph import Depends, Diagraph
+from diagraph import Depends, Diagraph, RetentionPolicy, SQLiteStateStore, UnpicklableError
+
+
+def stored_foo(input: str):
+    return f"{input}_foo"
+
+
+def stored_bar(foo: str = Depends(stored_foo)):
+    return f"{foo}_bar"
+
+
+def run_and_exit(path):
+    Diagraph(stored_bar, store=SQLiteStateStore(path)).run("a")
+    # exits without closing the store, or running any cleanup
+    os._exit(0)
+
+
+def make_tagged(tag):
+    def tagged(input: str):
+        return f"{input}_{tag}"
+
+    return tagged
 
 
 def describe_state():
@@ -180,3 +206,128 @@ def describe_state():
             dg[d2].result
 
     # test it uses historical records correctly (e.g., set an explicit result, run a child multiple times)
+
+
+def describe_retention():
+    def test_it_bounds_history_across_runs():
+        def foo(input: int):
+            return input
+
+        def bar(foo: int = Depends(foo)):
+            return foo * 2
+
+        dg = Diagraph(bar, retention=RetentionPolicy(keep_last=2, compact_every=1))
+        for i in range(20):
+            dg.run(i)
+            dg[foo].result = i * 10
+
+        assert len(dg.__state__.timestamps) == 2
+        assert dg[foo].result == 190
+        assert all(len(record) <= 3 for record in dg.__state__.store.records.values())
+
+        dg.run(1)
+        assert dg.result == 2
+
+    def test_it_keeps_the_policy_for_mapped_runs():
+        def foo(input: int):
+            return input
+
+        dg = Diagraph(foo, retention=RetentionPolicy(keep_last=1))
+        for _, run in dg.map(range(3)):
+            assert run.__state__.retention is dg.__state__.retention
+
+
+def describe_stores():
+    def test_it_persists_runs_to_sqlite(tmp_path):
+        def foo(input: str):
+            return f"{input}_foo"
+
+        def bar(foo: str = Depends(foo)):
+            return f"{foo}_bar"
+
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(path)
+        dg = Diagraph(bar, store=store).run("a")
+        assert dg.result == "a_foo_bar"
+        dg[foo].result = "b"
+        dg[bar].run()
+        assert dg.result == "b_bar"
+        store.close()
+
+        restored = Diagraph(bar, store=SQLiteStateStore(path))
+        assert restored.result == "b_bar"
+        assert restored[foo].result == "b"
+        assert restored.__latest_run__["input"] == ()
+
+    def test_it_maps_with_sqlite(tmp_path):
+        def foo(input: int):
+            return input * 2
+
+        dg = Diagraph(foo, store=SQLiteStateStore(tmp_path / "state.db"))
+        results = {index: run.result for index, run in dg.map(range(5))}
+        assert results == {i: i * 2 for i in range(5)}
+
+    def test_it_records_errors_that_cannot_be_pickled(tmp_path):
+        class HoldsALock(Exception):
+            def __init__(self):
+                super().__init__("holds a lock")
+                self.lock = threading.Lock()
+
+        def foo():
+            raise HoldsALock()
+
+        def bar(foo: str = Depends(foo)):
+            return foo
+
+        dg = Diagraph(bar, store=SQLiteStateStore(tmp_path / "state.db"))
+        with pytest.raises(Exception, match="Errors encountered"):
+            dg.run()
+        assert isinstance(dg[foo].error, UnpicklableError)
+        assert "holds a lock" in str(dg[foo].error)
+
+    def test_it_fails_nodes_whose_results_cannot_be_pickled(tmp_path):
+        def foo():
+            return threading.Lock()
+
+        dg = Diagraph(foo, store=SQLiteStateStore(tmp_path / "state.db"))
+        with pytest.raises(Exception, match="Errors encountered"):
+            dg.run()
+        assert "Cannot store the value for result" in str(dg[foo].error)
+
+    def test_it_persists_finished_runs_without_closing_the_store(tmp_path):
+        path = tmp_path / "state.db"
+        process = multiprocessing.get_context("fork").Process(target=run_and_exit, args=(path,))
+        process.start()
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+        restored = Diagraph(stored_bar, store=SQLiteStateStore(path))
+        assert restored.result == "a_foo_bar"
+        assert restored[stored_foo].result == "a_foo"
+
+    def test_it_stores_closures_made_by_the_same_factory(tmp_path):
+        first, second = make_tagged("first"), make_tagged("second")
+
+        def both(first: str = Depends(first), second: str = Depends(second)):
+            return f"{first}+{second}"
+
+        path = tmp_path / "state.db"
+        dg = Diagraph(both, store=SQLiteStateStore(path)).run("a")
+        assert dg.result == "a_first+a_second"
+        dg.__state__.store.close()
+
+        restored = Diagraph(both, store=SQLiteStateStore(path))
+        assert restored[first].result == "a_first"
+        assert restored[second].result == "a_second"
+
+    def test_it_persists_mapped_runs(tmp_path):
+        path = tmp_path / "state.db"
+        dg = Diagraph(stored_foo, store=SQLiteStateStore(path))
+        results = {index: run.result for index, run in dg.map(["a", "b", "c"])}
+        assert results == {0: "a_foo", 1: "b_foo", 2: "c_foo"}
+
+        connection = sqlite3.connect(path)
+        namespaces = connection.execute(
+            "SELECT COUNT(DISTINCT namespace) FROM state WHERE key LIKE 'result/%'",
+        ).fetchone()
+        assert namespaces == (3,)
@@ -0,0 +1,296 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from diagraph import LLM, Depends, Diagraph, NodeTimeoutError, RetryPolicy, prompt
+
+
+@pytest.fixture(autouse=True)
+def _clear_defaults(request):
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+    yield
+    Diagraph.set_error(None)
+    Diagraph.set_llm(None)
+    Diagraph.set_log(None)
+
+
+class SlowLLM(LLM):
+    """Streams a chunk every `interval` seconds, forever, until it is stopped."""
+
+    chunks: int
+    stopped: threading.Event
+
+    def __init__(self, interval=0.01, **kwargs):
+        self.kwargs = kwargs
+        self.interval = interval
+        self.chunks = 0
+        self.stopped = threading.Event()
+
+    def run(self, prompt, log, **kwargs):
+        try:
+            log("start", None)
+            while True:
+                time.sleep(self.interval)
+                self.chunks += 1
+                log("data", "chunk")
+        finally:
+            self.stopped.set()
+
+    async def arun(self, prompt, log, **kwargs):
+        try:
+            log("start", None)
+            while True:
+                await asyncio.sleep(self.interval)
+                self.chunks += 1
+                log("data", "chunk")
+        finally:
+            self.stopped.set()
+
+
+class FlakyLLM(LLM):
+    """Fails every attempt with a transient error, and retries it."""
+
+    attempts: int
+
+    def __init__(self, retry, **kwargs):
+        self.kwargs = kwargs
+        self.retry = retry
+        self.attempts = 0
+        self.stopped = threading.Event()
+
+    def run(self, prompt, log, cancellation=None, **kwargs):
+        try:
+            return self.retry.run(self.attempt, cancellation=cancellation)
+        finally:
+            self.stopped.set()
+
+    def attempt(self):
+        self.attempts += 1
+        raise TimeoutError("upstream timed out")
+
+
+def describe_timeouts():
+    def test_it_times_out_a_prompt(mocker):
+        llm = SlowLLM()
+        downstream = mocker.stub()
+
+        @prompt(timeout=0.1)
+        def slow():
+            return "slow"
+
+        def after(slow: str = Depends(slow)):
+            downstream(slow)
+
+        diagraph = Diagraph(after, llm=llm)
+        start = time.monotonic()
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        assert time.monotonic() - start < 2
+
+        error = diagraph[slow].error
+        assert isinstance(error, NodeTimeoutError)
+        assert str(error) == '"slow" timed out after 0.1 seconds'
+        downstream.assert_not_called()
+        assert llm.stopped.wait(timeout=5)
+
+    def test_it_times_out_a_node(mocker):
+        release = threading.Event()
+        downstream = mocker.stub()
+
+        def hangs():
+            release.wait(timeout=5)
+            return "late"
+
+        def after(hangs: str = Depends(hangs)):
+            downstream(hangs)
+
+        diagraph = Diagraph(after)
+        diagraph[hangs].timeout = 0.1
+        try:
+            start = time.monotonic()
+            with pytest.raises(Exception, match="Errors encountered"):
+                diagraph.run()
+            assert time.monotonic() - start < 2
+        finally:
+            release.set()
+
+        assert isinstance(diagraph[hangs].error, NodeTimeoutError)
+        downstream.assert_not_called()
+
+    def test_it_discards_the_result_of_a_node_that_timed_out():
+        release = threading.Event()
+        finished = threading.Event()
+
+        def hangs():
+            release.wait(timeout=5)
+            finished.set()
+            return "late"
+
+        diagraph = Diagraph(hangs)
+        diagraph[hangs].timeout = 0.1
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        release.set()
+        assert finished.wait(timeout=5)
+        time.sleep(0.05)
+
+        assert isinstance(diagraph[hangs].error, NodeTimeoutError)
+        with pytest.raises(Exception, match="No record for"):
+            diagraph[hangs].result
+
+    def test_it_stops_retrying_a_prompt_that_timed_out():
+        llm = FlakyLLM(RetryPolicy(max_attempts=100, initial_delay=0.05, jitter=False, multiplier=1))
+
+        @prompt(timeout=0.1)
+        def slow():
+            return "slow"
+
+        diagraph = Diagraph(slow, llm=llm)
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        assert isinstance(diagraph[slow].error, NodeTimeoutError)
+        # give a retry that was not stopped time to happen
+        time.sleep(0.2)
+        assert llm.attempts <= 3
+
+    def test_it_stops_backing_off_once_a_prompt_times_out():
+        llm = FlakyLLM(RetryPolicy(initial_delay=30, jitter=False))
+
+        @prompt(timeout=0.1)
+        def slow():
+            return "slow"
+
+        diagraph = Diagraph(slow, llm=llm)
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        assert llm.stopped.wait(timeout=5)
+        assert llm.attempts == 1
+
+    def test_it_prefers_node_timeouts_to_prompt_timeouts():
+        @prompt(timeout=10)
+        def slow():
+            return "slow"
+
+        diagraph = Diagraph(slow, llm=SlowLLM())
+        assert diagraph[slow].timeout == pytest.approx(10)
+        diagraph[slow].timeout = 0.1
+        assert diagraph[slow].timeout == pytest.approx(0.1)
+
+        with pytest.raises(Exception, match="Errors encountered"):
+            diagraph.run()
+        assert diagraph[slow].error.timeout == pytest.approx(0.1)
+
+        diagraph[slow].timeout = None
+        assert diagraph[slow].timeout == pytest.approx(10)
+
+    def test_it_validates_timeouts():
+        def fn():
+            return "fn"
+
+        diagraph = Diagraph(fn)
+        with pytest.raises(Exception, match="Timeout must be positive"):
+            diagraph[fn].timeout = 0
+        with pytest.raises(Exception, match="Timeout must be positive"):
+            diagraph.run(timeout=-1)
+
+    def test_it_leaves_fast_nodes_alone():
+        @prompt(timeout=5)
+        def fast():
+            return "fast"
+
+        class FastLLM(LLM):
+            def run(self, prompt, log, **kwargs):
+                return f"llm:{prompt}"
+
+        diagraph = Diagraph(fast, llm=FastLLM()).run(timeout=5)
+        assert diagraph.result == "llm:fast"
+        assert diagraph.error is None
+
+    def describe_run_timeout():
+        def test_it_times_out_the_run(mocker):
+            release = threading.Event()
+            downstream = mocker.stub()
+
+            def quick():
+                return "quick"
+
+            def hangs(quick: str = Depends(quick)):
+                release.wait(timeout=5)
+                return "late"
+
+            def after(hangs: str = Depends(hangs)):
+                downstream(hangs)
+
+            diagraph = Diagraph(after)
+            try:
+                start = time.monotonic()
+                with pytest.raises(Exception, match="Errors encountered"):
+                    diagraph.run(timeout=0.2)
+                assert time.monotonic() - start < 2
+            finally:
+                release.set()
+
+            assert diagraph[quick].result == "quick"
+            error = diagraph[hangs].error
+            assert isinstance(error, NodeTimeoutError)
+            assert error.scope == "run"
+            assert str(error) == 'The run timed out after 0.2 seconds, before "hangs" finished'
+            downstream.assert_not_called()
+
+        def test_it_does_not_pass_the_timeout_to_functions():
+            def fn(**kwargs):
+                return kwargs
+
+            assert Diagraph(fn).run(timeout=5, foo="foo").result == {"foo": "foo"}
+
+        def test_it_times_out_map_runs():
+            def hangs(i):
+                time.sleep(0.5 if i == 1 else 0)
+                return i
+
+            diagraph = Diagraph(hangs)
+            runs = dict(diagraph.map([0, 1], timeout=0.1))
+            assert runs[0].result == 0
+            assert isinstance(runs[1][hangs].error, NodeTimeoutError)
+
+    def describe_arun():
+        @pytest.mark.asyncio
+        async def test_it_cancels_a_prompt(mocker):
+            llm = SlowLLM()
+            downstream = mocker.stub()
+
+            @prompt(timeout=0.1)
+            def slow():
+                return "slow"
+
+            def after(slow: str = Depends(slow)):
+                downstream(slow)
+
+            diagraph = Diagraph(after, llm=llm)
+            with pytest.raises(Exception, match="Errors encountered"):
+                await asyncio.wait_for(diagraph.arun(), timeout=5)
+
+            assert isinstance(diagraph[slow].error, NodeTimeoutError)
+            # the stream is interrupted by cancellation rather than at its next chunk
+            assert llm.stopped.is_set()
+            downstream.assert_not_called()
+
+        @pytest.mark.asyncio
+        async def test_it_times_out_the_run():
+            llm = SlowLLM()
+
+            @prompt
+            def slow():
+                return "slow"
+
+            diagraph = Diagraph(slow, llm=llm)
+            with pytest.raises(Exception, match="Errors encountered"):
+                await asyncio.wait_for(diagraph.arun(timeout=0.1), timeout=5)
+
+            error = diagraph[slow].error
+            assert isinstance(error, NodeTimeoutError)
+            assert error.scope == "run"